@@ -5,20 +5,25 @@ Integrates with OpenAI GPT-4 and ElevenLabs for real processing
 """
 
 import os
-import openai
 import requests
 import elevenlabs
 from elevenlabs import Voice, VoiceSettings
 import time
 import json
+import asyncio
 from typing import Dict, Any, Optional
 
+from prompt_budget import prompt_budget
+from llm_cache import llm_cache
+from llm_client import llm_client
+
 # Environment variables
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 ELEVENLABS_API_KEY = os.getenv('ELEVENLABS_API_KEY')
 
-# Initialize clients
-openai.api_key = OPENAI_API_KEY
+# Part of the LLM cache key: bump when a prompt template changes
+ANALYSIS_PROMPT_VERSION = "analysis-v1"
+MARKETING_PROMPT_VERSION = "marketing-v1"
 
 # Set ElevenLabs API key
 if ELEVENLABS_API_KEY:
@@ -31,24 +36,44 @@ class AIContentProcessor:
     """Process ebook content with OpenAI GPT-4"""
     
     def __init__(self):
-        self.client = openai
+        self.client = llm_client
         
-    async def analyze_content(self, content: str, duration: int = 180) -> Dict[str, Any]:
-        """Analyze content and create TikTok script"""
+    async def analyze_content(self, content: str, duration: int = 180, bypass_cache: bool = False) -> Dict[str, Any]:
+        """Analyze content and create TikTok script (``bypass_cache`` asks for a fresh one)"""
         
         if not OPENAI_API_KEY:
             # Fallback to simulation if no API key
             return self._simulate_analysis(content, duration)
             
         try:
-            # Calculate target word count (150-200 words per minute)
-            target_words = int((duration / 60) * 175)
+            model = "gpt-4"
+            # The same content and duration get the same script back
+            key = llm_cache.key(
+                "analyze_content", model, ANALYSIS_PROMPT_VERSION,
+                {"content": content, "duration": duration}, {"temperature": 0.7, "max_tokens": 1000}
+            )
+            return await llm_cache.get_or_call(
+                key, lambda: self._request_analysis(content, duration, model),
+                task="ai_services.analyze_content", bypass=bypass_cache
+            )
             
+        except Exception as e:
+            print(f"❌ OpenAI API Error: {e}")
+            return self._simulate_analysis(content, duration)
+    
+    async def _request_analysis(self, content: str, duration: int, model: str) -> Dict[str, Any]:
+        """One OpenAI call for the script; raises on API errors and invalid JSON"""
+        
+        # Calculate target word count (150-200 words per minute)
+        target_words = int((duration / 60) * 175)
+        
+        # Key sentences of the whole text, fitted to the model's context
+        def build(source):
             prompt = f"""
 Phân tích nội dung ebook sau và tạo script cho video TikTok {duration} giây:
 
 NỘI DUNG:
-{content[:2000]}...
+{source}
 
 YÊU CẦU:
 1. Tạo script khoảng {target_words} từ ({duration} giây)
@@ -68,23 +93,21 @@ FORMAT JSON:
     "estimated_duration": {duration}
 }}
 """
+            return [
+                {"role": "system", "content": "Bạn là chuyên gia tạo nội dung TikTok viral"},
+                {"role": "user", "content": prompt}
+            ]
 
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "Bạn là chuyên gia tạo nội dung TikTok viral"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1000,
-                temperature=0.7
-            )
-            
-            content_analysis = json.loads(response.choices[0].message.content)
-            return content_analysis
-            
-        except Exception as e:
-            print(f"❌ OpenAI API Error: {e}")
-            return self._simulate_analysis(content, duration)
+        messages, max_tokens = await asyncio.to_thread(
+            prompt_budget.fit, build, content, model, 1000, 600
+        )
+
+        response = await llm_client.chat(
+            "ai_services.analyze_content", model, messages, max_tokens=max_tokens, temperature=0.7
+        )
+        
+        content_analysis = json.loads(response.choices[0].message.content)
+        return content_analysis
     
     def _simulate_analysis(self, content: str, duration: int) -> Dict[str, Any]:
         """Simulation fallback"""
@@ -160,19 +183,39 @@ class MarketingGenerator:
     """Generate marketing content with AI"""
     
     def __init__(self):
-        self.client = openai
+        self.client = llm_client
     
-    async def generate_marketing(self, script: str, category: str, keywords: list) -> Dict[str, Any]:
-        """Generate TikTok marketing content"""
+    async def generate_marketing(self, script: str, category: str, keywords: list,
+                                 bypass_cache: bool = False) -> Dict[str, Any]:
+        """Generate TikTok marketing content (``bypass_cache`` asks for fresh content)"""
         
         if not OPENAI_API_KEY:
             return self._simulate_marketing(script, category, keywords)
             
         try:
-            prompt = f"""
+            model = "gpt-3.5-turbo"
+            key = llm_cache.key(
+                "generate_marketing", model, MARKETING_PROMPT_VERSION,
+                {"script": script, "category": category, "keywords": keywords},
+                {"temperature": 0.8, "max_tokens": 500}
+            )
+            return await llm_cache.get_or_call(
+                key, lambda: self._request_marketing(script, category, keywords, model),
+                task="ai_services.generate_marketing", bypass=bypass_cache
+            )
+            
+        except Exception as e:
+            print(f"❌ Marketing AI Error: {e}")
+            return self._simulate_marketing(script, category, keywords)
+    
+    async def _request_marketing(self, script: str, category: str, keywords: list, model: str) -> Dict[str, Any]:
+        """One OpenAI call for caption, hashtags and description; raises on API errors and invalid JSON"""
+        
+        script_excerpt = prompt_budget.fit_text(script, 250, model)
+        prompt = f"""
 Tạo nội dung marketing cho video TikTok:
 
-SCRIPT: {script[:500]}...
+SCRIPT: {script_excerpt}
 CATEGORY: {category}
 KEYWORDS: {', '.join(keywords)}
 
@@ -191,22 +234,16 @@ FORMAT JSON:
 }}
 """
 
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Bạn là chuyên gia marketing TikTok"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.8
-            )
-            
-            marketing_content = json.loads(response.choices[0].message.content)
-            return marketing_content
-            
-        except Exception as e:
-            print(f"❌ Marketing AI Error: {e}")
-            return self._simulate_marketing(script, category, keywords)
+        messages = [
+            {"role": "system", "content": "Bạn là chuyên gia marketing TikTok"},
+            {"role": "user", "content": prompt}
+        ]
+        response = await llm_client.chat(
+            "ai_services.generate_marketing", model, messages, max_tokens=500, temperature=0.8
+        )
+        
+        marketing_content = json.loads(response.choices[0].message.content)
+        return marketing_content
     
     def _simulate_marketing(self, script: str, category: str, keywords: list) -> Dict[str, Any]:
         """Simulation fallback"""
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: main-content extraction, BeautifulSoup sweep vs single-pass engine
+Runs both over the saved pages in html_corpus/ plus generated 1-2 MB news pages
+
+    cd backend && python benchmarks/bench_html_extraction.py [--corpus DIR] [--repeat 3]
+
+Drop more saved pages (*.html) into the corpus directory to compare on them.
+"""
+
+import os
+import sys
+import glob
+import time
+import difflib
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from content_extractor import ContentExtractor  # noqa: E402
+from html_extractor import extract_main_content, LXML_AVAILABLE  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "html_corpus")
+
+
+def legacy_extract(html: bytes) -> str:
+    """The previous ContentExtractor._extract_main_content, kept for comparison"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in ['script', 'style', 'nav', 'header', 'footer', 'aside', 'ad', 'advertisement']:
+        for element in soup.find_all(tag):
+            element.decompose()
+    for selector in ['[class*="nav"]', '[class*="menu"]', '[class*="sidebar"]',
+                     '[class*="ad"]', '[class*="advertisement"]', '[class*="footer"]',
+                     '[class*="header"]', '[id*="nav"]', '[id*="menu"]',
+                     '[id*="sidebar"]', '[id*="ad"]', '[id*="footer"]']:
+        for element in soup.select(selector):
+            element.decompose()
+
+    content = ""
+    for selector in ['main', 'article', '[role="main"]', '.content', '.post-content',
+                     '.entry-content', '.article-content', '#content', '#main']:
+        elements = soup.select(selector)
+        if elements:
+            for element in elements:
+                content += element.get_text() + "\n\n"
+            break
+    if not content.strip():
+        body = soup.find('body')
+        if body:
+            for tag in body.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li']):
+                text = tag.get_text().strip()
+                if text and len(text) > 20:
+                    content += text + "\n\n"
+    return content
+
+
+def news_page(paragraphs: int, widgets: int, comments: int) -> bytes:
+    """A large, boilerplate-heavy news page"""
+    parts = ['<!DOCTYPE html><html><head><meta charset="utf-8"><title>Synthetic news</title>',
+             '<meta name="description" content="Generated page"><script>var x = 1;</script></head><body>',
+             '<header class="top"><nav class="menu">']
+    parts += [f'<a href="/section/{i}">Section {i}</a>' for i in range(200)]
+    parts.append('</nav></header><div class="page"><div class="main-column"><article class="story">')
+    for i in range(paragraphs):
+        parts.append(f'<p>Paragraph {i}: researchers found that <b>reading daily</b> improves focus, '
+                     f'memory and vocabulary, and <a href="/ref/{i}">a follow-up study</a> confirmed it.</p>')
+        if i % 10 == 0:
+            parts.append(f'<div class="ad-unit"><p>Sponsored message number {i} with an offer.</p></div>')
+    parts.append('</article><section class="comment-list">')
+    parts += [f'<div class="comment"><p>Comment {i}: thanks for sharing this article with everyone.</p></div>'
+              for i in range(comments)]
+    parts.append('</section></div><div class="sidebar">')
+    parts += [f'<div class="widget"><h3>Most read {i}</h3><ul>'
+              + ''.join(f'<li><a href="/w/{i}/{j}">Trending story {j} in widget {i}</a></li>' for j in range(10))
+              + '</ul></div>' for i in range(widgets)]
+    parts.append('</div></div><footer class="bottom"><p>Copyright</p></footer></body></html>')
+    return "".join(parts).encode("utf-8")
+
+
+def clean(text: str) -> str:
+    extractor = ContentExtractor()
+    return extractor._clean_text(text)[:extractor.max_content_length]
+
+
+def timed(func, html: bytes, repeat: int):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(html)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=CORPUS_DIR)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(args.corpus, "*.html"))):
+        with open(path, "rb") as f:
+            pages.append((os.path.basename(path), f.read()))
+    pages.append(("generated_1mb", news_page(paragraphs=4500, widgets=90, comments=2200)))
+    pages.append(("generated_2mb", news_page(paragraphs=9000, widgets=180, comments=4400)))
+
+    print(f"Parser: {'lxml' if LXML_AVAILABLE else 'html.parser'} (single pass) vs BeautifulSoup html.parser")
+    print(f"{'page':<28}{'size':>9}{'legacy':>10}{'single':>10}{'speedup':>9}{'similar':>9}")
+    total_old = total_new = 0.0
+    for name, html in pages:
+        old_time, old_text = timed(legacy_extract, html, args.repeat)
+        new_time, page = timed(extract_main_content, html, args.repeat)
+        total_old += old_time
+        total_new += new_time
+        old_clean, new_clean = clean(old_text), clean(page["content"])
+        similarity = difflib.SequenceMatcher(None, old_clean, new_clean, autojunk=False).ratio() \
+            if old_clean or new_clean else 1.0
+        print(f"{name:<28}{len(html) / 1024:>7.0f}KB{old_time * 1000:>8.1f}ms{new_time * 1000:>8.1f}ms"
+              f"{old_time / new_time:>8.1f}x{similarity:>9.3f}")
+    print(f"⚡ total {total_old:.2f}s -> {total_new:.2f}s ({total_old / total_new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: PDF text accumulation, old loop vs lazy budgeted pipeline
+Builds a large synthetic PDF and reports wall time and peak traced memory
+
+    cd backend && python benchmarks/bench_pdf_extraction.py --pages 100 --budget 10000
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pdf_extraction import iter_page_texts, join_within_budget  # noqa: E402
+
+WORDS = ("learning habits focus memory practice reading chapter insight idea "
+         "system growth mindset progress example story lesson").split()
+
+
+def make_pdf(pages: int, lines_per_page: int = 40) -> bytes:
+    """A valid PDF with ``pages`` pages of Helvetica text, written by hand"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for number in range(pages):
+        page_id = 4 + 2 * number
+        kids.append(f"{page_id} 0 R")
+        lines = []
+        for line in range(lines_per_page):
+            words = [WORDS[(number * 7 + line * 3 + i) % len(WORDS)] for i in range(12)]
+            lines.append(f"({' '.join(words)}.) Tj T*")
+        stream = ("BT /F1 10 Tf 14 TL 40 760 Td " + " ".join(lines) + " ET").encode()
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode()
+
+    parts = [b"%PDF-1.4\n"]
+    size = len(parts[0])
+    offsets = []
+    for index, body in enumerate(objects):
+        chunk = f"{index + 1} 0 obj\n".encode() + body + b"\nendobj\n"
+        offsets.append(size)
+        parts.append(chunk)
+        size += len(chunk)
+    parts.append(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    parts.extend(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    parts.append(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{size}\n%%EOF\n".encode())
+    return b"".join(parts)
+
+
+def clean(text: str) -> str:
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]\'\"\nÀ-ỹ]', '', text)
+    return text.strip()
+
+
+def legacy(path: str, budget: int) -> str:
+    """The previous approach: concatenate every page, then clean and truncate"""
+    import pdfplumber
+    with pdfplumber.open(path) as pdf:
+        text = ""
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + "\n"
+    return clean(text)[:budget]
+
+
+def budgeted(path: str, budget: int) -> str:
+    """Clean page by page and stop opening pages once the budget is met"""
+    return join_within_budget((clean(text) for text in iter_page_texts(path) if text), budget)
+
+
+def measure(label: str, func, *args):
+    """Time an untraced run, then trace a second run for peak memory"""
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} {elapsed:8.2f}s  peak {peak / 1024 / 1024:8.1f} MiB  {len(result):>8} chars")
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--budget", type=int, default=10000, help="character limit, as max_content_length")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.pdf")
+        with open(path, "wb") as f:
+            f.write(make_pdf(args.pages))
+        print(f"📄 {args.pages} pages, {os.path.getsize(path) / 1024 / 1024:.1f} MiB, budget {args.budget} chars")
+
+        old_time, old_peak = measure("legacy", legacy, path, args.budget)
+        new_time, new_peak = measure("budgeted", budgeted, path, args.budget)
+        print(f"⚡ {old_time / new_time:.1f}x faster, {old_peak / max(new_peak, 1):.1f}x less peak memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak RSS of PDF extraction from upload bytes, a path, or a shared mapping
+Each mode runs in a fresh process on a large scanned-style PDF where half
+the pages fall back from pdfplumber to PyPDF2 (both parsers stay open)
+
+    cd backend && python benchmarks/bench_pdf_memory.py --pages 150
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+MODES = ("bytes", "path", "mapped")
+
+
+def make_scanned_pdf(path: str, pages: int, image_side: int = 1024):
+    """A PDF whose pages each hold one incompressible grayscale image and a line of text"""
+    image = image_side * image_side
+    offsets = []
+    count = 3 + 3 * pages
+    with open(path, "wb") as f:
+        def obj(number, body: bytes):
+            offsets.append(f.tell())
+            f.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = " ".join(f"{4 + 3 * n} 0 R" for n in range(pages))
+        obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+        obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        for n in range(pages):
+            page, content, xobject = 4 + 3 * n, 5 + 3 * n, 6 + 3 * n
+            obj(page, f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {content} 0 R "
+                      f"/Resources << /Font << /F1 3 0 R >> /XObject << /Im0 {xobject} 0 R >> >> >>".encode())
+            stream = f"q 400 0 0 400 100 300 cm /Im0 Do Q BT /F1 12 Tf 72 720 Td (Scanned page {n + 1}) Tj ET".encode()
+            obj(content, b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+            obj(xobject, f"<< /Type /XObject /Subtype /Image /Width {image_side} /Height {image_side} "
+                         f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Length {image} >>\nstream\n".encode()
+                + os.urandom(image) + b"\nendstream")
+        xref = f.tell()
+        f.write(f"xref\n0 {count + 1}\n0000000000 65535 f \n".encode())
+        f.write(b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets))
+        f.write(f"trailer\n<< /Size {count + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+def _status_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def run_mode(mode: str, path: str):
+    import pdfplumber
+    import PyPDF2
+    from pdfplumber.page import Page
+
+    # Every other page fails in pdfplumber and is read by PyPDF2 instead
+    extract_text = Page.extract_text
+
+    def flaky_extract_text(page, *args, **kwargs):
+        if page.page_number % 2 == 0:
+            raise ValueError("simulated pdfplumber failure")
+        return extract_text(page, *args, **kwargs)
+
+    Page.extract_text = flaky_extract_text
+
+    peak_anon = [_status_kb("RssAnon")]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.005):
+            peak_anon[0] = max(peak_anon[0], _status_kb("RssAnon"))
+
+    baseline = _status_kb("VmRSS")
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+
+    chars = 0
+    if mode == "mapped":
+        from pdf_extraction import iter_page_texts
+        chars = sum(len(text) for text in iter_page_texts(path))
+    else:
+        if mode == "bytes":
+            # The old ContentProcessor: the whole upload in memory, one BytesIO per parser
+            data = open(path, "rb").read()
+            plumber_source, pypdf_source = io.BytesIO(data), io.BytesIO(data)
+        else:
+            # Paths: pdfplumber streams the file, PyPDF2 reads all of it into a BytesIO
+            plumber_source, pypdf_source = path, path
+        reader = None
+        with pdfplumber.open(plumber_source) as pdf:
+            for number, page in enumerate(pdf.pages):
+                try:
+                    text = page.extract_text() or ""
+                except Exception:
+                    reader = reader or PyPDF2.PdfReader(pypdf_source)
+                    text = reader.pages[number].extract_text() or ""
+                page.flush_cache()
+                chars += len(text)
+        reader = None
+
+    elapsed = time.perf_counter() - started
+    done.set()
+    sampler.join()
+    print(f"{mode} {elapsed:.2f} {_status_kb('VmHWM')} {peak_anon[0]} {baseline} {chars}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=150, help="pages of ~1 MB each")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.pdf)
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "scanned.pdf")
+        make_scanned_pdf(path, args.pages)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"📄 {args.pages}-page scanned PDF, {size_mb:.0f} MB; every other page falls back to PyPDF2")
+        print(f"  {'mode':<8}{'time':>8}{'peak RSS':>12}{'peak anon':>12}{'chars':>8}")
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--mode", mode, "--pdf", path],
+                capture_output=True, text=True, check=True
+            ).stdout.split()
+            _, elapsed, hwm, anon, baseline, chars = output
+            print(f"  {mode:<8}{float(elapsed):7.2f}s{int(hwm) / 1024:9.0f} MiB{int(anon) / 1024:9.0f} MiB{chars:>8}")
+        print("  (peak RSS includes mapped file pages, which the kernel can reclaim; peak anon does not)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: extractive pre-summarization latency and source coverage
+Condenses book-like text of a given size to a prompt budget and reports how
+many of its chapters the condensed prompt still covers, next to a blind cut
+
+    cd backend && python benchmarks/bench_summarizer.py --chars 50000 --tokens 1500
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import summarizer  # noqa: E402
+from summarizer import condense_text, estimate_tokens  # noqa: E402
+
+TOPICS = [
+    "thói quen nhỏ", "quản lý thời gian", "đầu tư dài hạn", "trí tuệ nhân tạo", "sức khỏe tinh thần",
+    "giao tiếp hiệu quả", "lịch sử kinh tế", "tư duy phản biện", "khởi nghiệp", "học suốt đời",
+]
+WORDS = ("mỗi ngày người đọc có thể học hỏi thay đổi phát triển xây dựng tương lai bền vững "
+         "bằng cách kiên trì tập trung lắng nghe thử nghiệm ghi chép chia sẻ đo lường cải thiện").split()
+
+
+def book_text(chars: int, seed: int = 7) -> str:
+    """Chapters of varied sentences, each chapter about one topic"""
+    rng = random.Random(seed)
+    per_chapter = chars // len(TOPICS)
+    chapters = []
+    for number, topic in enumerate(TOPICS, 1):
+        sentences = [f"Chương {number} nói về {topic}."]
+        size = len(sentences[0])
+        while size < per_chapter:
+            sentence = f"Khi bàn về {topic}, " + " ".join(rng.choices(WORDS, k=rng.randint(8, 30))) + "."
+            sentences.append(sentence)
+            size += len(sentence) + 1
+        chapters.append(" ".join(sentences))
+    return " ".join(chapters)[:chars]
+
+
+def coverage(text: str) -> int:
+    return sum(topic in text for topic in TOPICS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chars", type=int, default=50000)
+    parser.add_argument("--tokens", type=int, default=1500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = book_text(args.chars)
+    print(f"📚 {len(text)} chars (~{estimate_tokens(text)} tokens), {len(TOPICS)} chapters, budget {args.tokens} tokens")
+    cut = summarizer.ExtractiveSummarizer._truncate(text, args.tokens)
+    print(f"  {'blind cut':<16}{'-':>10}{estimate_tokens(cut):>8} tokens{coverage(cut):>4}/{len(TOPICS)} chapters")
+
+    for label, numpy in (("textrank", True), ("frequency", False)):
+        if numpy and not summarizer.NUMPY_AVAILABLE:
+            continue
+        summarizer.NUMPY_AVAILABLE = numpy
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            condensed = condense_text(text, args.tokens)
+            timings.append(time.perf_counter() - started)
+        print(f"  {label:<16}{min(timings) * 1000:8.1f}ms{estimate_tokens(condensed):>8} tokens"
+              f"{coverage(condensed):>4}/{len(TOPICS)} chapters")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: text normalization throughput (MB/s) on large ebook-like texts
+Compares the two previous _clean_text implementations with text_normalizer
+
+    cd backend && python benchmarks/bench_text_normalizer.py --mb 20
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import unicodedata
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from text_normalizer import text_normalizer, normalize_text  # noqa: E402
+
+SENTENCES = [
+    "Thói quen nhỏ mỗi ngày tạo nên thay đổi lớn theo thời gian.",
+    "Người đọc thường xuyên có vốn từ phong phú hơn — và viết tốt hơn.",
+    "“Đọc sách là cách rẻ nhất để sống nhiều cuộc đời”, tác giả viết…",
+    "Habits are the compound interest of self-improvement!!",
+    "Chương này nói về sự tập trung (focus) và trí nhớ [1].",
+]
+
+
+def ebook_text(megabytes: float, decomposed: bool) -> str:
+    """Paged ebook text: wrapped lines, page numbers and separators"""
+    lines = []
+    size = 0
+    page = 1
+    target = int(megabytes * 1024 * 1024)
+    while size < target:
+        for index in range(40):
+            line = SENTENCES[(page + index) % len(SENTENCES)]
+            lines.append(line)
+            size += len(line.encode("utf-8")) + 1
+        lines.append(f"- {page} -")
+        lines.append("* * *" if page % 10 == 0 else "")
+        page += 1
+    text = "\n".join(lines)
+    return unicodedata.normalize("NFD", text) if decomposed else text
+
+
+def legacy_extractor_clean(text: str) -> str:
+    """The previous ContentExtractor._clean_text"""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\sÀ-ɏḀ-ỿ.,!?;:()\-\"\']', ' ', text)
+    text = re.sub(r'[.,!?;]{2,}', '.', text)
+    lines = text.split('\n')
+    cleaned_lines = [line.strip() for line in lines if len(line.strip()) > 10]
+    return '\n'.join(cleaned_lines).strip()
+
+
+def legacy_processor_clean(text: str) -> str:
+    """The previous ContentProcessor._clean_text"""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\n+', '\n', text)
+    text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]\'\"\nÀ-ỹ]', '', text)
+    return text.strip()
+
+
+def streamed(text: str) -> str:
+    chunks = (text[i:i + 64 * 1024] for i in range(0, len(text), 64 * 1024))
+    return " ".join(text_normalizer.stream(chunks))
+
+
+def measure(label: str, func, text: str, repeat: int) -> str:
+    megabytes = len(text.encode("utf-8")) / 1024 / 1024
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(text)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<22}{best:8.3f}s {megabytes / best:8.1f} MB/s  {len(result):>10} chars")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mb", type=float, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for decomposed in (False, True):
+        text = ebook_text(args.mb, decomposed)
+        print(f"📖 {args.mb:g} MB ebook text, {'NFD (decomposed)' if decomposed else 'NFC'} Vietnamese")
+        measure("legacy extractor", legacy_extractor_clean, text, args.repeat)
+        measure("legacy processor", legacy_processor_clean, text, args.repeat)
+        whole = measure("text_normalizer", normalize_text, text, args.repeat)
+        pieces = measure("text_normalizer stream", streamed, text, args.repeat)
+        assert whole == pieces, "streamed output differs from whole-text output"
+
+
+if __name__ == "__main__":
+    main()
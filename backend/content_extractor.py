@@ -1,84 +1,75 @@
 #!/usr/bin/env python3
 """
-Content Extractor for PDF files and web URLs
+Content Extractor for PDF, EPUB, DOCX and text files and web URLs
 Extracts text content for AI processing
 """
 
 import os
-import requests
+import asyncio
+import httpx
 from pathlib import Path
-import PyPDF2
-import pdfplumber
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse
-import re
 from typing import Dict, Any, Optional
 
+from upload_store import upload_store, extraction_cache
+from pdf_extraction import pdf_extraction_pool, join_within_budget, pdf_info
+from http_cache import http_cache
+from html_extractor import StreamingExtractor
+from text_normalizer import normalize_text
+from document_index import document_indexer, ChapterNotFound
+from document_readers import get_reader, read_document
+from page_sampling import page_sampler, EXTRACTION_MODE
+
 class ContentExtractor:
     """Extract content from various sources"""
     
     def __init__(self):
         self.max_content_length = 10000  # Limit content for AI processing
         
-    async def extract_from_pdf(self, file_path: str) -> Dict[str, Any]:
-        """Extract text from PDF file"""
+    async def extract_from_pdf(self, file_path: str, digest: Optional[str] = None,
+                               chapter: Optional[int] = None) -> Dict[str, Any]:
+        """Extract text from PDF file (or one chapter of it), reusing the result for identical files"""
         try:
-            content = ""
+            digest = digest or await asyncio.to_thread(upload_store.digest_of, file_path)
+        except OSError as e:
+            raise Exception(f"PDF extraction failed: {str(e)}")
+        if chapter is not None:
+            result = await extraction_cache.get_or_extract(
+                digest,
+                f"content_extractor-pdf-{self.max_content_length}-chapter-{chapter}",
+                lambda: self._extract_chapter_uncached(file_path, digest, chapter)
+            )
+        else:
+            result = await extraction_cache.get_or_extract(
+                digest,
+                f"content_extractor-pdf-{self.max_content_length}-{EXTRACTION_MODE}",
+                lambda: self._extract_pdf_uncached(file_path)
+            )
+        return dict(result, source_path=file_path)
+    
+    async def _extract_pdf_uncached(self, file_path: str) -> Dict[str, Any]:
+        """Sample pages across a long book, or extract from the start until the content limit is reached"""
+        try:
+            # Read once, shared by the sampler and the fallback
+            info = await asyncio.to_thread(pdf_info, file_path)
+            sampled = await page_sampler.sample(file_path, self.max_content_length,
+                                                clean=self._clean_text, info=info)
+            if sampled is not None:
+                content, info = sampled
+            else:
+                pages, info = await pdf_extraction_pool.extract_pages(
+                    file_path, budget=self.max_content_length, clean=self._clean_text, info=info
+                )
+                # Pages arrive cleaned; join only as many as the limit needs
+                content = join_within_budget(pages, self.max_content_length)
             metadata = {
-                "pages": 0,
-                "title": "",
-                "author": "",
-                "subject": ""
+                "pages": info["pages"],
+                "title": info["title"],
+                "author": info["author"],
+                "subject": info["subject"]
             }
-            
-            # Try pdfplumber first (better for text extraction)
-            try:
-                with pdfplumber.open(file_path) as pdf:
-                    metadata["pages"] = len(pdf.pages)
-                    
-                    # Extract metadata if available
-                    if pdf.metadata:
-                        metadata["title"] = pdf.metadata.get("Title", "")
-                        metadata["author"] = pdf.metadata.get("Author", "")
-                        metadata["subject"] = pdf.metadata.get("Subject", "")
-                    
-                    # Extract text from all pages
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            content += page_text + "\n\n"
-                            
-                        # Stop if content is too long
-                        if len(content) > self.max_content_length:
-                            content = content[:self.max_content_length]
-                            break
-                            
-            except Exception as e:
-                print(f"pdfplumber failed, trying PyPDF2: {e}")
-                
-                # Fallback to PyPDF2
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    metadata["pages"] = len(pdf_reader.pages)
-                    
-                    # Extract metadata
-                    if pdf_reader.metadata:
-                        metadata["title"] = pdf_reader.metadata.get("/Title", "")
-                        metadata["author"] = pdf_reader.metadata.get("/Author", "")
-                        metadata["subject"] = pdf_reader.metadata.get("/Subject", "")
-                    
-                    # Extract text
-                    for page in pdf_reader.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            content += page_text + "\n\n"
-                            
-                        if len(content) > self.max_content_length:
-                            content = content[:self.max_content_length]
-                            break
-            
-            # Clean up content
-            content = self._clean_text(content)
+            if "sampled_pages" in info:
+                metadata["sampled_pages"] = info["sampled_pages"]
             
             if not content.strip():
                 raise ValueError("No readable text found in PDF")
@@ -94,161 +85,161 @@ class ContentExtractor:
         except Exception as e:
             raise Exception(f"PDF extraction failed: {str(e)}")
     
-    async def extract_from_url(self, url: str) -> Dict[str, Any]:
-        """Extract content from web URL"""
+    async def _extract_chapter_uncached(self, file_path: str, digest: str, chapter: int) -> Dict[str, Any]:
+        """Extract only the pages of one chapter from the document's index"""
         try:
-            # Validate URL
-            parsed_url = urlparse(url)
-            if not parsed_url.scheme or not parsed_url.netloc:
-                raise ValueError("Invalid URL format")
-            
-            # Set headers to mimic browser
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            # Fetch content
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
+            index = await document_indexer.get_index(file_path, digest)
+            content, entry = await document_indexer.extract_chapter(
+                file_path, chapter, budget=self.max_content_length, digest=digest
+            )
             
-            # Parse HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
+            if not content.strip():
+                raise ValueError(f"No readable text found in chapter {chapter}")
             
-            # Extract metadata
-            metadata = {
-                "title": "",
-                "description": "",
-                "author": "",
-                "url": url,
-                "domain": parsed_url.netloc
+            return {
+                "content": content,
+                "metadata": {
+                    "pages": index["pages"],
+                    "title": index["title"],
+                    "author": index["author"],
+                    "chapter": entry,
+                    "chapters": len(index["chapters"])
+                },
+                "source_type": "pdf",
+                "source_path": file_path,
+                "length": len(content)
             }
             
-            # Get title
-            title_tag = soup.find('title')
-            if title_tag:
-                metadata["title"] = title_tag.get_text().strip()
-            
-            # Get meta description
-            meta_desc = soup.find('meta', attrs={'name': 'description'})
-            if meta_desc:
-                metadata["description"] = meta_desc.get('content', '').strip()
-            
-            # Get author
-            meta_author = soup.find('meta', attrs={'name': 'author'})
-            if meta_author:
-                metadata["author"] = meta_author.get('content', '').strip()
-            
-            # Extract main content
-            content = self._extract_main_content(soup)
-            
-            # Clean up content
-            content = self._clean_text(content)
-            
-            # Limit content length
-            if len(content) > self.max_content_length:
-                content = content[:self.max_content_length]
+        except ChapterNotFound:
+            raise
+        except Exception as e:
+            raise Exception(f"PDF extraction failed: {str(e)}")
+    
+    async def extract_from_document(self, file_path: str, source_type: str,
+                                    digest: Optional[str] = None) -> Dict[str, Any]:
+        """Extract text from an EPUB, DOCX or text file, reading only up to the content limit"""
+        reader = get_reader(source_type)
+        if reader is None:
+            raise ValueError(f"Unsupported source type: {source_type}")
+        try:
+            digest = digest or await asyncio.to_thread(upload_store.digest_of, file_path)
+        except OSError as e:
+            raise Exception(f"{reader.source_type.upper()} extraction failed: {str(e)}")
+        result = await extraction_cache.get_or_extract(
+            digest,
+            f"content_extractor-{reader.source_type}-{self.max_content_length}",
+            lambda: self._extract_document_uncached(reader, file_path)
+        )
+        return dict(result, source_path=file_path)
+    
+    async def _extract_document_uncached(self, reader, file_path: str) -> Dict[str, Any]:
+        """Read chapters/paragraphs lazily until the content limit is reached"""
+        try:
+            content, metadata = await asyncio.to_thread(
+                read_document, reader, file_path, self.max_content_length
+            )
             
             if not content.strip():
-                raise ValueError("No readable content found on webpage")
-                
+                raise ValueError(f"No readable text found in {reader.source_type.upper()} file")
+            
             return {
                 "content": content,
                 "metadata": metadata,
-                "source_type": "url",
-                "source_url": url,
+                "source_type": reader.source_type,
+                "source_path": file_path,
                 "length": len(content)
             }
             
-        except requests.RequestException as e:
+        except Exception as e:
+            raise Exception(f"{reader.source_type.upper()} extraction failed: {str(e)}")
+    
+    async def extract_from_url(self, url: str) -> Dict[str, Any]:
+        """Extract content from web URL"""
+        try:
+            # Validate URL
+            parsed_url = urlparse(url)
+            if not parsed_url.scheme or not parsed_url.netloc:
+                raise ValueError("Invalid URL format")
+            
+            # Fetch through the HTTP cache; a fresh or revalidated (304) page
+            # reuses its parsed result. Otherwise the body is parsed as it
+            # streams in, and the download stops once the main container
+            # holds enough raw text (whitespace roughly halves on cleaning)
+            return await http_cache.fetch_parsed(
+                url,
+                f"content_extractor-v2-{self.max_content_length}",
+                lambda charset: StreamingExtractor(
+                    target_chars=self.max_content_length * 2,
+                    charset=charset,
+                    finish=lambda page: self._page_result(page, url, parsed_url.netloc)
+                ),
+                on_pdf=lambda path, sha256: self._extract_pdf_from_url(path, sha256, url)
+            )
+            
+        except httpx.HTTPError as e:
             raise Exception(f"Failed to fetch URL: {str(e)}")
         except Exception as e:
             raise Exception(f"URL extraction failed: {str(e)}")
     
-    def _extract_main_content(self, soup: BeautifulSoup) -> str:
-        """Extract main content from HTML, removing navigation, ads, etc."""
-        
-        # Remove unwanted elements
-        unwanted_tags = ['script', 'style', 'nav', 'header', 'footer', 'aside', 'ad', 'advertisement']
-        for tag in unwanted_tags:
-            for element in soup.find_all(tag):
-                element.decompose()
-        
-        # Remove elements with unwanted classes/ids
-        unwanted_selectors = [
-            '[class*="nav"]', '[class*="menu"]', '[class*="sidebar"]',
-            '[class*="ad"]', '[class*="advertisement"]', '[class*="footer"]',
-            '[class*="header"]', '[id*="nav"]', '[id*="menu"]',
-            '[id*="sidebar"]', '[id*="ad"]', '[id*="footer"]'
-        ]
-        
-        for selector in unwanted_selectors:
-            for element in soup.select(selector):
-                element.decompose()
-        
-        # Try to find main content areas
-        main_content_selectors = [
-            'main', 'article', '[role="main"]', '.content', '.post-content',
-            '.entry-content', '.article-content', '#content', '#main'
-        ]
+    async def _extract_pdf_from_url(self, path: str, sha256: str, url: str) -> Dict[str, Any]:
+        """A URL that serves a PDF: extract the downloaded spool file"""
+        result = await self.extract_from_pdf(path, digest=sha256)
+        result.pop("source_path", None)
+        return dict(result, source_url=url)
+    
+    def _page_result(self, page: Dict[str, str], url: str, domain: str) -> Dict[str, Any]:
+        """Build the result from the extracted page (content and metadata)"""
+        metadata = {
+            "title": page["title"],
+            "description": page["description"],
+            "author": page["author"],
+            "url": url,
+            "domain": domain
+        }
         
-        content = ""
+        # Clean up content
+        content = self._clean_text(page["content"])
         
-        # Look for main content areas first
-        for selector in main_content_selectors:
-            elements = soup.select(selector)
-            if elements:
-                for element in elements:
-                    content += element.get_text() + "\n\n"
-                break
+        # Limit content length
+        if len(content) > self.max_content_length:
+            content = content[:self.max_content_length]
         
-        # If no main content found, extract from body
         if not content.strip():
-            body = soup.find('body')
-            if body:
-                # Focus on paragraph and heading content
-                for tag in body.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li']):
-                    text = tag.get_text().strip()
-                    if text and len(text) > 20:  # Only include substantial text
-                        content += text + "\n\n"
-        
-        return content
+            raise ValueError("No readable content found on webpage")
+            
+        return {
+            "content": content,
+            "metadata": metadata,
+            "source_type": "url",
+            "source_url": url,
+            "length": len(content)
+        }
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize extracted text"""
-        if not text:
-            return ""
-        
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove special characters but keep Vietnamese
-        text = re.sub(r'[^\w\s\u00C0-\u024F\u1E00-\u1EFF.,!?;:()\-\"\']', ' ', text)
-        
-        # Remove repeated punctuation
-        text = re.sub(r'[.,!?;]{2,}', '.', text)
-        
-        # Remove very short lines (likely not content)
-        lines = text.split('\n')
-        cleaned_lines = []
-        for line in lines:
-            line = line.strip()
-            if len(line) > 10:  # Only keep lines with substantial content
-                cleaned_lines.append(line)
-        
-        text = '\n'.join(cleaned_lines)
-        
-        return text.strip()
+        return normalize_text(text)
     
-    async def extract_content(self, source_type: str, source_path: str) -> Dict[str, Any]:
-        """Main method to extract content from any source"""
+    async def extract_content(self, source_type: str, source_path: str,
+                              chapter: Optional[int] = None) -> Dict[str, Any]:
+        """Main method to extract content from any source (``chapter`` applies to PDFs)
+
+        A missing chapter raises ChapterNotFound instead of falling back to
+        sample content, so the job fails rather than narrating placeholder text.
+        """
+        if chapter is not None and source_type != "pdf":
+            raise ChapterNotFound(f"Chapters are only available for PDF files, not {source_type}")
         try:
             if source_type == "pdf":
-                return await self.extract_from_pdf(source_path)
+                return await self.extract_from_pdf(source_path, chapter=chapter)
             elif source_type == "url":
                 return await self.extract_from_url(source_path)
+            elif get_reader(source_type) is not None:
+                return await self.extract_from_document(source_path, source_type)
             else:
                 raise ValueError(f"Unsupported source type: {source_type}")
                 
+        except ChapterNotFound:
+            raise
         except Exception as e:
             print(f"❌ Content extraction failed: {e}")
             # Return fallback content
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Chapter index for uploaded documents
+Outline or detected headings, page ranges and character offsets, built once per file
+"""
+
+import os
+import re
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from upload_store import upload_store, extraction_cache
+from pdf_extraction import pdf_extraction_pool, join_within_budget, MappedPDF
+from text_normalizer import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Bump when the index layout or detection rules change
+INDEX_VARIANT = "document-index-v1"
+
+# Documents without an outline or headings are cut into sections of about
+# this many characters, so they still yield more than one video
+SECTION_CHARS = int(os.environ.get('INDEX_SECTION_CHARS', 20000))
+
+# Shorter chapters (part title pages, dedications) are folded into the next
+MIN_CHAPTER_CHARS = 1500
+
+# Headings are looked for in the first few text lines of a page
+HEADING_LINES = 4
+MAX_HEADING_CHARS = 80
+
+# A page with this many heading-like lines is a table of contents
+TOC_HEADINGS = 3
+
+_NUMERALS = (r'\d+|[ivxlcdm]+|một|hai|ba|bốn|năm|sáu|bảy|tám|chín|mười|'
+             r'one|two|three|four|five|six|seven|eight|nine|ten')
+
+# "Chương 3: Tên", "CHAPTER IV", "Phần hai" ... the number must be followed
+# by the end of the line, punctuation or a capitalised title, so prose such
+# as "Phần lớn ..." or "Part of the ..." is not taken for a heading
+NUMBERED_HEADING_RE = re.compile(
+    r'^(?P<label>chương|chapter|phần|part|quyển|book|hồi|tập|bài)\s+(?P<number>' + _NUMERALS + r')'
+    r'(?:\s*$|\s*[:.\-–—]|\s+(?=[^\W\d_]))(?P<rest>.*)$',
+    re.IGNORECASE
+)
+
+# Unnumbered front and back matter
+NAMED_HEADINGS = frozenset([
+    'lời nói đầu', 'lời mở đầu', 'lời giới thiệu', 'mở đầu', 'giới thiệu', 'lời tựa', 'lời kết',
+    'kết luận', 'phần kết', 'phụ lục', 'lời cảm ơn', 'lời bạt',
+    'preface', 'foreword', 'introduction', 'prologue', 'epilogue', 'conclusion', 'afterword', 'appendix',
+    'acknowledgements', 'acknowledgments'
+])
+
+
+class ChapterNotFound(ValueError):
+    """The requested chapter is not in the document's index"""
+
+
+def _heading(line: str) -> Optional[str]:
+    """The heading on ``line``, or None"""
+    line = line.strip()
+    if not line or len(line) > MAX_HEADING_CHARS:
+        return None
+    match = NUMBERED_HEADING_RE.match(line)
+    if match:
+        rest = match.group('rest').strip(' :.-–—')
+        if rest and not rest[0].isupper() and not rest[0].isdigit():
+            return None
+        return normalize_text(line)
+    if line.lower().rstrip(' .:') in NAMED_HEADINGS:
+        return normalize_text(line)
+    return None
+
+
+def heading_key(heading: str) -> str:
+    """What identifies a heading: label and number ("chương 1") for numbered ones
+
+    Running headers repeat a chapter's heading, sometimes shortened
+    ("Chương 1" for "Chương 1: Tên"), so headings are compared by key.
+    """
+    match = NUMBERED_HEADING_RE.match(heading)
+    if match:
+        return f"{match.group('label')} {match.group('number')}".lower()
+    return heading.lower().rstrip(' .:')
+
+
+def detect_heading(page_text: str) -> Optional[str]:
+    """The chapter heading at the top of a page, if the page starts one
+
+    Only the first HEADING_LINES lines with letters are considered (page
+    numbers and running headers usually come first). Tables of contents,
+    which list many headings on one page, yield nothing.
+    """
+    if not page_text:
+        return None
+    found = None
+    seen_lines = 0
+    headings = 0
+    for line in page_text.splitlines():
+        if not any(char.isalpha() for char in line):
+            continue
+        heading = _heading(line)
+        if heading:
+            headings += 1
+            if headings >= TOC_HEADINGS:
+                return None
+            if found is None and seen_lines < HEADING_LINES:
+                found = heading
+        seen_lines += 1
+    return found
+
+
+def read_outline(path: str) -> List[Tuple[int, str, int]]:
+    """PDF bookmarks as ``(level, title, page)`` in document order (pages 0-based)"""
+    entries: List[Tuple[int, str, int]] = []
+    with MappedPDF(path) as document:
+        try:
+            import PyPDF2
+            reader = PyPDF2.PdfReader(document.stream())
+            outline = reader.outline
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read PDF outline: {e}")
+            return []
+
+        def walk(items, level):
+            for item in items:
+                if isinstance(item, list):
+                    walk(item, level + 1)
+                    continue
+                try:
+                    page = reader.get_destination_page_number(item)
+                except Exception:
+                    continue
+                title = normalize_text(str(getattr(item, 'title', '') or ''))
+                if page is not None and page >= 0 and title:
+                    entries.append((level, title, page))
+
+        walk(outline, 1)
+    return entries
+
+
+def _outline_starts(entries: List[Tuple[int, str, int]]) -> List[Tuple[str, int]]:
+    """Chapter starts from the shallowest outline level that splits the book
+
+    A single top-level bookmark (often the book title) does not split
+    anything, so the next level down is used instead.
+    """
+    for level in sorted({entry[0] for entry in entries}):
+        starts = sorted({page: title for lvl, title, page in reversed(entries) if lvl == level}.items())
+        if len(starts) >= 2:
+            return [(title, page) for page, title in starts]
+    return []
+
+
+class DocumentIndexer:
+    """Builds and caches the chapter index of uploaded documents
+
+    The index is persisted in the extraction cache under the file's
+    SHA-256, so it is built once per distinct upload and shared by every
+    job (and server process) that asks for a chapter of it.
+    """
+
+    def __init__(self, section_chars: int = SECTION_CHARS, min_chapter_chars: int = MIN_CHAPTER_CHARS):
+        self.section_chars = section_chars
+        self.min_chapter_chars = min_chapter_chars
+        self._lock = threading.Lock()
+        self._building = set()
+
+    async def get_index(self, path: str, digest: Optional[str] = None) -> Dict[str, Any]:
+        """The chapter index of a PDF, built on first use"""
+        digest = digest or await asyncio.to_thread(upload_store.digest_of, path)
+        return await extraction_cache.get_or_extract(digest, INDEX_VARIANT, lambda: self.build_index(path))
+
+    def cached_index(self, path: str, digest: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The chapter index of a PDF if it has been built already, else None (never builds it)"""
+        return extraction_cache.get(digest or upload_store.digest_of(path), INDEX_VARIANT)
+
+    def build_in_background(self, path: str, digest: Optional[str] = None) -> bool:
+        """Start building the index on a thread; False if a build of the file is already running
+
+        For synchronous request handlers, which should not hold a request
+        for the tens of seconds a long book takes to index.
+        """
+        digest = digest or upload_store.digest_of(path)
+        with self._lock:
+            if digest in self._building:
+                return False
+            self._building.add(digest)
+
+        def build():
+            try:
+                asyncio.run(self.get_index(path, digest))
+            except Exception as e:
+                logger.error(f"❌ Indexing {os.path.basename(path)} failed: {e}")
+            finally:
+                with self._lock:
+                    self._building.discard(digest)
+
+        threading.Thread(target=build, name=f"index-{digest[:12]}", daemon=True).start()
+        return True
+
+    async def build_index(self, path: str) -> Dict[str, Any]:
+        """Read every page once: per-page offsets, then outline, headings or sections"""
+        raw_pages, info = await pdf_extraction_pool.extract_pages(path)
+        return await asyncio.to_thread(self._index_from_pages, path, raw_pages, info)
+
+    def _index_from_pages(self, path: str, raw_pages: List[str], info: Dict[str, Any]) -> Dict[str, Any]:
+        # Offsets are into the text join_within_budget(cleaned pages) builds,
+        # the same text the extractors feed to the AI
+        lengths = [len(normalize_text(text)) if text else 0 for text in raw_pages]
+        offsets = [0]
+        for length in lengths:
+            offsets.append(offsets[-1] + (length + 1 if length else 0))
+
+        source = "outline"
+        starts = _outline_starts(read_outline(path))
+        if not starts:
+            source = "headings"
+            starts = []
+            seen = set()
+            for page, text in enumerate(raw_pages):
+                heading = detect_heading(text)
+                # Running headers repeat chapter and part headings (in full,
+                # shortened or alternating), so a heading starts a chapter
+                # only the first time its key appears
+                if heading and heading_key(heading) not in seen:
+                    seen.add(heading_key(heading))
+                    starts.append((heading, page))
+            if len(starts) < 2:
+                source = "pages"
+                starts = []
+
+        total = len(raw_pages)
+        chapters = self._chapters(starts, offsets, total) if starts else self._sections(offsets, total)
+        index = {
+            "pages": total,
+            "title": info.get("title", ""),
+            "author": info.get("author", ""),
+            "source": source,
+            "chars": max(0, offsets[-1] - 1),
+            "page_offsets": offsets[:-1],
+            "chapters": chapters
+        }
+        logger.info(f"📑 Indexed {total} pages: {len(chapters)} chapters from {source}")
+        return index
+
+    def _chapters(self, starts: List[Tuple[str, int]], offsets: List[int], total: int) -> List[Dict[str, Any]]:
+        bounds = [(title, start, stop) for (title, start), (_, stop)
+                  in zip(starts, starts[1:] + [("", total)]) if stop > start]
+        # Text before the first chapter (cover, contents) is kept only if substantial
+        if bounds and bounds[0][1] > 0 and self._chars(offsets, 0, bounds[0][1]) >= self.min_chapter_chars:
+            bounds.insert(0, ("Front matter", 0, bounds[0][1]))
+
+        merged = []
+        carry = None
+        for title, start, stop in bounds:
+            if carry is not None:
+                start, carry = carry, None
+            if self._chars(offsets, start, stop) < self.min_chapter_chars and stop < total:
+                carry = start
+                continue
+            merged.append((title, start, stop))
+        if carry is not None and merged:
+            title, start, _ = merged.pop()
+            merged.append((title, start, total))
+        return [self._entry(number, title, start, stop, offsets)
+                for number, (title, start, stop) in enumerate(merged, 1)]
+
+    def _sections(self, offsets: List[int], total: int) -> List[Dict[str, Any]]:
+        sections = []
+        start = 0
+        for page in range(total):
+            if self._chars(offsets, start, page + 1) >= self.section_chars or page + 1 == total:
+                sections.append((start, page + 1))
+                start = page + 1
+        # A short tail joins the section before it
+        if len(sections) > 1 and self._chars(offsets, *sections[-1]) < self.min_chapter_chars:
+            tail = sections.pop()
+            sections[-1] = (sections[-1][0], tail[1])
+        return [self._entry(number, f"Pages {start + 1}-{stop}", start, stop, offsets)
+                for number, (start, stop) in enumerate(sections, 1)]
+
+    @staticmethod
+    def _chars(offsets: List[int], start: int, stop: int) -> int:
+        return offsets[stop] - offsets[start]
+
+    @staticmethod
+    def _entry(number: int, title: str, start: int, stop: int, offsets: List[int]) -> Dict[str, Any]:
+        return {
+            "number": number,
+            "title": title,
+            "start_page": start,
+            "end_page": stop,
+            "start_char": offsets[start],
+            "end_char": max(offsets[start], offsets[stop] - 1)
+        }
+
+    @staticmethod
+    def chapter(index: Dict[str, Any], number: int) -> Dict[str, Any]:
+        """Chapter ``number`` (1-based) of an index; raises ChapterNotFound"""
+        chapters = index.get("chapters", [])
+        if not isinstance(number, int) or not 1 <= number <= len(chapters):
+            raise ChapterNotFound(f"Chapter {number} not found (document has {len(chapters)} chapters)")
+        return chapters[number - 1]
+
+    async def extract_chapter(self, path: str, number: int, budget: Optional[int] = None,
+                              digest: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """Cleaned text of one chapter and its index entry
+
+        Only the chapter's pages are read; with a ``budget`` extraction
+        stops once enough text has arrived, as for whole documents.
+        """
+        index = await self.get_index(path, digest)
+        chapter = self.chapter(index, number)
+        pages, _ = await pdf_extraction_pool.extract_pages(
+            path, budget=budget, clean=normalize_text,
+            start=chapter["start_page"], stop=chapter["end_page"],
+            # The index already knows the page count
+            info={"pages": index["pages"]}
+        )
+        return join_within_budget(pages, budget), chapter
+
+
+def index_summary(index: Dict[str, Any]) -> Dict[str, Any]:
+    """The index without per-page offsets, for API responses"""
+    return {key: value for key, value in index.items() if key != "page_offsets"}
+
+
+# Initialize shared indexer
+document_indexer = DocumentIndexer()
+
+# Export for easy import
+__all__ = ['document_indexer', 'DocumentIndexer', 'ChapterNotFound', 'detect_heading', 'heading_key', 'read_outline',
+           'index_summary', 'INDEX_VARIANT']
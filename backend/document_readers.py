@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Streaming readers for EPUB, DOCX and plain-text ebooks
+Each reader yields text chapter by chapter or paragraph by paragraph, so extraction stops at the budget
+"""
+
+import os
+import codecs
+import zipfile
+import logging
+import posixpath
+import xml.etree.ElementTree as ET
+from abc import ABC, abstractmethod
+from html.parser import HTMLParser
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from urllib.parse import unquote
+
+from multipart_upload import READ_CHUNK_SIZE
+from pdf_extraction import join_within_budget
+from text_normalizer import text_normalizer
+
+logger = logging.getLogger(__name__)
+
+# Archive members larger than this (uncompressed) are refused, so a zip
+# bomb can't be inflated while looking for the text
+MAX_MEMBER_BYTES = int(os.environ.get('DOCUMENT_MAX_MEMBER_BYTES', 64 * 1024 * 1024))
+
+# Text normalized at a time; the most a reader reads past the budget
+NORMALIZE_BLOCK = 16 * 1024
+
+_CONTAINER_NS = '{urn:oasis:names:tc:opendocument:xmlns:container}'
+_OPF_NS = '{http://www.idpf.org/2007/opf}'
+_DC_NS = '{http://purl.org/dc/elements/1.1/}'
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+# Elements that end a line of text in XHTML chapters
+_XHTML_BLOCKS = frozenset(['p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+                           'blockquote', 'section', 'article', 'pre', 'dd', 'dt', 'figcaption'])
+_XHTML_SKIPPED = frozenset(['head', 'script', 'style', 'svg', 'math'])
+
+
+class DocumentReadError(ValueError):
+    """The file is not a readable document of its type (HTTP 400)"""
+
+
+class DocumentReader(ABC):
+    """A document format: metadata plus the raw text in reading order
+
+    ``iter_texts`` yields pieces lazily, each ending at a line or paragraph
+    boundary; it only reads as far into the file as the caller consumes.
+    """
+
+    source_type = ""
+    extensions: Tuple[str, ...] = ()
+
+    def metadata(self, path: str) -> Dict[str, Any]:
+        return {}
+
+    @abstractmethod
+    def iter_texts(self, path: str) -> Iterator[str]:
+        ...
+
+
+def _open_member(archive: zipfile.ZipFile, name: str):
+    try:
+        info = archive.getinfo(name)
+    except KeyError:
+        raise DocumentReadError(f"Missing archive member: {name}")
+    if info.file_size > MAX_MEMBER_BYTES:
+        raise DocumentReadError(f"Archive member too large: {name}")
+    return archive.open(info)
+
+
+def _read_member(archive: zipfile.ZipFile, name: str) -> bytes:
+    with _open_member(archive, name) as member:
+        return member.read(MAX_MEMBER_BYTES + 1)
+
+
+def _open_archive(path: str) -> zipfile.ZipFile:
+    try:
+        return zipfile.ZipFile(path)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise DocumentReadError(f"Not a valid archive: {e}")
+
+
+class _XhtmlText(HTMLParser):
+    """Collects the text of an XHTML chapter, one line per block element"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skipped = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _XHTML_SKIPPED:
+            self._skipped += 1
+        elif tag in _XHTML_BLOCKS:
+            self.parts.append('\n')
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _XHTML_BLOCKS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in _XHTML_SKIPPED:
+            self._skipped = max(0, self._skipped - 1)
+        elif tag in _XHTML_BLOCKS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skipped:
+            self.parts.append(data)
+
+    def take(self) -> str:
+        text = "".join(self.parts)
+        self.parts = []
+        return text
+
+
+class EpubReader(DocumentReader):
+    """EPUB 2/3: chapters in spine order, each parsed as it is decompressed"""
+
+    source_type = "epub"
+    extensions = ("epub",)
+
+    def _package(self, archive: zipfile.ZipFile) -> Tuple[Optional[ET.Element], str]:
+        """The OPF package document and its directory inside the archive"""
+        try:
+            container = ET.fromstring(_read_member(archive, 'META-INF/container.xml'))
+            rootfile = container.find(f'.//{_CONTAINER_NS}rootfile')
+            opf_path = rootfile.get('full-path') if rootfile is not None else None
+            if opf_path:
+                return ET.fromstring(_read_member(archive, opf_path)), posixpath.dirname(opf_path)
+        except (DocumentReadError, ET.ParseError) as e:
+            logger.warning(f"⚠️ EPUB package unreadable, reading chapters by file name: {e}")
+        return None, ""
+
+    def _spine(self, archive: zipfile.ZipFile) -> List[str]:
+        package, base = self._package(archive)
+        if package is not None:
+            manifest = {
+                item.get('id'): item
+                for item in package.iterfind(f'{_OPF_NS}manifest/{_OPF_NS}item')
+            }
+            spine = []
+            for itemref in package.iterfind(f'{_OPF_NS}spine/{_OPF_NS}itemref'):
+                item = manifest.get(itemref.get('idref'))
+                if item is None or 'html' not in (item.get('media-type') or ''):
+                    continue
+                spine.append(posixpath.normpath(posixpath.join(base, unquote(item.get('href') or ''))))
+            if spine:
+                return spine
+        # No usable package document: chapter files in name order
+        return sorted(name for name in archive.namelist()
+                      if name.lower().endswith(('.xhtml', '.html', '.htm')))
+
+    def metadata(self, path: str) -> Dict[str, Any]:
+        with _open_archive(path) as archive:
+            package, _ = self._package(archive)
+            if package is None:
+                return {"title": "", "author": "", "chapters": len(self._spine(archive))}
+            title = package.find(f'{_OPF_NS}metadata/{_DC_NS}title')
+            author = package.find(f'{_OPF_NS}metadata/{_DC_NS}creator')
+            return {
+                "title": (title.text or "").strip() if title is not None else "",
+                "author": (author.text or "").strip() if author is not None else "",
+                "chapters": len(self._spine(archive))
+            }
+
+    def iter_texts(self, path: str) -> Iterator[str]:
+        with _open_archive(path) as archive:
+            for name in self._spine(archive):
+                try:
+                    member = _open_member(archive, name)
+                except DocumentReadError as e:
+                    logger.warning(f"⚠️ Skipping EPUB chapter: {e}")
+                    continue
+                with member:
+                    # XHTML in an EPUB is UTF-8 or UTF-16 (with a BOM)
+                    head = member.read(READ_CHUNK_SIZE)
+                    encoding = 'utf-16' if head[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE) else 'utf-8-sig'
+                    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+                    parser = _XhtmlText()
+                    chunk = head
+                    while chunk:
+                        parser.feed(decoder.decode(chunk))
+                        text = parser.take()
+                        if text:
+                            yield text
+                        chunk = member.read(READ_CHUNK_SIZE)
+                    parser.feed(decoder.decode(b"", final=True))
+                    parser.close()
+                    yield parser.take() + '\n'
+
+
+class DocxReader(DocumentReader):
+    """Word documents: paragraphs of word/document.xml, parsed incrementally"""
+
+    source_type = "docx"
+    extensions = ("docx",)
+
+    def metadata(self, path: str) -> Dict[str, Any]:
+        with _open_archive(path) as archive:
+            try:
+                core = ET.fromstring(_read_member(archive, 'docProps/core.xml'))
+            except (DocumentReadError, ET.ParseError):
+                return {"title": "", "author": ""}
+            title = core.find(f'{_DC_NS}title')
+            author = core.find(f'{_DC_NS}creator')
+            return {
+                "title": (title.text or "").strip() if title is not None else "",
+                "author": (author.text or "").strip() if author is not None else ""
+            }
+
+    def iter_texts(self, path: str) -> Iterator[str]:
+        with _open_archive(path) as archive, _open_member(archive, 'word/document.xml') as member:
+            parts: List[str] = []
+            stack: List[ET.Element] = []
+            try:
+                for event, element in ET.iterparse(member, events=('start', 'end')):
+                    if event == 'start':
+                        stack.append(element)
+                        continue
+                    stack.pop()
+                    tag = element.tag
+                    if tag == f'{_W_NS}t':
+                        parts.append(element.text or '')
+                    elif tag == f'{_W_NS}tab':
+                        parts.append(' ')
+                    elif tag in (f'{_W_NS}br', f'{_W_NS}cr'):
+                        parts.append('\n')
+                    elif tag == f'{_W_NS}p':
+                        parts.append('\n')
+                        yield "".join(parts)
+                        parts = []
+                    # Drop finished children of <w:body> so memory stays flat
+                    if len(stack) == 2:
+                        stack[-1].clear()
+            except ET.ParseError as e:
+                raise DocumentReadError(f"Invalid DOCX document: {e}")
+            if parts:
+                yield "".join(parts)
+
+
+class TextReader(DocumentReader):
+    """Plain text, decoded incrementally in chunks"""
+
+    source_type = "txt"
+    extensions = ("txt", "text", "md")
+
+    # Bytes looked at to tell UTF-8 from legacy Vietnamese Windows text
+    SNIFF_BYTES = 64 * 1024
+
+    @staticmethod
+    def sniff_encoding(head: bytes) -> str:
+        """BOM, else UTF-8 if the head decodes, else Windows-1258 (Vietnamese)"""
+        if head.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return 'utf-16'
+        try:
+            # final=False: a character cut off at the end of the head is fine
+            codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            return 'cp1258'
+
+    def iter_texts(self, path: str) -> Iterator[str]:
+        with open(path, 'rb') as f:
+            head = f.read(self.SNIFF_BYTES)
+            decoder = codecs.getincrementaldecoder(self.sniff_encoding(head))(errors='replace')
+            chunk = head
+            while chunk:
+                yield decoder.decode(chunk)
+                chunk = f.read(READ_CHUNK_SIZE)
+            yield decoder.decode(b"", final=True)
+
+
+_READERS: Dict[str, DocumentReader] = {}
+
+
+def register_reader(reader: DocumentReader) -> DocumentReader:
+    """Make a reader available under its source type and file extensions"""
+    for key in (reader.source_type,) + tuple(reader.extensions):
+        _READERS[key.lower()] = reader
+    return reader
+
+
+def get_reader(source_type: str) -> Optional[DocumentReader]:
+    """The reader for a source type or file extension, or None"""
+    return _READERS.get((source_type or "").lower().lstrip("."))
+
+
+def read_document(reader: DocumentReader, path: str, budget: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+    """Cleaned text (up to ``budget`` characters) and metadata of a document
+
+    Blocking; run it in a thread. Reading stops once the budget is met.
+    """
+    try:
+        metadata = reader.metadata(path)
+        texts = reader.iter_texts(path)
+        try:
+            content = join_within_budget(text_normalizer.stream(texts, NORMALIZE_BLOCK), budget)
+        finally:
+            texts.close()
+    except zipfile.BadZipFile as e:
+        raise DocumentReadError(f"Corrupt {reader.source_type.upper()} archive: {e}")
+    return content, metadata
+
+
+for _reader in (EpubReader(), DocxReader(), TextReader()):
+    register_reader(_reader)
+
+# Export for easy import
+__all__ = ['get_reader', 'register_reader', 'read_document', 'DocumentReader', 'DocumentReadError',
+           'EpubReader', 'DocxReader', 'TextReader']
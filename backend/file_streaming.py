@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Streaming file responses with HTTP Range and conditional request support
+Used for video downloads/previews by both the MVP server and the FastAPI app
+"""
+
+import os
+import mimetypes
+import logging
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple, Mapping
+
+logger = logging.getLogger(__name__)
+
+try:
+    import anyio
+    from starlette.responses import Response
+    STARLETTE_AVAILABLE = True
+except ImportError:
+    STARLETTE_AVAILABLE = False
+
+CHUNK_SIZE = 256 * 1024
+
+# Rendered videos only change when a job is re-rendered; clients revalidate
+# with the ETag after an hour instead of downloading again
+CACHE_CONTROL = os.environ.get('MEDIA_CACHE_CONTROL', 'public, max-age=3600')
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies outside the file"""
+
+
+class FilePlan:
+    """What to send for a file request: status, headers and the byte span"""
+
+    def __init__(self, status: int, headers: Dict[str, str], offset: int = 0, length: int = 0):
+        self.status = status
+        self.headers = headers
+        self.offset = offset
+        self.length = length
+
+    @property
+    def has_body(self) -> bool:
+        return self.status in (200, 206) and self.length > 0
+
+
+def file_validators(stat: os.stat_result) -> Tuple[str, str]:
+    """Strong ETag and Last-Modified value for a file"""
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    return etag, formatdate(stat.st_mtime, usegmt=True)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a ``Range`` header into an inclusive ``(start, end)``
+
+    Returns None when the whole file should be sent (no header, a unit
+    other than bytes, or a multi-range request, which we answer with the
+    full body as RFC 9110 allows). Raises RangeNotSatisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    spec = header[len("bytes="):].strip()
+    start_text, _, end_text = spec.partition("-")
+    try:
+        if not start_text:
+            # Suffix range: the last N bytes
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(0, size - suffix), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+
+def _not_modified(headers: Mapping[str, str], etag: str, mtime: float) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match:
+        return if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def plan_file_response(path: str, headers: Mapping[str, str], filename: Optional[str] = None,
+                       inline: bool = True, media_type: Optional[str] = None) -> FilePlan:
+    """Decide status, headers and byte span for serving ``path``
+
+    ``headers`` is a case-insensitive mapping of the request headers (the
+    handler's ``self.headers`` or Starlette's ``request.headers``). Raises
+    FileNotFoundError when the file is missing.
+    """
+    stat = os.stat(path)
+    etag, last_modified = file_validators(stat)
+    response_headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": CACHE_CONTROL,
+        "Access-Control-Expose-Headers": "Accept-Ranges, Content-Length, Content-Range, ETag"
+    }
+
+    if _not_modified(headers, etag, stat.st_mtime):
+        return FilePlan(304, response_headers)
+
+    response_headers["Content-Type"] = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if filename:
+        disposition = "inline" if inline else "attachment"
+        response_headers["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+
+    size = stat.st_size
+    byte_range = None
+    if_range = headers.get("if-range")
+    # A stale If-Range means the client's partial copy is outdated: send it all
+    if not if_range or if_range.strip() in (etag, last_modified):
+        try:
+            byte_range = parse_range(headers.get("range"), size)
+        except RangeNotSatisfiable:
+            response_headers.pop("Content-Type", None)
+            response_headers.pop("Content-Disposition", None)
+            response_headers["Content-Range"] = f"bytes */{size}"
+            response_headers["Content-Length"] = "0"
+            return FilePlan(416, response_headers)
+
+    if byte_range is None:
+        response_headers["Content-Length"] = str(size)
+        return FilePlan(200, response_headers, 0, size)
+
+    start, end = byte_range
+    response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response_headers["Content-Length"] = str(end - start + 1)
+    return FilePlan(206, response_headers, start, end - start + 1)
+
+
+def send_file(sock, path: str, offset: int, length: int) -> int:
+    """Write a byte span of ``path`` to a connected socket
+
+    ``socket.sendfile`` uses ``os.sendfile`` where the platform has it, so
+    the kernel copies straight from the page cache to the socket; elsewhere
+    it falls back to chunked ``send`` without loading the whole file.
+    """
+    with open(path, "rb") as f:
+        return sock.sendfile(f, offset, length)
+
+
+if STARLETTE_AVAILABLE:
+
+    class RangeFileResponse(Response):
+        """ASGI file response honouring Range, If-Range and conditional headers
+
+        Uses the ``http.response.zerocopysend`` extension when the server
+        offers it, otherwise streams the span in CHUNK_SIZE reads.
+        """
+
+        def __init__(self, path: str, request_headers: Mapping[str, str], method: str = "GET",
+                     filename: Optional[str] = None, inline: bool = True, media_type: Optional[str] = None):
+            self.path = path
+            self.plan = plan_file_response(path, request_headers, filename, inline, media_type)
+            self.send_body = method != "HEAD" and self.plan.has_body
+            super().__init__(status_code=self.plan.status, headers=self.plan.headers)
+
+        async def __call__(self, scope, receive, send):
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if not self.send_body:
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            offset, remaining = self.plan.offset, self.plan.length
+            with open(self.path, "rb") as f:
+                if "http.response.zerocopysend" in scope.get("extensions", {}):
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": f.fileno(),
+                        "offset": offset,
+                        "count": remaining
+                    })
+                    return
+
+                f.seek(offset)
+                while remaining > 0:
+                    chunk = await anyio.to_thread.run_sync(f.read, min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank underneath us; end the body so the client sees a short read
+                logger.warning(f"⚠️ {self.path} ended {remaining} bytes early")
+                await send({"type": "http.response.body", "body": b""})
+
+
+# Export for easy import
+__all__ = ['plan_file_response', 'send_file', 'parse_range', 'file_validators',
+           'FilePlan', 'RangeNotSatisfiable', 'STARLETTE_AVAILABLE']
+if STARLETTE_AVAILABLE:
+    __all__.append('RangeFileResponse')
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+On-disk HTTP cache for URL sources
+Honours Cache-Control, revalidates with ETag/Last-Modified and keeps parsed results
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Callable, Awaitable, Mapping
+
+from http_client import http_client, UnsupportedContent
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_DIR = os.environ.get('HTTP_CACHE_DIR', os.path.join('data', 'http_cache'))
+HTTP_CACHE_MAX_BYTES = int(os.environ.get('HTTP_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Pages without explicit freshness but with Last-Modified stay fresh for
+# 10% of their age (RFC 9111 section 4.2.2), capped at a day
+HEURISTIC_FRACTION = 0.1
+MAX_HEURISTIC_LIFETIME = 24 * 3600
+
+_DIRECTIVE_RE = re.compile(r'([a-zA-Z-]+)\s*(?:=\s*"?([^",]*)"?)?')
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def cache_directives(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse ``Cache-Control`` into ``{directive: argument}``"""
+    return {name.lower(): argument for name, argument in _DIRECTIVE_RE.findall(value or "")}
+
+
+def freshness_lifetime(headers: Mapping[str, str], now: float) -> Optional[float]:
+    """Seconds a response stays fresh; None when it must not be stored
+
+    0 means "store, but revalidate before every use" (``no-cache`` or no
+    freshness information at all).
+    """
+    directives = cache_directives(headers.get("cache-control"))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+
+    age = 0.0
+    try:
+        age = max(0.0, float(headers.get("age", 0)))
+    except ValueError:
+        pass
+
+    # We are a shared cache, so s-maxage wins over max-age
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name):
+            try:
+                return max(0.0, int(directives[name]) - age)
+            except ValueError:
+                return 0.0
+
+    date = _http_date(headers.get("date")) or now
+    expires = _http_date(headers.get("expires"))
+    if headers.get("expires") is not None:
+        # An invalid Expires (e.g. "0") means already expired
+        return max(0.0, expires - date) if expires else 0.0
+
+    last_modified = _http_date(headers.get("last-modified"))
+    if last_modified and last_modified < date:
+        return min((date - last_modified) * HEURISTIC_FRACTION, MAX_HEURISTIC_LIFETIME)
+    return 0.0
+
+
+class BufferedParser:
+    """Parser adapter for whole-body parse functions: buffers, parses on close"""
+
+    def __init__(self, parse: Callable[[bytes], Any]):
+        self.parse = parse
+        self._parts = []
+
+    def feed(self, chunk: bytes) -> bool:
+        self._parts.append(chunk)
+        return False
+
+    def close(self) -> Any:
+        return self.parse(b"".join(self._parts))
+
+
+class HttpCache:
+    """Response bodies as files, an SQLite index, and parsed results per variant
+
+    ``variant`` names the parser and its settings; a parsed result is reused
+    only while the stored validator (ETag, Last-Modified or body digest) is
+    unchanged, so a 304 skips both the download and the HTML parsing. The
+    total size is bounded; least recently used entries are evicted first.
+
+    Parsers are objects with ``feed(chunk) -> bool`` and ``close() -> result``
+    (see StreamingExtractor / BufferedParser); ``feed`` returning True stops
+    the download early. Such a body is stored as incomplete and is only
+    reused through its own parsed result.
+    """
+
+    def __init__(self, root: str = HTTP_CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self.path = os.path.join(root, "index.db")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.parsed_hits = 0
+        self.evictions = 0
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body_file TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                validator TEXT NOT NULL,
+                fresh_until REAL NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS parsed (
+                url TEXT NOT NULL,
+                variant TEXT NOT NULL,
+                validator TEXT NOT NULL,
+                result TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                PRIMARY KEY (url, variant)
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access);
+        """)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(responses)")}
+        if "charset" not in columns:
+            conn.execute("ALTER TABLE responses ADD COLUMN charset TEXT")
+        if "complete" not in columns:
+            conn.execute("ALTER TABLE responses ADD COLUMN complete INTEGER NOT NULL DEFAULT 1")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    async def fetch_parsed(self, url: str, variant: str, make_parser: Callable[[Optional[str]], Any],
+                           on_pdf: Optional[Callable[[str, str], Awaitable[Any]]] = None) -> Any:
+        """Parsed content of ``url``, downloading and parsing only when needed
+
+        ``make_parser(charset)`` builds a parser for an HTML body; feeding
+        happens on a worker thread and the result must be JSON-serialisable.
+        A PDF is spooled to disk and handed to ``on_pdf(path, sha256)``
+        (its text is cached by content hash, not here); the spool file is
+        removed afterwards. Raises UnsupportedContent, ResponseTooLarge and
+        ``httpx.HTTPError``.
+        """
+        now = time.time()
+        entry = self._lookup(url)
+        if entry is not None and entry["fresh_until"] > now:
+            self._count("hits")
+            return await self._parsed(entry, variant, make_parser, on_pdf)
+
+        request_headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        spooled = None
+        async with http_client.open_document(url, headers=request_headers) as document:
+            if document.kind == "not_modified":
+                if entry is None:
+                    raise ValueError("Unexpected 304 for an unconditional request")
+                self._count("revalidated")
+                lifetime = freshness_lifetime(document.headers, now)
+                self._connection().execute(
+                    "UPDATE responses SET fresh_until = ?, last_access = ? WHERE url = ?",
+                    (now + (lifetime or 0.0), now, url)
+                )
+            elif document.kind == "pdf":
+                self._count("misses")
+                if on_pdf is None:
+                    raise UnsupportedContent(document.content_type)
+                spooled = await document.spool()
+            else:
+                self._count("misses")
+                parser = make_parser(document.charset)
+                parts = []
+                async for chunk in document.iter_html():
+                    parts.append(chunk)
+                    if await asyncio.to_thread(parser.feed, chunk):
+                        # Enough text for this parser: stop downloading
+                        document.truncated = True
+                        break
+                lifetime = freshness_lifetime(document.headers, now)
+
+        if document.kind == "not_modified":
+            return await self._parsed(entry, variant, make_parser, on_pdf)
+        if spooled is not None:
+            path, _, sha256 = spooled
+            try:
+                return await on_pdf(path, sha256)
+            finally:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        result = await asyncio.to_thread(parser.close)
+        if lifetime is not None and document.status_code == 200:
+            await asyncio.to_thread(self._store, url, document, b"".join(parts), lifetime, now, variant, result)
+        return result
+
+    def _lookup(self, url: str) -> Optional[sqlite3.Row]:
+        return self._connection().execute("SELECT * FROM responses WHERE url = ?", (url,)).fetchone()
+
+    async def _parsed(self, entry: sqlite3.Row, variant: str, make_parser, on_pdf) -> Any:
+        url = entry["url"]
+        conn = self._connection()
+        conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+        row = conn.execute(
+            "SELECT result FROM parsed WHERE url = ? AND variant = ? AND validator = ?",
+            (url, variant, entry["validator"])
+        ).fetchone()
+        if row is not None:
+            self._count("parsed_hits")
+            return json.loads(row["result"])
+        if entry["complete"]:
+            try:
+                return await asyncio.to_thread(self._parse_stored, entry, variant, make_parser)
+            except FileNotFoundError:
+                pass  # Body evicted by another process
+        # Cut-off or missing body: forget the entry and download in full
+        self._remove(url)
+        return await self.fetch_parsed(url, variant, make_parser, on_pdf)
+
+    def _parse_stored(self, entry: sqlite3.Row, variant: str, make_parser) -> Any:
+        with open(os.path.join(self.root, entry["body_file"]), "rb") as f:
+            body = f.read()
+        parser = make_parser(entry["charset"])
+        parser.feed(body)
+        result = parser.close()
+        self._save_parsed(entry["url"], variant, entry["validator"], result)
+        return result
+
+    def _store(self, url, document, body, lifetime, now, variant, result):
+        etag = document.headers.get("etag")
+        last_modified = document.headers.get("last-modified")
+        validator = etag or last_modified or hashlib.sha256(body).hexdigest()
+
+        body_file = hashlib.sha256(url.encode("utf-8")).hexdigest() + ".body"
+        target = os.path.join(self.root, body_file)
+        temp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, "wb") as f:
+            f.write(body)
+        os.replace(temp, target)
+
+        conn = self._connection()
+        conn.execute("DELETE FROM parsed WHERE url = ?", (url,))
+        conn.execute(
+            "INSERT OR REPLACE INTO responses "
+            "(url, body_file, etag, last_modified, validator, fresh_until, size, last_access, charset, complete) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, body_file, etag, last_modified, validator, now + lifetime, len(body), now,
+             document.charset, 0 if document.truncated else 1)
+        )
+        self._save_parsed(url, variant, validator, result)
+        self._evict()
+
+    def _save_parsed(self, url: str, variant: str, validator: str, result: Any):
+        try:
+            data = json.dumps(result, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Not caching parsed result for {url}: {e}")
+            return
+        self._connection().execute(
+            "INSERT OR REPLACE INTO parsed (url, variant, validator, result, size) VALUES (?, ?, ?, ?, ?)",
+            (url, variant, validator, data, len(data.encode("utf-8")))
+        )
+
+    def _remove(self, url: str):
+        conn = self._connection()
+        row = conn.execute("SELECT body_file FROM responses WHERE url = ?", (url,)).fetchone()
+        conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+        conn.execute("DELETE FROM parsed WHERE url = ?", (url,))
+        if row is not None:
+            try:
+                os.remove(os.path.join(self.root, row["body_file"]))
+            except OSError:
+                pass
+
+    def total_bytes(self) -> int:
+        row = self._connection().execute(
+            "SELECT (SELECT COALESCE(SUM(size), 0) FROM responses) + "
+            "(SELECT COALESCE(SUM(size), 0) FROM parsed)"
+        ).fetchone()
+        return row[0]
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits ``max_bytes``"""
+        excess = self.total_bytes() - self.max_bytes
+        if excess <= 0:
+            return
+        rows = self._connection().execute(
+            "SELECT r.url, r.size + COALESCE((SELECT SUM(p.size) FROM parsed p WHERE p.url = r.url), 0) "
+            "FROM responses r ORDER BY r.last_access"
+        )
+        victims = []
+        for url, size in rows:
+            if excess <= 0:
+                break
+            victims.append(url)
+            excess -= size
+        for url in victims:
+            self._remove(url)
+            self._count("evictions")
+        if victims:
+            logger.info(f"🧹 HTTP cache evicted {len(victims)} entries")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.revalidated + self.misses
+            stats = {
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "parsed_hits": self.parsed_hits,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.revalidated) / lookups, 3) if lookups else None
+            }
+        stats["bytes"] = self.total_bytes()
+        return stats
+
+
+# Initialize shared cache
+http_cache = HttpCache()
+
+# Export for easy import
+__all__ = ['http_cache', 'HttpCache', 'BufferedParser', 'freshness_lifetime', 'cache_directives']
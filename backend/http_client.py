@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Shared async HTTP client for fetching pages and documents
+Connection-pooled httpx clients with keep-alive, split timeouts and a per-host cap
+"""
+
+import os
+import asyncio
+import threading
+import weakref
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Mapping, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from multipart_upload import SpoolWriter, UploadTooLarge, MAX_UPLOAD_BYTES, UPLOAD_DIR, READ_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (httpx negotiates HTTP/2 only when h2 is installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 30))
+MAX_CONNECTIONS = int(os.environ.get('HTTP_MAX_CONNECTIONS', 100))
+MAX_KEEPALIVE = int(os.environ.get('HTTP_MAX_KEEPALIVE', 20))
+MAX_PER_HOST = int(os.environ.get('HTTP_MAX_PER_HOST', 6))
+
+# Hard caps on what a URL source may download: HTML beyond the cap is cut
+# off (the text we need is near the top), a PDF over its cap is refused
+MAX_HTML_BYTES = int(os.environ.get('FETCH_MAX_HTML_BYTES', 5 * 1024 * 1024))
+MAX_PDF_BYTES = int(os.environ.get('FETCH_MAX_PDF_BYTES', MAX_UPLOAD_BYTES))
+
+# Bytes looked at before deciding what a response is
+SNIFF_BYTES = 512
+
+_BINARY_MAGIC = (
+    b"\x89PNG", b"\xff\xd8\xff", b"GIF8", b"PK\x03\x04", b"\x1a\x45\xdf\xa3", b"OggS", b"ID3",
+    b"RIFF", b"\x1f\x8b", b"fLaC"
+)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'vi,en;q=0.8'
+}
+
+
+class HostLimiter:
+    """Caps concurrent requests per host across every event loop
+
+    The FastAPI loop and each scheduler event loop have their own httpx
+    pool, so the cap uses threading semaphores; waiting polls (as
+    StageLimiter does) so no loop is ever blocked.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._active: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._semaphores[host] = threading.BoundedSemaphore(self.limit)
+        delay = 0.005
+        while not semaphore.acquire(blocking=False):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        with self._lock:
+            self._active[host] = self._active.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[host] -= 1
+                if not self._active[host]:
+                    del self._active[host]
+            semaphore.release()
+
+    def busy_hosts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._active)
+
+
+class UnsupportedContent(Exception):
+    """The URL points at something other than HTML or PDF (HTTP 415)"""
+
+    def __init__(self, content_type: str):
+        super().__init__(f"Unsupported content type: {content_type or 'unknown'}")
+        self.content_type = content_type
+
+
+class ResponseTooLarge(Exception):
+    """The document exceeds the download cap (HTTP 413)"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Document exceeds the {limit // (1024 * 1024)} MB download limit")
+        self.limit = limit
+
+
+def sniff_kind(content_type: Optional[str], head: bytes) -> Optional[str]:
+    """``"pdf"``, ``"html"`` or None (unsupported) from the header and magic bytes
+
+    Magic bytes win over the header: servers label PDFs as
+    application/octet-stream and error pages as application/pdf.
+    """
+    mime = (content_type or "").split(";")[0].strip().lower()
+    if head.lstrip()[:5] == b"%PDF-":
+        return "pdf"
+    if mime == "application/pdf":
+        # Readers accept junk before the signature within the first KiB
+        return "pdf" if head.find(b"%PDF-", 0, 1024) >= 0 else None
+    if head.startswith(_BINARY_MAGIC) or head[4:8] == b"ftyp":
+        return None
+    if mime.startswith(("video/", "audio/", "image/", "font/")) or mime in (
+            "application/zip", "application/octet-stream", "application/x-msdownload"):
+        # Declared binary with no recognisable PDF signature
+        return "html" if head.lstrip()[:1] == b"<" else None
+    return "html"
+
+
+def _charset(content_type: Optional[str]) -> Optional[str]:
+    for param in (content_type or "").split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset" and value:
+            return value.strip('"\' ').lower()
+    return None
+
+
+class DocumentStream:
+    """An open response whose kind is known; read it with one of the methods"""
+
+    def __init__(self, response: httpx.Response, head: bytes, chunks):
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.content_type = response.headers.get("content-type", "")
+        self.charset = _charset(self.content_type)
+        self.kind = "not_modified" if self.status_code == 304 else sniff_kind(self.content_type, head)
+        self.truncated = False
+        self._head = head
+        self._chunks = chunks
+
+    async def iter_html(self, max_bytes: int = MAX_HTML_BYTES):
+        """Body chunks up to ``max_bytes``; sets ``truncated`` when cut off"""
+        received = 0
+        pending = [self._head] if self._head else []
+        while True:
+            for chunk in pending:
+                if received + len(chunk) > max_bytes:
+                    chunk = chunk[:max_bytes - received]
+                    self.truncated = True
+                received += len(chunk)
+                if chunk:
+                    yield chunk
+                if self.truncated:
+                    return
+            try:
+                pending = [await self._chunks.__anext__()]
+            except StopAsyncIteration:
+                return
+
+    async def spool(self, spool_dir: str = UPLOAD_DIR, max_bytes: int = MAX_PDF_BYTES) -> Tuple[str, int, str]:
+        """Write the body to a spool file; returns ``(path, size, sha256)``"""
+        length = self.headers.get("content-length")
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise ResponseTooLarge(max_bytes)
+        writer = SpoolWriter(spool_dir, max_bytes)
+        try:
+            writer.write(self._head)
+            async for chunk in self._chunks:
+                writer.write(chunk)
+            return writer.path, writer.size, writer.close()
+        except UploadTooLarge:
+            writer.discard()
+            raise ResponseTooLarge(max_bytes)
+        except BaseException:
+            writer.discard()
+            raise
+
+
+class AsyncHttpClient:
+    """One pooled ``httpx.AsyncClient`` per event loop, created on first use
+
+    httpx clients are bound to the loop they were created on; keeping one
+    per loop gives every loop keep-alive connections without sharing
+    sockets between threads.
+    """
+
+    def __init__(self, connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT,
+                 max_connections: int = MAX_CONNECTIONS, max_keepalive: int = MAX_KEEPALIVE,
+                 max_per_host: int = MAX_PER_HOST):
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive)
+        self.host_limiter = HostLimiter(max_per_host)
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.truncated = 0
+        self.refused = 0
+
+    def client(self) -> httpx.AsyncClient:
+        """The client of the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    headers=DEFAULT_HEADERS,
+                    timeout=self.timeout,
+                    limits=self.limits,
+                    http2=HTTP2_AVAILABLE,
+                    follow_redirects=True
+                )
+                self._clients[loop] = client
+            return client
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, headers: Optional[Mapping[str, str]] = None):
+        """Open a streamed response while holding a slot for its host"""
+        host = urlsplit(url).netloc.lower()
+        async with self.host_limiter.slot(host):
+            with self._lock:
+                self.requests += 1
+            try:
+                async with self.client().stream(method, url, headers=headers) as response:
+                    yield response
+            except httpx.HTTPError:
+                with self._lock:
+                    self.errors += 1
+                raise
+
+    async def get(self, url: str, headers: Optional[Mapping[str, str]] = None) -> httpx.Response:
+        """GET ``url`` and read the body; raises ``httpx.HTTPError`` on failure
+
+        A 304 answer to a conditional request is returned, not raised.
+        """
+        async with self.stream("GET", url, headers=headers) as response:
+            await response.aread()
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+
+    @asynccontextmanager
+    async def open_document(self, url: str, headers: Optional[Mapping[str, str]] = None):
+        """Stream ``url`` and sniff what it is from the first bytes
+
+        Yields a DocumentStream (``kind`` is "html", "pdf", "not_modified"
+        for a 304, or None). Raises UnsupportedContent before downloading
+        anything else when the response is neither HTML nor PDF, and
+        ``httpx.HTTPError`` on HTTP errors.
+        """
+        async with self.stream("GET", url, headers=headers) as response:
+            if response.status_code != 304:
+                response.raise_for_status()
+            chunks = response.aiter_bytes(READ_CHUNK_SIZE)
+            head = b""
+            if response.status_code != 304:
+                async for chunk in chunks:
+                    head += chunk
+                    if len(head) >= SNIFF_BYTES:
+                        break
+            document = DocumentStream(response, head, chunks)
+            if document.kind is None:
+                with self._lock:
+                    self.refused += 1
+                raise UnsupportedContent(document.content_type)
+            yield document
+            if document.truncated:
+                with self._lock:
+                    self.truncated += 1
+
+    async def aclose(self):
+        """Close the running loop's client (call from that loop on shutdown)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "http2": HTTP2_AVAILABLE,
+                "clients": len(self._clients),
+                "requests": self.requests,
+                "errors": self.errors,
+                "truncated": self.truncated,
+                "refused": self.refused,
+                "busy_hosts": self.host_limiter.busy_hosts()
+            }
+
+
+# Initialize shared client (per-loop httpx clients are created lazily)
+http_client = AsyncHttpClient()
+
+# Export for easy import
+__all__ = ['http_client', 'AsyncHttpClient', 'HostLimiter', 'DocumentStream', 'UnsupportedContent',
+           'ResponseTooLarge', 'sniff_kind', 'HTTP2_AVAILABLE']
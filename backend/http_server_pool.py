@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Concurrent HTTP server for the MVP handler
+Serves each connection from a bounded thread pool instead of one at a time
+"""
+
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Response sent when both the worker pool and the wait queue are full
+_OVERLOADED_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Type: application/json; charset=utf-8\r\n"
+    b"Content-Length: 56\r\n"
+    b"Retry-After: 1\r\n"
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+    b'{"error": true, "status_code": 503, "message": "Busy"}\r\n'
+)
+
+
+class ServerMetrics:
+    """Thread-safe counters describing connection queueing"""
+
+    def __init__(self, max_workers: int, max_queued: int):
+        self._lock = threading.Lock()
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.accepted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.queued = 0
+        self.active = 0
+        self.peak_queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def on_enqueue(self):
+        with self._lock:
+            self.accepted += 1
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+
+    def on_reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def on_start(self, waited: float):
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def on_finish(self):
+        with self._lock:
+            self.active -= 1
+            self.completed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serializable view of the counters"""
+        with self._lock:
+            started = self.completed + self.active
+            return {
+                "max_workers": self.max_workers,
+                "max_queued": self.max_queued,
+                "active_connections": self.active,
+                "queued_connections": self.queued,
+                "peak_queued_connections": self.peak_queued,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "avg_queue_wait_ms": round(self.total_wait / started * 1000, 2) if started else 0.0,
+                "max_queue_wait_ms": round(self.max_wait * 1000, 2)
+            }
+
+
+class ThreadPoolHTTPServer(HTTPServer):
+    """HTTPServer that hands accepted connections to a bounded thread pool
+
+    At most ``max_workers`` connections are served at once and up to
+    ``max_queued`` more wait for a free worker. Anything beyond that is
+    answered with a 503 straight from the accept loop so a burst of slow
+    requests cannot pile up unbounded.
+    """
+
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, max_workers: int = 32, max_queued: int = 256):
+        self.max_workers = max(1, max_workers)
+        self.max_queued = max(0, max_queued)
+        self.metrics = ServerMetrics(self.max_workers, self.max_queued)
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queued)
+        self._detached = set()
+        self._detached_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="mvp-http"
+        )
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        """Queue the connection for a pool worker, or shed it when full"""
+        if not self._slots.acquire(blocking=False):
+            self.metrics.on_reject()
+            logger.warning(f"⚠️ Connection from {client_address[0]} rejected: server busy")
+            try:
+                request.sendall(_OVERLOADED_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+
+        self.metrics.on_enqueue()
+        self._executor.submit(self._process_in_worker, request, client_address, time.monotonic())
+
+    def _process_in_worker(self, request, client_address, enqueued_at: float):
+        self.metrics.on_start(time.monotonic() - enqueued_at)
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.metrics.on_finish()
+            self._slots.release()
+
+    def detach_request(self, request):
+        """Keep ``request`` open after its handler returns
+
+        Used by long-lived streams (SSE) that hand the socket to another
+        thread so the pool worker is freed immediately.
+        """
+        with self._detached_lock:
+            self._detached.add(request)
+
+    def shutdown_request(self, request):
+        with self._detached_lock:
+            if request in self._detached:
+                self._detached.discard(request)
+                return
+        super().shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=False)
+
+
+def create_server(server_address, handler_class) -> ThreadPoolHTTPServer:
+    """Build a pooled server using the MVP_* environment settings"""
+    cpu_count = os.cpu_count() or 1
+    max_workers = int(os.environ.get('MVP_MAX_WORKERS', min(64, cpu_count * 8)))
+    max_queued = int(os.environ.get('MVP_MAX_QUEUED', max_workers * 8))
+    return ThreadPoolHTTPServer(
+        server_address,
+        handler_class,
+        max_workers=max_workers,
+        max_queued=max_queued
+    )
+
+
+__all__ = ['ThreadPoolHTTPServer', 'ServerMetrics', 'create_server']
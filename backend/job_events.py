@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events for job progress
+Pushes progress deltas instead of having clients poll the full job
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+import logging
+from typing import Dict, Any, Optional, List, Tuple
+
+from job_store import job_store, TERMINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Fields whose change triggers a progress event (ETA is derived, not tracked)
+TRACKED_FIELDS = ("status", "current_step", "progress")
+
+RETRY_MS = 3000
+HEARTBEAT_INTERVAL = 15.0
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> bytes:
+    """Encode one SSE message with compact JSON data"""
+    payload = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+def retry_directive() -> bytes:
+    """Tell EventSource how long to wait before reconnecting"""
+    return f"retry: {RETRY_MS}\n\n".encode("utf-8")
+
+
+def heartbeat() -> bytes:
+    """SSE comment line that keeps proxies from timing out the stream"""
+    return b": ping\n\n"
+
+
+def progress_snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+    """The small subset of a job that progress events carry"""
+    return {field: job.get(field) for field in TRACKED_FIELDS}
+
+
+def estimate_eta(job: Dict[str, Any]) -> Optional[int]:
+    """Seconds left, extrapolated linearly from elapsed time and progress"""
+    progress = job.get("progress") or 0
+    started_at = job.get("started_at")
+    if not started_at or not 0 < progress < 100:
+        return None
+    elapsed = time.time() - started_at
+    return int(elapsed * (100 - progress) / progress)
+
+
+def next_events(job: Dict[str, Any], last: Optional[Dict[str, Any]]) -> Tuple[List[bytes], Dict[str, Any], bool]:
+    """Compute the events needed to move a client from ``last`` to ``job``
+
+    Returns ``(events, new_last, done)``. Only changed fields are sent, so a
+    client that missed intermediate states simply receives the latest one.
+    """
+    snapshot = progress_snapshot(job)
+    events = []
+    if snapshot != last:
+        delta = {k: v for k, v in snapshot.items() if last is None or last.get(k) != v}
+        delta["eta_seconds"] = estimate_eta(job)
+        events.append(format_sse("progress", delta))
+
+    done = snapshot["status"] in TERMINAL_STATUSES
+    if done:
+        if snapshot["status"] == "completed":
+            events.append(format_sse("result", {"job_id": job.get("id"), "result": job.get("result")}))
+        else:
+            events.append(format_sse("error", {"job_id": job.get("id"), "error": job.get("error")}))
+    return events, snapshot, done
+
+
+class _Subscriber:
+    def __init__(self, sock: socket.socket, job_id: str):
+        self.sock = sock
+        self.job_id = job_id
+        self.last: Optional[Dict[str, Any]] = None
+        self.buffer = bytearray(retry_directive())
+        self.blocked_since: Optional[float] = None
+        self.last_write = time.monotonic()
+        self.done = False
+
+
+class SSEBroadcaster:
+    """Single thread that owns every detached SSE socket
+
+    Sockets are non-blocking. A subscriber only gets a new event once its
+    previous one has been fully written, so a slow reader is skipped until
+    it catches up (and then sees just the latest state). A reader stuck for
+    longer than ``slow_client_timeout`` is disconnected.
+    """
+
+    def __init__(self, tick: float = 1.0, slow_client_timeout: float = 10.0, max_subscribers: int = 2000):
+        self.tick = tick
+        self.slow_client_timeout = slow_client_timeout
+        self.max_subscribers = max_subscribers
+        self._subscribers: List[_Subscriber] = []
+        self._incoming: List[_Subscriber] = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self.dropped_slow = 0
+
+    @classmethod
+    def from_env(cls) -> "SSEBroadcaster":
+        return cls(
+            tick=float(os.environ.get('SSE_TICK', 1.0)),
+            slow_client_timeout=float(os.environ.get('SSE_SLOW_CLIENT_TIMEOUT', 10.0)),
+            max_subscribers=int(os.environ.get('SSE_MAX_SUBSCRIBERS', 2000))
+        )
+
+    def subscribe(self, sock: socket.socket, job_id: str) -> bool:
+        """Take ownership of ``sock`` and stream ``job_id`` to it"""
+        with self._lock:
+            if len(self._subscribers) + len(self._incoming) >= self.max_subscribers:
+                return False
+            sock.setblocking(False)
+            self._incoming.append(_Subscriber(sock, job_id))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sse-broadcaster", daemon=True)
+                self._thread.start()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers) + len(self._incoming),
+                "dropped_slow_clients": self.dropped_slow
+            }
+
+    def _run(self):
+        version = 0
+        while True:
+            with self._lock:
+                self._subscribers.extend(self._incoming)
+                self._incoming.clear()
+                subscribers = list(self._subscribers)
+
+            jobs: Dict[str, Optional[Dict[str, Any]]] = {}
+            for sub in subscribers:
+                try:
+                    self._service(sub, jobs)
+                except Exception as e:
+                    logger.error(f"❌ SSE subscriber error for job {sub.job_id}: {e}")
+                    self._close(sub)
+
+            with self._lock:
+                self._subscribers = [s for s in self._subscribers if s.sock is not None]
+                pending_writes = any(s.buffer for s in self._subscribers)
+
+            # Wake on local job changes; poll faster while writes are pending
+            version = job_store.wait_for_change(version, 0.1 if pending_writes else self.tick)
+
+    def _service(self, sub: _Subscriber, jobs: Dict[str, Optional[Dict[str, Any]]]):
+        now = time.monotonic()
+        self._flush(sub, now)
+        if sub.sock is None:
+            return
+
+        if sub.buffer:
+            if sub.blocked_since and now - sub.blocked_since > self.slow_client_timeout:
+                logger.warning(f"⚠️ Dropping slow SSE client for job {sub.job_id}")
+                self.dropped_slow += 1
+                self._close(sub)
+            return
+
+        if sub.done:
+            self._close(sub)
+            return
+
+        if sub.job_id not in jobs:
+            jobs[sub.job_id] = job_store.get(sub.job_id)
+        job = jobs[sub.job_id]
+        if job is None:
+            sub.buffer += format_sse("error", {"job_id": sub.job_id, "error": "Job not found"})
+            sub.done = True
+        else:
+            events, sub.last, sub.done = next_events(job, sub.last)
+            for event in events:
+                sub.buffer += event
+
+        if not sub.buffer and now - sub.last_write > HEARTBEAT_INTERVAL:
+            sub.buffer += heartbeat()
+        self._flush(sub, now)
+        if sub.done and not sub.buffer:
+            self._close(sub)
+
+    def _flush(self, sub: _Subscriber, now: float):
+        if not sub.buffer:
+            return
+        try:
+            sent = sub.sock.send(sub.buffer)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._close(sub)
+            return
+        del sub.buffer[:sent]
+        if sent:
+            sub.last_write = now
+        sub.blocked_since = (sub.blocked_since or now) if sub.buffer else None
+
+    def _close(self, sub: _Subscriber):
+        if sub.sock is None:
+            return
+        try:
+            sub.sock.close()
+        except OSError:
+            pass
+        sub.sock = None
+
+
+# Initialize broadcaster (thread starts with the first subscriber)
+sse_broadcaster = SSEBroadcaster.from_env()
+
+# Export for easy import
+__all__ = ['sse_broadcaster', 'SSEBroadcaster', 'next_events', 'format_sse', 'retry_directive', 'heartbeat']
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Recovery of interrupted jobs
+Heartbeats the jobs this process owns and re-queues jobs abandoned by others
+"""
+
+import os
+import threading
+import logging
+from typing import Callable, Iterable
+
+from job_store import JobStore
+
+logger = logging.getLogger(__name__)
+
+
+class JobRecovery:
+    """Background thread that keeps owned jobs alive and resumes stale ones
+
+    A job in an active status whose ``updated_at`` is older than
+    ``stale_after`` seconds belonged to a worker that died (crash or
+    deploy). The first process to claim it re-submits it; the pipeline
+    then resumes from the job's last checkpointed stage.
+    """
+
+    def __init__(self, store: JobStore, resubmit: Callable[[str], None],
+                 owned_jobs: Callable[[], Iterable[str]],
+                 interval: float = 30.0, stale_after: float = 120.0):
+        self.store = store
+        self.resubmit = resubmit
+        self.owned_jobs = owned_jobs
+        self.interval = interval
+        self.stale_after = stale_after
+        self.resumed = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls, store: JobStore, resubmit: Callable[[str], None],
+                 owned_jobs: Callable[[], Iterable[str]]) -> "JobRecovery":
+        return cls(
+            store, resubmit, owned_jobs,
+            interval=float(os.environ.get('JOB_HEARTBEAT_INTERVAL', 30)),
+            stale_after=float(os.environ.get('JOB_STALE_AFTER', 120))
+        )
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="job-recovery", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self) -> int:
+        """Heartbeat owned jobs, then resume any stale ones; returns the count"""
+        owned = set(self.owned_jobs())
+        self.store.touch(owned)
+
+        resumed = 0
+        for job_id in self.store.find_stale(self.stale_after):
+            if job_id in owned or not self.store.claim_stale(job_id, self.stale_after):
+                continue
+            try:
+                self.resubmit(job_id)
+                resumed += 1
+                logger.info(f"♻️ Resuming interrupted job {job_id}")
+            except Exception as e:
+                logger.error(f"❌ Could not resume job {job_id}: {e}")
+        self.resumed += resumed
+        return resumed
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Job recovery pass failed: {e}")
+            if self._stop.wait(self.interval):
+                break
+
+
+__all__ = ['JobRecovery']
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Bounded job scheduler for the video pipeline
+Runs a bounded number of jobs at once, sharing a few long-lived event loops
+"""
+
+import os
+import queue
+import asyncio
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Callable, Awaitable, Set
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerFull(Exception):
+    """Raised when the job queue has no room for another submission"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    """Per-stage concurrency limits shared by every job loop
+
+    Limits are plain threading semaphores because jobs run on several
+    event loops, each on its own thread; waiting is done by polling so the loop is never
+    blocked and a cancelled task never leaks a slot.
+    """
+
+    def __init__(self, limits: Dict[str, int]):
+        self.limits = dict(limits)
+        self._semaphores = {
+            stage: threading.BoundedSemaphore(max(1, limit))
+            for stage, limit in self.limits.items()
+        }
+        self._lock = threading.Lock()
+        self._active = {stage: 0 for stage in self.limits}
+        self._waiting = {stage: 0 for stage in self.limits}
+
+    @asynccontextmanager
+    async def slot(self, stage: str):
+        """Hold one slot of ``stage`` for the duration of the block"""
+        semaphore = self._semaphores.get(stage)
+        if semaphore is None:
+            yield
+            return
+
+        if not semaphore.acquire(blocking=False):
+            with self._lock:
+                self._waiting[stage] += 1
+            try:
+                delay = 0.01
+                while not semaphore.acquire(blocking=False):
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 0.25)
+            finally:
+                with self._lock:
+                    self._waiting[stage] -= 1
+
+        with self._lock:
+            self._active[stage] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[stage] -= 1
+            semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                stage: {
+                    "limit": self.limits[stage],
+                    "active": self._active[stage],
+                    "waiting": self._waiting[stage]
+                }
+                for stage in self.limits
+            }
+
+
+class JobScheduler:
+    """Bounded admission queue feeding jobs to a few long-lived event loops
+
+    A dispatcher thread takes queued jobs while fewer than ``workers`` are
+    running and hands each to the event loop with the fewest jobs, with
+    ``asyncio.run_coroutine_threadsafe``. Jobs on one loop overlap their
+    I/O-bound stages; blocking work is offloaded by the stages themselves.
+    """
+
+    def __init__(self, workers: int, queue_size: int, stage_limits: Dict[str, int], loops: int = 1):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.loops = max(1, min(loops, self.workers))
+        self.limiter = StageLimiter(stage_limits)
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._event_loops = []
+        self._threads = []
+        self._dispatcher = None
+        self._lock = threading.Lock()
+        self._running = 0
+        self._loop_jobs = [0] * self.loops
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._durations = deque(maxlen=50)
+        self._active_ids = set()
+
+    @classmethod
+    def from_env(cls) -> "JobScheduler":
+        cpu_count = os.cpu_count() or 1
+        return cls(
+            workers=int(os.environ.get('JOB_WORKERS', min(32, cpu_count * 4))),
+            queue_size=int(os.environ.get('JOB_QUEUE_SIZE', 100)),
+            stage_limits={
+                "llm": int(os.environ.get('STAGE_LIMIT_LLM', 16)),
+                "tts": int(os.environ.get('STAGE_LIMIT_TTS', 8)),
+                "render": int(os.environ.get('STAGE_LIMIT_RENDER', cpu_count))
+            },
+            loops=int(os.environ.get('JOB_LOOPS', cpu_count))
+        )
+
+    def start(self):
+        """Start the event loops and the dispatcher (idempotent)"""
+        with self._lock:
+            if self._dispatcher is not None:
+                return
+            for index in range(self.loops):
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=self._run_loop,
+                    args=(loop,),
+                    name=f"job-loop-{index}",
+                    daemon=True
+                )
+                thread.start()
+                self._event_loops.append(loop)
+                self._threads.append(thread)
+            self._dispatcher = threading.Thread(target=self._dispatch, name="job-dispatcher", daemon=True)
+            self._dispatcher.start()
+        logger.info(f"🧵 Job scheduler started: {self.workers} concurrent jobs on {self.loops} event loops, "
+                    f"queue {self.queue_size}")
+
+    def submit(self, job_id: str, job_factory: Callable[[], Awaitable[Any]]):
+        """Queue a job, raising SchedulerFull when admission is refused
+
+        ``job_factory`` is called on the event loop that runs the job and
+        must return the coroutine to run, so the coroutine is created there.
+        """
+        self.start()
+        with self._lock:
+            self._active_ids.add(job_id)
+        try:
+            self._queue.put_nowait((job_id, job_factory))
+        except queue.Full:
+            with self._lock:
+                self._active_ids.discard(job_id)
+                self._rejected += 1
+            raise SchedulerFull(self.estimate_retry_after())
+
+    def active_job_ids(self) -> Set[str]:
+        """IDs of jobs queued or running in this process"""
+        with self._lock:
+            return set(self._active_ids)
+
+    def estimate_retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up"""
+        with self._lock:
+            average = sum(self._durations) / len(self._durations) if self._durations else 30.0
+        waves = self._queue.qsize() / self.workers
+        return int(min(300, max(1, average * max(waves, 1) / self.workers)))
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def _dispatch(self):
+        while True:
+            # Take a job only once it can start, so queued jobs stay in the queue
+            self._slots.acquire()
+            item = self._queue.get()
+            if item is None:
+                self._slots.release()
+                self._queue.task_done()
+                break
+            job_id, job_factory = item
+            with self._lock:
+                index = min(range(self.loops), key=self._loop_jobs.__getitem__)
+                self._loop_jobs[index] += 1
+                self._running += 1
+            asyncio.run_coroutine_threadsafe(self._run(index, job_id, job_factory), self._event_loops[index])
+
+    async def _run(self, index: int, job_id: str, job_factory: Callable[[], Awaitable[Any]]):
+        started = time.monotonic()
+        try:
+            await job_factory()
+            with self._lock:
+                self._completed += 1
+        except Exception as e:
+            logger.error(f"❌ Scheduled job {job_id} crashed: {e}")
+            with self._lock:
+                self._failed += 1
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._loop_jobs[index] -= 1
+                self._active_ids.discard(job_id)
+                self._durations.append(time.monotonic() - started)
+            self._slots.release()
+            self._queue.task_done()
+
+    def shutdown(self):
+        """Stop the event loops once the queued and running jobs have finished"""
+        with self._lock:
+            dispatcher, self._dispatcher = self._dispatcher, None
+        if dispatcher is None:
+            return
+        self._queue.put(None)
+        dispatcher.join()
+        self._queue.join()
+        with self._lock:
+            loops, self._event_loops = self._event_loops, []
+            threads, self._threads = self._threads, []
+        for loop in loops:
+            loop.call_soon_threadsafe(loop.stop)
+        for thread in threads:
+            thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "loops": self.loops,
+                "queue_size": self.queue_size,
+                "queued": self._queue.qsize(),
+                "running": self._running,
+                "running_per_loop": list(self._loop_jobs),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "stages": self.limiter.stats()
+            }
+
+
+# Initialize scheduler (event loops start on first submission)
+job_scheduler = JobScheduler.from_env()
+
+# Export for easy import
+__all__ = ['job_scheduler', 'JobScheduler', 'SchedulerFull', 'StageLimiter']
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+Persistent job store for TikTok Video Generator
+SQLite (WAL) backend by default, Redis backend for multi-host deployments
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional, List
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Fields that change on every pipeline step; updates touching only these
+# are buffered and written in batches instead of one transaction each
+PROGRESS_FIELDS = {"progress", "current_step", "message", "stage_timings", "heartbeat_at", "render_progress"}
+
+# Jobs in these states are never touched again and may be purged
+TERMINAL_STATUSES = ("completed", "failed", "error")
+
+# Jobs in these states belong to a live worker as long as it heartbeats
+ACTIVE_STATUSES = ("queued", "initialized", "processing")
+
+
+def _dumps(job: Dict[str, Any]) -> str:
+    """Serialize a job, converting pydantic models stored in results"""
+    def default(value):
+        if hasattr(value, "model_dump"):
+            return value.model_dump()
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+    return json.dumps(job, ensure_ascii=False, default=default)
+
+
+def _created_timestamp(job: Dict[str, Any]) -> float:
+    """Numeric creation time for indexing (jobs may carry ISO strings)"""
+    created_at = job.get("created_at")
+    return float(created_at) if isinstance(created_at, (int, float)) else time.time()
+
+
+class JobStore(ABC):
+    """Interface shared by every job store backend
+
+    Jobs are plain JSON-serializable dicts keyed by ``id``. Backends only
+    implement the ``_``-prefixed storage primitives; write batching and
+    retention live here so every backend behaves the same way.
+    """
+
+    def __init__(self, flush_interval: float = 0.5, retention_seconds: float = 7 * 24 * 3600):
+        self.flush_interval = flush_interval
+        self.retention_seconds = retention_seconds
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._pending_lock = threading.Lock()
+        # Held from taking pending fields until they are written, so a
+        # batch taken earlier can't land after (and overwrite) a newer write
+        self._write_lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._version = 0
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="job-store-flush", daemon=True)
+        self._flusher.start()
+
+    # Public API
+
+    def create(self, job: Dict[str, Any]):
+        """Insert a new job; ``job['id']`` is required"""
+        job = dict(job)
+        job.setdefault("created_at", int(time.time()))
+        job["updated_at"] = time.time()
+        self._insert(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job, including progress not yet flushed by this process"""
+        job = self._fetch(job_id)
+        if job is None:
+            return None
+        with self._pending_lock:
+            pending = self._pending.get(job_id)
+            if pending:
+                job.update(pending)
+        return job
+
+    def update(self, job_id: str, **fields):
+        """Update job fields; progress-only updates are written in batches"""
+        fields["updated_at"] = time.time()
+        with self._pending_lock:
+            if PROGRESS_FIELDS.issuperset(k for k in fields if k != "updated_at"):
+                self._pending.setdefault(job_id, {}).update(fields)
+                self._notify()
+                return
+        with self._write_lock:
+            with self._pending_lock:
+                pending = self._pending.pop(job_id, None)
+            if pending:
+                pending.update(fields)
+                fields = pending
+            self._apply_updates({job_id: fields})
+        self._notify()
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Block until a job changes in this process or ``timeout`` passes
+
+        Returns the current change counter. Changes made by other processes
+        are not signalled, so callers should treat a timeout as "re-read".
+        """
+        with self._changed:
+            if self._version == version:
+                self._changed.wait(timeout)
+            return self._version
+
+    def _notify(self):
+        with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Newest jobs first, optionally filtered by status"""
+        self.flush()
+        return self._query(status, limit)
+
+    def count(self, status: Optional[str] = None) -> int:
+        return self._count(status)
+
+    def delete(self, job_id: str):
+        with self._write_lock:
+            with self._pending_lock:
+                self._pending.pop(job_id, None)
+            self._delete(job_id)
+
+    def touch(self, job_ids):
+        """Heartbeat: mark jobs as still owned by a live worker"""
+        now = time.time()
+        for job_id in job_ids:
+            self.update(job_id, heartbeat_at=now)
+
+    def find_stale(self, stale_after: float, limit: int = 100) -> List[str]:
+        """IDs of active jobs nobody has updated for ``stale_after`` seconds"""
+        self.flush()
+        return self._find_stale(time.time() - stale_after, limit)
+
+    def claim_stale(self, job_id: str, stale_after: float) -> bool:
+        """Atomically take over an abandoned job; only one caller wins"""
+        self.flush()
+        return self._claim(job_id, time.time() - stale_after, time.time())
+
+    def purge_expired(self) -> int:
+        """Delete finished jobs older than the retention window"""
+        if self.retention_seconds <= 0:
+            return 0
+        removed = self._purge(time.time() - self.retention_seconds)
+        if removed:
+            logger.info(f"🧹 Purged {removed} expired jobs")
+        return removed
+
+    def flush(self):
+        """Write buffered progress updates now"""
+        with self._write_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return
+            try:
+                self._apply_updates(batch)
+            except Exception as e:
+                logger.error(f"❌ Job store flush failed: {e}")
+                with self._pending_lock:
+                    for job_id, fields in batch.items():
+                        self._pending.setdefault(job_id, {}).update(
+                            {**fields, **self._pending.get(job_id, {})}
+                        )
+
+    def close(self):
+        self._stop.set()
+        self._flusher.join(timeout=5)
+        self.flush()
+
+    def _flush_loop(self):
+        last_purge = 0.0
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            if time.time() - last_purge > 3600:
+                last_purge = time.time()
+                try:
+                    self.purge_expired()
+                except Exception as e:
+                    logger.error(f"❌ Job purge failed: {e}")
+
+    # Backend primitives
+
+    @abstractmethod
+    def _insert(self, job: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def _fetch(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def _apply_updates(self, batch: Dict[str, Dict[str, Any]]):
+        """Merge ``fields`` into each job of ``batch`` atomically"""
+        ...
+
+    @abstractmethod
+    def _query(self, status: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def _count(self, status: Optional[str]) -> int:
+        ...
+
+    @abstractmethod
+    def _delete(self, job_id: str):
+        ...
+
+    @abstractmethod
+    def _purge(self, cutoff: float) -> int:
+        ...
+
+    @abstractmethod
+    def _find_stale(self, stale_before: float, limit: int) -> List[str]:
+        ...
+
+    @abstractmethod
+    def _claim(self, job_id: str, stale_before: float, now: float) -> bool:
+        """Set updated_at to ``now`` only if it is still before ``stale_before``"""
+        ...
+
+
+class SQLiteJobStore(JobStore):
+    """Embedded SQLite store in WAL mode, safe for several worker processes"""
+
+    def __init__(self, path: str, **kwargs):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+            CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at);
+        """)
+        super().__init__(**kwargs)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            # WAL + NORMAL only fsyncs at checkpoints, not on every commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _insert(self, job):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO jobs (id, status, created_at, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+            (job["id"], job.get("status", "queued"), _created_timestamp(job), job["updated_at"], _dumps(job))
+        )
+
+    def _fetch(self, job_id):
+        row = self._connection().execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _apply_updates(self, batch):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for job_id, fields in batch.items():
+                row = conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is None:
+                    continue
+                job = json.loads(row[0])
+                job.update(fields)
+                conn.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ?, data = ? WHERE id = ?",
+                    (job.get("status", "queued"), job["updated_at"], _dumps(job), job_id)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _query(self, status, limit):
+        if status:
+            rows = self._connection().execute(
+                "SELECT data FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+            ).fetchall()
+        else:
+            rows = self._connection().execute(
+                "SELECT data FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _count(self, status):
+        if status:
+            row = self._connection().execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()
+        else:
+            row = self._connection().execute("SELECT COUNT(*) FROM jobs").fetchone()
+        return row[0]
+
+    def _delete(self, job_id):
+        self._connection().execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def _purge(self, cutoff):
+        placeholders = ", ".join("?" for _ in TERMINAL_STATUSES)
+        cursor = self._connection().execute(
+            f"DELETE FROM jobs WHERE status IN ({placeholders}) AND created_at < ?",
+            (*TERMINAL_STATUSES, cutoff)
+        )
+        return cursor.rowcount
+
+    def _find_stale(self, stale_before, limit):
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        rows = self._connection().execute(
+            f"SELECT id FROM jobs WHERE status IN ({placeholders}) AND updated_at < ? LIMIT ?",
+            (*ACTIVE_STATUSES, stale_before, limit)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _claim(self, job_id, stale_before, now):
+        cursor = self._connection().execute(
+            "UPDATE jobs SET updated_at = ? WHERE id = ? AND updated_at < ?",
+            (now, job_id, stale_before)
+        )
+        return cursor.rowcount == 1
+
+
+class RedisJobStore(JobStore):
+    """Redis-compatible store: one JSON blob per job plus status/time indexes"""
+
+    def __init__(self, url: str, prefix: str = "ttvg", **kwargs):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        super().__init__(**kwargs)
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    def _status_key(self, status: str) -> str:
+        return f"{self.prefix}:status:{status}"
+
+    @property
+    def _created_key(self) -> str:
+        return f"{self.prefix}:created"
+
+    def _insert(self, job):
+        status = job.get("status", "queued")
+        pipe = self.client.pipeline()
+        pipe.set(self._key(job["id"]), _dumps(job))
+        pipe.zadd(self._created_key, {job["id"]: _created_timestamp(job)})
+        pipe.zadd(self._status_key(status), {job["id"]: _created_timestamp(job)})
+        pipe.execute()
+
+    def _fetch(self, job_id):
+        raw = self.client.get(self._key(job_id))
+        return json.loads(raw) if raw else None
+
+    def _apply_updates(self, batch):
+        import redis
+        for job_id, fields in batch.items():
+            key = self._key(job_id)
+            with self.client.pipeline() as pipe:
+                while True:
+                    try:
+                        pipe.watch(key)
+                        raw = pipe.get(key)
+                        if raw is None:
+                            pipe.unwatch()
+                            break
+                        job = json.loads(raw)
+                        old_status = job.get("status", "queued")
+                        job.update(fields)
+                        new_status = job.get("status", "queued")
+                        pipe.multi()
+                        pipe.set(key, _dumps(job))
+                        if new_status != old_status:
+                            score = _created_timestamp(job)
+                            pipe.zrem(self._status_key(old_status), job_id)
+                            pipe.zadd(self._status_key(new_status), {job_id: score})
+                        pipe.execute()
+                        break
+                    except redis.WatchError:
+                        continue
+
+    def _query(self, status, limit):
+        index = self._status_key(status) if status else self._created_key
+        ids = [i.decode() for i in self.client.zrevrange(index, 0, limit - 1)]
+        if not ids:
+            return []
+        raws = self.client.mget([self._key(i) for i in ids])
+        return [json.loads(raw) for raw in raws if raw]
+
+    def _count(self, status):
+        return self.client.zcard(self._status_key(status) if status else self._created_key)
+
+    def _delete(self, job_id):
+        job = self._fetch(job_id)
+        pipe = self.client.pipeline()
+        pipe.delete(self._key(job_id))
+        pipe.zrem(self._created_key, job_id)
+        if job:
+            pipe.zrem(self._status_key(job.get("status", "queued")), job_id)
+        pipe.execute()
+
+    def _find_stale(self, stale_before, limit):
+        stale = []
+        for status in ACTIVE_STATUSES:
+            ids = [i.decode() for i in self.client.zrange(self._status_key(status), 0, -1)]
+            for job_id, raw in zip(ids, self.client.mget([self._key(i) for i in ids]) if ids else []):
+                if raw and json.loads(raw).get("updated_at", 0) < stale_before:
+                    stale.append(job_id)
+                    if len(stale) >= limit:
+                        return stale
+        return stale
+
+    def _claim(self, job_id, stale_before, now):
+        import redis
+        key = self._key(job_id)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                raw = pipe.get(key)
+                if raw is None:
+                    return False
+                job = json.loads(raw)
+                if job.get("updated_at", 0) >= stale_before:
+                    return False
+                job["updated_at"] = now
+                pipe.multi()
+                pipe.set(key, _dumps(job))
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+    def _purge(self, cutoff):
+        removed = 0
+        for status in TERMINAL_STATUSES:
+            for raw_id in self.client.zrangebyscore(self._status_key(status), 0, cutoff):
+                self._delete(raw_id.decode())
+                removed += 1
+        return removed
+
+
+def create_job_store(url: Optional[str] = None) -> JobStore:
+    """Build the store named by ``url`` or the JOB_STORE_URL environment variable
+
+    Supported forms: ``sqlite:///relative/path.db``, ``sqlite:////abs/path.db``
+    and ``redis://host:port/db``.
+    """
+    url = url or os.environ.get('JOB_STORE_URL', 'sqlite:///data/jobs.db')
+    options = {
+        "flush_interval": float(os.environ.get('JOB_STORE_FLUSH_INTERVAL', 0.5)),
+        "retention_seconds": float(os.environ.get('JOB_RETENTION_SECONDS', 7 * 24 * 3600))
+    }
+    parsed = urlparse(url)
+    if parsed.scheme in ("redis", "rediss"):
+        return RedisJobStore(url, **options)
+    if parsed.scheme == "sqlite":
+        return SQLiteJobStore(url[len("sqlite:///"):], **options)
+    raise ValueError(f"Unsupported job store URL: {url}")
+
+
+# Initialize store
+job_store = create_job_store()
+
+# Export for easy import
+__all__ = ['job_store', 'JobStore', 'ACTIVE_STATUSES', 'TERMINAL_STATUSES', 'SQLiteJobStore', 'RedisJobStore', 'create_job_store']
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Per-job workspace with stage checkpoints
+Each finished pipeline stage stores its output so a retry resumes after it
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WORKSPACE_ROOT = os.environ.get('JOB_WORKSPACE_DIR', 'workspaces')
+
+
+class JobWorkspace:
+    """Directory holding a job's stage checkpoints and artifact files
+
+    ``<stage>.json`` holds the stage's JSON result plus the list of files it
+    produced. A checkpoint only counts as complete while all of those files
+    still exist, so a half-written render is never mistaken for a result.
+    """
+
+    def __init__(self, job_id: str, root: str = WORKSPACE_ROOT):
+        self.job_id = job_id
+        self.path = Path(root) / job_id
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._files: Dict[str, List[str]] = {}
+
+    def adopt_file(self, stage: str, source: Optional[str], filename: Optional[str] = None) -> Optional[str]:
+        """Move an artifact produced by ``stage`` into the workspace
+
+        Returns the new path. Paths that don't exist (simulated output) are
+        returned unchanged and not tracked.
+        """
+        if not source or not os.path.exists(source):
+            return source
+        target = self.path / (filename or os.path.basename(source))
+        if os.path.abspath(source) != os.path.abspath(target):
+            try:
+                os.replace(source, target)
+            except OSError:
+                # Different filesystem: copy then remove the original
+                shutil.copy2(source, target)
+                os.remove(source)
+        self._files.setdefault(stage, []).append(str(target))
+        return str(target)
+
+    def track_file(self, stage: str, path: Optional[str]) -> Optional[str]:
+        """Record an artifact of ``stage`` that must stay where it is"""
+        if path and os.path.exists(path):
+            self._files.setdefault(stage, []).append(str(path))
+        return path
+
+    def save(self, stage: str, value: Any):
+        """Checkpoint ``value`` as the result of ``stage``"""
+        checkpoint = {
+            "stage": stage,
+            "value": value,
+            "files": self._files.get(stage, []),
+            "saved_at": time.time()
+        }
+        target = self.path / f"{stage}.json"
+        temp = target.with_suffix(".json.tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, ensure_ascii=False, default=_json_default)
+        os.replace(temp, target)
+
+    def load(self) -> Dict[str, Any]:
+        """Results of every stage with a valid checkpoint"""
+        results = {}
+        for checkpoint_file in self.path.glob("*.json"):
+            try:
+                with open(checkpoint_file, encoding="utf-8") as f:
+                    checkpoint = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Ignoring unreadable checkpoint {checkpoint_file}: {e}")
+                continue
+            if all(os.path.exists(path) for path in checkpoint.get("files", [])):
+                results[checkpoint["stage"]] = checkpoint["value"]
+        return results
+
+    def clear(self):
+        """Remove the workspace and everything in it"""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def _json_default(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+__all__ = ['JobWorkspace', 'WORKSPACE_ROOT']
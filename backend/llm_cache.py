@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Response cache for LLM calls
+Identical requests (model, prompt version, input, sampling parameters) reuse an earlier answer
+"""
+
+import os
+import copy
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import logging
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_DIR = os.environ.get('LLM_CACHE_DIR', os.path.join('data', 'llm_cache'))
+LLM_CACHE_MAX_BYTES = int(os.environ.get('LLM_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+LLM_CACHE_TTL = float(os.environ.get('LLM_CACHE_TTL', 7 * 24 * 3600))
+
+# Answers kept decoded in memory, in front of the SQLite tier
+LLM_CACHE_MEMORY_ENTRIES = int(os.environ.get('LLM_CACHE_MEMORY_ENTRIES', 256))
+
+
+def _normalize(value: Any) -> Any:
+    """Inputs as keyed: NFC text with whitespace runs collapsed"""
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFC", value).split())
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+class _Abandoned(Exception):
+    """The call other callers were waiting for was cancelled"""
+
+
+class LLMCache:
+    """Answers of LLM calls: an in-memory LRU backed by SQLite with a TTL
+
+    Only successful answers are stored (whatever the call returns, as long
+    as it is JSON-serialisable); a call that raises is never cached, so
+    fallbacks are not either. The disk tier is bounded in size; expired
+    entries go first, then the least recently used, and leave the memory
+    tier with it. Concurrent calls for one key share a single call, even
+    across event loops.
+    """
+
+    def __init__(self, root: str = LLM_CACHE_DIR, max_bytes: int = LLM_CACHE_MAX_BYTES,
+                 ttl: float = LLM_CACHE_TTL, memory_entries: int = LLM_CACHE_MEMORY_ENTRIES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        os.makedirs(root, exist_ok=True)
+        self.path = os.path.join(root, "responses.db")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[float, str, float]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.seconds_saved = 0.0
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                task TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                seconds REAL NOT NULL,
+                created REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_llm_responses_last_access ON responses(last_access);
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(task: str, model: str, prompt_version: str, inputs: Dict[str, Any],
+            params: Optional[Dict[str, Any]] = None) -> str:
+        """Cache key of a call: bump ``prompt_version`` whenever the prompt template changes"""
+        material = json.dumps(
+            [task, model, prompt_version, _normalize(inputs), params or {}],
+            ensure_ascii=False, sort_keys=True, separators=(",", ":")
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def get_or_call(self, key: str, call: Callable[[], Awaitable[Any]], task: str = "llm",
+                          bypass: bool = False) -> Any:
+        """Cached answer for ``key``, or run ``call`` and cache its answer
+
+        While a call for ``key`` is running, other callers wait for its
+        answer (or its error) instead of making the same call. With
+        ``bypass`` the cache is not read: the call always runs and its
+        answer replaces the stored one.
+        """
+        if bypass:
+            with self._lock:
+                self.bypassed += 1
+            return await self._call(key, call, task)
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            logger.info(f"⏳ Waiting for the running {task} call")
+            try:
+                # A concurrent future can be awaited from any event loop;
+                # callers may change the answer, so each gets its own copy
+                return copy.deepcopy(await asyncio.wrap_future(pending))
+            except _Abandoned:
+                return await self.get_or_call(key, call, task)
+
+        try:
+            cached = await self._get(key)
+            if cached is not None:
+                value, seconds = cached
+                logger.info(f"⚡ LLM cache hit for {task} (saved {seconds:.1f}s)")
+            else:
+                value = await self._call(key, call, task)
+            pending.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            # Waiters make the call themselves rather than being cancelled too
+            pending.set_exception(_Abandoned())
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def _call(self, key: str, call: Callable[[], Awaitable[Any]], task: str) -> Any:
+        started = time.perf_counter()
+        value = await call()
+        seconds = time.perf_counter() - started
+        try:
+            data = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Not caching {task} answer: {e}")
+            return value
+        self._remember(key, time.time() + self.ttl, data, seconds)
+        try:
+            await asyncio.to_thread(self._store, key, task, data, seconds)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Could not persist {task} answer: {e}")
+        return value
+
+    async def _get(self, key: str) -> Optional[Tuple[Any, float]]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.seconds_saved += entry[2]
+                return json.loads(entry[1]), entry[2]
+            if entry is not None:
+                del self._memory[key]
+
+        try:
+            row = await asyncio.to_thread(self._load, key, now)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ LLM cache lookup failed: {e}")
+            row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self.seconds_saved += row["seconds"]
+        self._remember(key, row["expires_at"], row["value"], row["seconds"])
+        return json.loads(row["value"]), row["seconds"]
+
+    def _remember(self, key: str, expires_at: float, data: str, seconds: float):
+        with self._lock:
+            self._memory[key] = (expires_at, data, seconds)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _load(self, key: str, now: float) -> Optional[sqlite3.Row]:
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, seconds, expires_at FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is not None:
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        return row
+
+    def _store(self, key: str, task: str, data: str, seconds: float):
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO responses (key, task, value, size, seconds, created, expires_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, task, data, len(data.encode("utf-8")), seconds, now, now + self.ttl, now)
+        )
+        self._evict(now)
+
+    def total_bytes(self) -> int:
+        return self._connection().execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict(self, now: float):
+        """Drop expired entries, then least recently used ones until the cache fits ``max_bytes``"""
+        conn = self._connection()
+        expired = conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+        excess = self.total_bytes() - self.max_bytes
+        victims = []
+        if excess > 0:
+            for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+                if excess <= 0:
+                    break
+                victims.append(key)
+                excess -= size
+            conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in victims])
+        if expired or victims:
+            with self._lock:
+                self.evictions += expired + len(victims)
+                # Evicted answers must not be served from memory either
+                for key in victims:
+                    self._memory.pop(key, None)
+                for key in [key for key, entry in self._memory.items() if entry[0] <= now]:
+                    del self._memory[key]
+            logger.info(f"🧹 LLM cache evicted {expired} expired and {len(victims)} least recently used answers")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            # A caller that waited for a running call saved one too
+            hits = self.memory_hits + self.disk_hits + self.coalesced
+            lookups = hits + self.misses
+            stats = {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "seconds_saved": round(self.seconds_saved, 1),
+                "memory_entries": len(self._memory)
+            }
+        stats["bytes"] = self.total_bytes()
+        return stats
+
+
+# Initialize shared cache
+llm_cache = LLMCache()
+
+# Export for easy import
+__all__ = ['llm_cache', 'LLMCache']
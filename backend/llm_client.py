@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Shared async OpenAI client
+Pooled HTTP connections, a global cap on in-flight calls and requests/tokens-per-minute limits
+"""
+
+import os
+import time
+import asyncio
+import threading
+import weakref
+import logging
+from typing import Dict, Any, List, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from http_client import HostLimiter
+from prompt_budget import prompt_budget, count_messages
+
+logger = logging.getLogger(__name__)
+
+OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+
+# Concurrent calls across every event loop (FastAPI and scheduler workers)
+LLM_MAX_IN_FLIGHT = int(os.environ.get('LLM_MAX_IN_FLIGHT', 8))
+
+# Account limits of the provider; 0 disables a limit
+LLM_REQUESTS_PER_MINUTE = int(os.environ.get('LLM_REQUESTS_PER_MINUTE', 500))
+LLM_TOKENS_PER_MINUTE = int(os.environ.get('LLM_TOKENS_PER_MINUTE', 60000))
+
+LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', 5))
+LLM_READ_TIMEOUT = float(os.environ.get('LLM_READ_TIMEOUT', 120))
+LLM_MAX_CONNECTIONS = int(os.environ.get('LLM_MAX_CONNECTIONS', 20))
+
+# Retries of 429 and 5xx answers, with backoff, by the openai client
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 3))
+
+Messages = List[Dict[str, str]]
+
+
+class RateLimiter:
+    """Token buckets for requests and tokens per minute, shared across event loops
+
+    A call takes one request and its estimated tokens (prompt plus the
+    completion budget) before it is sent, waiting without blocking its loop
+    until both buckets hold enough. Once the API reports the real usage the
+    difference is settled, so over-estimates are given back.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self.waits = 0
+        self.seconds_waited = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _delay(self, tokens: int) -> float:
+        """Seconds until the call fits, or 0 after taking its share"""
+        with self._lock:
+            self._refill(time.monotonic())
+            delays = [0.0]
+            if self.requests_per_minute > 0 and self._requests < 1:
+                delays.append((1 - self._requests) * 60 / self.requests_per_minute)
+            if self.tokens_per_minute > 0:
+                # A call larger than the whole bucket waits for a full one
+                needed = min(tokens, self.tokens_per_minute)
+                if self._tokens < needed:
+                    delays.append((needed - self._tokens) * 60 / self.tokens_per_minute)
+            delay = max(delays)
+            if delay == 0:
+                self._requests -= 1
+                self._tokens -= tokens
+            return delay
+
+    async def acquire(self, tokens: int):
+        started = time.perf_counter()
+        waited = False
+        while True:
+            delay = self._delay(tokens)
+            if delay == 0:
+                break
+            waited = True
+            await asyncio.sleep(min(delay, 1.0))
+        if waited:
+            with self._lock:
+                self.waits += 1
+                self.seconds_waited += time.perf_counter() - started
+
+    def settle(self, estimated: int, actual: int):
+        """Give back (or take) the difference between estimated and reported tokens"""
+        with self._lock:
+            self._tokens = min(self.tokens_per_minute, self._tokens + estimated - actual)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "requests_available": int(self._requests),
+                "tokens_available": int(self._tokens),
+                "waits": self.waits,
+                "seconds_waited": round(self.seconds_waited, 1)
+            }
+
+
+class AsyncLLMClient:
+    """One ``AsyncOpenAI`` client per event loop over a pooled httpx transport
+
+    Like AsyncHttpClient, clients are bound to the loop they were created
+    on. Every chat call holds a global in-flight slot and passes the rate
+    limiter first, so many jobs can overlap their LLM calls without
+    blocking a loop or running into the provider's rate limits.
+    """
+
+    def __init__(self, api_key: Optional[str] = OPENAI_API_KEY, max_in_flight: int = LLM_MAX_IN_FLIGHT,
+                 requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+                 max_connections: int = LLM_MAX_CONNECTIONS, max_retries: int = LLM_MAX_RETRIES):
+        self.api_key = api_key
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.timeout = httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.in_flight = HostLimiter(self.max_in_flight)
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def configure(self, api_key: Optional[str]):
+        """Use ``api_key`` for clients created from now on"""
+        with self._lock:
+            if api_key and api_key != self.api_key:
+                self.api_key = api_key
+                self._clients = weakref.WeakKeyDictionary()
+
+    def client(self) -> AsyncOpenAI:
+        """The client of the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None or client.is_closed():
+                client = AsyncOpenAI(
+                    api_key=self.api_key,
+                    max_retries=self.max_retries,
+                    http_client=httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+                )
+                self._clients[loop] = client
+            return client
+
+    async def chat(self, label: str, model: str, messages: Messages, max_tokens: int,
+                   temperature: float = 0.7) -> Any:
+        """One chat completion, metered in prompt_budget under ``label``
+
+        Raises the openai client's errors once its retries are used up.
+        """
+        estimated = count_messages(messages, model) + max_tokens
+        await self.rate_limiter.acquire(estimated)
+        async with self.in_flight.slot("openai"):
+            with self._lock:
+                self.requests += 1
+            started = time.perf_counter()
+            try:
+                response = await self.client().chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature
+                )
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                raise
+        usage = prompt_budget.record(label, model, messages, response, started)
+        self.rate_limiter.settle(estimated, usage["prompt_tokens"] + usage["completion_tokens"])
+        return response
+
+    async def aclose(self):
+        """Close the running loop's client (call from that loop on shutdown)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "clients": len(self._clients),
+                "requests": self.requests,
+                "errors": self.errors,
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight.busy_hosts().get("openai", 0)
+            }
+        stats.update(self.rate_limiter.stats())
+        return stats
+
+
+# Initialize shared client (per-loop OpenAI clients are created lazily)
+llm_client = AsyncLLMClient()
+
+# Export for easy import
+__all__ = ['llm_client', 'AsyncLLMClient', 'RateLimiter']
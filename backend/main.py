@@ -1,8 +1,10 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 import os
+import time
+import asyncio
 import uuid
 from typing import Optional
 import json
@@ -13,6 +15,22 @@ from services.ai_service import AIService
 from services.voice_service import VoiceService
 from services.video_service import VideoService
 from models.schemas import VideoRequest, VideoResponse, ProcessingStatus
+from job_store import job_store
+import job_events
+from job_recovery import JobRecovery
+from job_workspace import JobWorkspace
+from pipeline import Stage, StagePipeline
+from render_pool import render_pool
+from file_streaming import RangeFileResponse
+from multipart_upload import parse_request_stream, UploadTooLarge, MultipartError
+from upload_store import upload_store, extraction_cache
+from pdf_extraction import pdf_extraction_pool
+from http_client import http_client
+from http_cache import http_cache
+from document_index import document_indexer, index_summary
+from prompt_budget import prompt_budget
+from llm_cache import llm_cache
+from llm_client import llm_client
 from pydantic import BaseModel
 
 class ProcessRequest(BaseModel):
@@ -45,8 +63,8 @@ ai_service = AIService()
 voice_service = VoiceService()
 video_service = VideoService()
 
-# In-memory storage for processing status (sẽ thay bằng Redis trong production)
-processing_jobs = {}
+# Jobs running in this process; heartbeated so other workers don't resume them
+running_jobs = set()
 
 @app.get("/")
 async def root():
@@ -59,7 +77,7 @@ async def health_check():
         "status": "OK",
         "server": "enhanced_mvp_server",
         "timestamp": 1740074609,
-        "jobs_count": len(processing_jobs),
+        "jobs_count": job_store.count(),
         "ai_services": True,
         "content_extraction": True,
         "video_generation": True,
@@ -70,7 +88,15 @@ async def health_check():
             "url_extraction": True,
             "video_creation": True,
             "voice_synthesis": True
-        }
+        },
+        "render_pool": render_pool.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "pdf_extraction": pdf_extraction_pool.stats(),
+        "http_client": http_client.stats(),
+        "http_cache": http_cache.stats(),
+        "prompt_budget": prompt_budget.stats(),
+        "llm_cache": llm_cache.stats(),
+        "llm_client": llm_client.stats()
     }
 
 @app.post("/api/process")
@@ -87,6 +113,8 @@ async def process_content(
     duration = request.settings.get("duration", 60)
     voice_style = request.settings.get("voice_style", "professional")
     language = request.settings.get("language", "en")
+    # Ask the AI again instead of reusing an earlier answer for the same content
+    bypass_cache = bool(request.settings.get("bypass_cache", False))
     
     if duration > settings.max_video_duration:
         raise HTTPException(
@@ -95,20 +123,29 @@ async def process_content(
         )
     
     # Initialize job status
-    processing_jobs[job_id] = {
+    job_store.create({
+        "id": job_id,
         "status": "queued",
         "progress": 0,
         "current_step": "Initializing",
         "message": "Job queued for processing",
         "result": None,
         "error": None,
-        "created_at": "2024-06-04T16:00:00Z"
-    }
+        "created_at": int(time.time()),
+        "params": {
+            "pipeline": "v2",
+            "url": request.url,
+            "duration": duration,
+            "voice_style": voice_style,
+            "use_ai": request.use_ai,
+            "bypass_cache": bypass_cache
+        }
+    })
     
     # Process in background
     background_tasks.add_task(
         process_content_to_video_v2,
-        job_id, request.url, duration, voice_style, request.use_ai
+        job_id, request.url, duration, voice_style, request.use_ai, bypass_cache
     )
     
     return {
@@ -119,260 +156,462 @@ async def process_content(
     }
 
 @app.post("/api/upload", response_model=dict)
-async def upload_file(
-    background_tasks: BackgroundTasks,
-    file: Optional[UploadFile] = File(None),
-    url: Optional[str] = Form(None),
-    duration: int = Form(180),
-    voice_style: str = Form("professional")
-):
-    """Upload ebook file hoặc URL để xử lý"""
+async def upload_file(request: Request, background_tasks: BackgroundTasks):
+    """Upload ebook file hoặc URL để xử lý
     
-    if not file and not url:
-        raise HTTPException(status_code=400, detail="Cần upload file hoặc nhập URL")
+    Form fields: file, url, duration (180), voice_style ("professional"),
+    file_id (reuse an earlier upload instead of sending the file again),
+    chapter (a chapter number from /api/document/{file_id}/chapters) and
+    bypass_cache ("true" for a fresh AI script instead of a cached one).
+    The multipart body is parsed as it streams in and the file goes straight
+    to disk, so large ebooks never sit in memory.
+    """
     
-    if duration > settings.max_video_duration:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Thời lượng tối đa là {settings.max_video_duration} giây"
+    content_length = request.headers.get("content-length")
+    try:
+        fields, files = await parse_request_stream(
+            request.stream(),
+            request.headers.get("content-type"),
+            int(content_length) if content_length else None
         )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MultipartError as e:
+        raise HTTPException(status_code=400, detail=f"Dữ liệu upload không hợp lệ: {e}")
+    
+    upload = files[0] if files else None
+    for extra in files[1:]:
+        extra.discard()
+    url = fields.get("url") or None
+    voice_style = fields.get("voice_style", "professional")
+    try:
+        duration = int(fields.get("duration", 180))
+    except ValueError:
+        duration = None
+    try:
+        chapter = int(fields["chapter"]) if fields.get("chapter") else None
+    except ValueError:
+        chapter = 0
+    bypass_cache = fields.get("bypass_cache", "").lower() in ("1", "true", "yes", "on")
+    
+    file_id = fields.get("file_id") or None
+    file_path = filename = None
+    if file_id and not upload:
+        file_path = upload_store.path_for(file_id)
+        filename = os.path.basename(file_path) if file_path else None
+    
+    error = None
+    if file_id and not upload and file_path is None:
+        error = "Không tìm thấy file đã upload, vui lòng upload lại"
+    elif not upload and not url and not file_path:
+        error = "Cần upload file hoặc nhập URL"
+    elif duration is None:
+        error = "Thời lượng không hợp lệ"
+    elif chapter is not None and chapter < 1:
+        error = "Số chương không hợp lệ"
+    elif chapter is not None and not ((upload.filename if upload else filename) or "").lower().endswith(".pdf"):
+        error = "Chỉ có thể chọn chương với file PDF"
+    elif duration > settings.max_video_duration:
+        error = f"Thời lượng tối đa là {settings.max_video_duration} giây"
+    if error:
+        if upload:
+            upload.discard()
+        raise HTTPException(status_code=400, detail=error)
     
     # Generate job ID
     job_id = str(uuid.uuid4())
     
+    if upload:
+        # Stored by content hash: re-uploads of the same ebook share a file
+        filename = upload.filename
+        file_id, file_path, _ = upload_store.store(upload)
+    
     # Initialize job status
-    processing_jobs[job_id] = {
+    job_store.create({
+        "id": job_id,
         "status": "initialized",
         "progress": 0,
         "message": "Đang khởi tạo...",
         "result": None,
-        "error": None
-    }
+        "error": None,
+        "params": {
+            "pipeline": "v1",
+            "url": url,
+            "file_path": file_path,
+            "filename": filename,
+            "chapter": chapter,
+            "duration": duration,
+            "voice_style": voice_style,
+            "bypass_cache": bypass_cache
+        }
+    })
     
     # Process in background
     background_tasks.add_task(
         process_content_to_video,
-        job_id, file, url, duration, voice_style
+        job_id, file_path, filename, url, duration, voice_style, chapter, bypass_cache
     )
     
-    return {"job_id": job_id, "message": "Đã bắt đầu xử lý"}
+    return {"job_id": job_id, "file_id": file_id, "message": "Đã bắt đầu xử lý"}
+
+@app.get("/api/document/{file_id}/chapters")
+async def get_document_chapters(file_id: str):
+    """Mục lục của file đã upload: chương, khoảng trang và vị trí ký tự
+    
+    Built on the first request and cached by content hash; pass a chapter
+    number to /api/upload to turn just that chapter into a video.
+    """
+    file_path = upload_store.path_for(file_id)
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="Không tìm thấy file")
+    if not file_path.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Chỉ hỗ trợ mục lục cho file PDF")
+    try:
+        index = await document_indexer.get_index(file_path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Không thể tạo mục lục: {str(e)}")
+    return dict(index_summary(index), file_id=file_id)
 
 @app.get("/api/status/{job_id}")
 async def get_processing_status(job_id: str):
     """Kiểm tra trạng thái xử lý"""
-    if job_id not in processing_jobs:
+    job = job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Không tìm thấy job")
     
-    return processing_jobs[job_id]
+    return job
 
 @app.get("/api/job/{job_id}")
 async def get_job_status(job_id: str):
     """Get job status - matching frontend API"""
-    if job_id not in processing_jobs:
+    job = job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = processing_jobs[job_id]
-    
     # Add download URL if completed
     if job["status"] == "completed" and job.get("result"):
         job["download_url"] = f"/api/download/{job_id}"
     
     return job
 
-@app.get("/api/download/{job_id}")
-async def download_video(job_id: str):
-    """Download video đã tạo"""
-    if job_id not in processing_jobs:
+@app.get("/api/job/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """Stream job progress deltas as Server-Sent Events"""
+    if job_store.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    poll_interval = float(os.environ.get('SSE_POLL_INTERVAL', 0.5))
+    
+    async def event_source():
+        # Each iteration diffs against the last state actually sent, so a
+        # client that reads slowly (back-pressuring this generator) skips
+        # intermediate updates instead of queueing them
+        yield job_events.retry_directive()
+        last = None
+        last_write = time.monotonic()
+        while not await request.is_disconnected():
+            job = job_store.get(job_id)
+            if job is None:
+                yield job_events.format_sse("error", {"job_id": job_id, "error": "Job not found"})
+                return
+            events, last, done = job_events.next_events(job, last)
+            for event in events:
+                yield event
+            if done:
+                return
+            if events:
+                last_write = time.monotonic()
+            elif time.monotonic() - last_write > job_events.HEARTBEAT_INTERVAL:
+                yield job_events.heartbeat()
+                last_write = time.monotonic()
+            await asyncio.sleep(poll_interval)
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/job/{job_id}/retry")
+async def retry_job(job_id: str, background_tasks: BackgroundTasks):
+    """Retry a failed job, resuming after its last completed stage"""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] not in ("failed", "error"):
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}, only failed jobs can be retried")
+    if not job.get("params"):
+        raise HTTPException(status_code=409, detail="Job was created before retries were supported")
+    
+    job_store.update(job_id, status="queued", error=None, current_step="Queued for retry")
+    background_tasks.add_task(resume_job, job_id)
+    
+    return {"job_id": job_id, "status": "queued", "message": "Retry queued"}
+
+def _result_video_path(job_id: str) -> str:
+    """Path of a completed job's video, or an HTTPException"""
+    job = job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Không tìm thấy job")
     
-    job = processing_jobs[job_id]
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail="Video chưa được tạo xong")
     
     video_path = job["result"]["video_path"]
     if not os.path.exists(video_path):
         raise HTTPException(status_code=404, detail="File video không tồn tại")
-    
-    return FileResponse(
-        path=video_path,
+    return video_path
+
+@app.api_route("/api/download/{job_id}", methods=["GET", "HEAD"])
+async def download_video(job_id: str, request: Request):
+    """Download video đã tạo (hỗ trợ Range để tải tiếp)"""
+    return RangeFileResponse(
+        _result_video_path(job_id),
+        request.headers,
+        method=request.method,
+        filename=f"video_{job_id}.mp4",
+        inline=False,
+        media_type="video/mp4"
+    )
+
+@app.api_route("/api/preview/{job_id}", methods=["GET", "HEAD"])
+async def preview_video(job_id: str, request: Request):
+    """Stream video để xem trực tiếp; Range cho phép tua trong <video>"""
+    return RangeFileResponse(
+        _result_video_path(job_id),
+        request.headers,
+        method=request.method,
         filename=f"video_{job_id}.mp4",
         media_type="video/mp4"
     )
 
+def build_video_pipeline(
+    job_id: str,
+    extract,
+    duration: int,
+    voice_style: str,
+    use_ai: bool,
+    labels: dict,
+    bypass_cache: bool = False
+) -> StagePipeline:
+    """Extraction → analysis → (voice → video) + marketing as a stage graph
+    
+    Marketing only needs the script, so it runs alongside voice and video.
+    The voice and marketing services call blocking SDKs, so those stages are
+    offloaded to threads to actually overlap; video is rendered in the
+    render worker processes.
+    Finished stages are checkpointed in the job's workspace.
+    """
+    workspace = JobWorkspace(job_id)
+    
+    async def analyze_stage(results):
+        content = results["extract"]
+        if use_ai:
+            return await ai_service.analyze_content(content, duration, bypass_cache=bypass_cache)
+        # Simple processing without AI
+        return {"script": content[:1000], "category": "general"}  # Truncate for demo
+    
+    async def voice_stage(results):
+        audio_path = await voice_service.generate_speech(
+            results["analyze"]["script"], voice_style, job_id
+        )
+        return workspace.track_file("voice", audio_path)
+    
+    async def video_stage(results):
+        analysis = results["analyze"]
+        video_path = await video_service.create_video(
+            analysis["script"], results["voice"], analysis["category"], job_id,
+            on_progress=lambda fraction: job_store.update(job_id, render_progress=int(fraction * 100))
+        )
+        return workspace.track_file("video", video_path)
+    
+    async def marketing_stage(results):
+        if not use_ai:
+            return {}
+        analysis = results["analyze"]
+        return await ai_service.generate_marketing_content(
+            analysis["script"], analysis["category"], bypass_cache=bypass_cache
+        )
+    
+    def on_progress(progress, step, timings):
+        job_store.update(job_id, progress=progress, current_step=step, message=step, stage_timings=timings)
+    
+    return StagePipeline(
+        [
+            Stage("extract", lambda results: extract(), label=labels["extract"], weight=1),
+            Stage("analyze", analyze_stage, deps=["extract"], label=labels["analyze"], weight=2),
+            Stage("voice", voice_stage, deps=["analyze"], label=labels["voice"], weight=2, offload=True),
+            Stage("video", video_stage, deps=["analyze", "voice"], label=labels["video"], weight=4),
+            Stage("marketing", marketing_stage, deps=["analyze"], label=labels["marketing"], weight=1, offload=True)
+        ],
+        on_progress=on_progress,
+        checkpoint=workspace
+    )
+
 async def process_content_to_video(
     job_id: str, 
-    file: Optional[UploadFile], 
+    file_path: Optional[str], 
+    filename: Optional[str], 
     url: Optional[str], 
     duration: int, 
-    voice_style: str
+    voice_style: str,
+    chapter: Optional[int] = None,
+    bypass_cache: bool = False
 ):
     """Background task để xử lý toàn bộ quy trình tạo video"""
     
+    async def extract():
+        if file_path:
+            if not os.path.exists(file_path):
+                raise ValueError("Uploaded file is no longer available, please upload it again")
+            return await content_processor.extract_from_path(file_path, filename, chapter=chapter)
+        return await content_processor.extract_from_url(url)
+    
+    pipeline = build_video_pipeline(
+        job_id, extract, duration, voice_style, True,
+        labels={
+            "extract": "Đang trích xuất nội dung...",
+            "analyze": "Đang phân tích nội dung với AI...",
+            "voice": "Đang tạo giọng đọc...",
+            "video": "Đang tạo video...",
+            "marketing": "Đang tạo caption và hashtag..."
+        },
+        bypass_cache=bypass_cache
+    )
+    
+    running_jobs.add(job_id)
     try:
-        # Step 1: Extract content
-        processing_jobs[job_id].update({
-            "status": "processing",
-            "progress": 10,
-            "message": "Đang trích xuất nội dung..."
-        })
-        
-        if file:
-            content = await content_processor.extract_from_file(file)
-        else:
-            content = await content_processor.extract_from_url(url)
-        
-        # Step 2: Analyze content with AI
-        processing_jobs[job_id].update({
-            "progress": 30,
-            "message": "Đang phân tích nội dung với AI..."
-        })
-        
-        analysis = await ai_service.analyze_content(content, duration)
-        script = analysis["script"]
-        category = analysis["category"]
-        
-        # Step 3: Generate voice
-        processing_jobs[job_id].update({
-            "progress": 50,
-            "message": "Đang tạo giọng đọc..."
-        })
-        
-        audio_path = await voice_service.generate_speech(
-            script, voice_style, job_id
-        )
-        
-        # Step 4: Create video
-        processing_jobs[job_id].update({
-            "progress": 70,
-            "message": "Đang tạo video..."
-        })
-        
-        video_path = await video_service.create_video(
-            script, audio_path, category, job_id
-        )
-        
-        # Step 5: Generate marketing content
-        processing_jobs[job_id].update({
-            "progress": 90,
-            "message": "Đang tạo caption và hashtag..."
-        })
-        
-        marketing = await ai_service.generate_marketing_content(script, category)
+        job_store.update(job_id, status="processing", started_at=time.time())
+        results = await pipeline.run()
+        analysis = results["analyze"]
         
         # Complete
-        processing_jobs[job_id].update({
-            "status": "completed",
-            "progress": 100,
-            "message": "Hoàn thành!",
-            "result": {
-                "video_path": video_path,
-                "audio_path": audio_path,
-                "script": script,
-                "category": category,
-                "marketing": marketing,
+        job_store.update(
+            job_id,
+            status="completed",
+            progress=100,
+            message="Hoàn thành!",
+            stage_timings=pipeline.timings,
+            result={
+                "video_path": results["video"],
+                "audio_path": results["voice"],
+                "script": analysis["script"],
+                "category": analysis["category"],
+                "marketing": results["marketing"],
                 "duration": duration
             }
-        })
+        )
         
     except Exception as e:
-        processing_jobs[job_id].update({
-            "status": "error",
-            "error": str(e),
-            "message": f"Lỗi: {str(e)}"
-        })
+        job_store.update(
+            job_id,
+            status="error",
+            error=str(e),
+            message=f"Lỗi: {str(e)}",
+            stage_timings=pipeline.timings
+        )
+    finally:
+        running_jobs.discard(job_id)
 
 async def process_content_to_video_v2(
     job_id: str, 
     url: str, 
     duration: int, 
     voice_style: str,
-    use_ai: bool
+    use_ai: bool,
+    bypass_cache: bool = False
 ):
     """New background task matching frontend expectations"""
     
+    async def extract():
+        return await content_processor.extract_from_url(url)
+    
+    pipeline = build_video_pipeline(
+        job_id, extract, duration, voice_style, use_ai,
+        labels={
+            "extract": "Content Extraction",
+            "analyze": "AI Analysis",
+            "voice": "Voice Generation",
+            "video": "Video Creation",
+            "marketing": "Marketing Content"
+        },
+        bypass_cache=bypass_cache
+    )
+    
+    running_jobs.add(job_id)
     try:
-        # Step 1: Extract content
-        processing_jobs[job_id].update({
-            "status": "processing",
-            "progress": 10,
-            "current_step": "Content Extraction",
-            "message": "Extracting content from URL..."
-        })
-        
-        content = await content_processor.extract_from_url(url)
-        
-        # Step 2: AI Analysis (if enabled)
-        if use_ai:
-            processing_jobs[job_id].update({
-                "progress": 30,
-                "current_step": "AI Analysis",
-                "message": "Analyzing content with AI..."
-            })
-            
-            analysis = await ai_service.analyze_content(content, duration)
-            script = analysis["script"]
-            category = analysis["category"]
-        else:
-            # Simple processing without AI
-            script = content[:1000]  # Truncate for demo
-            category = "general"
-        
-        # Step 3: Voice Generation
-        processing_jobs[job_id].update({
-            "progress": 50,
-            "current_step": "Voice Generation",
-            "message": "Generating voiceover..."
-        })
-        
-        audio_path = await voice_service.generate_speech(
-            script, voice_style, job_id
-        )
-        
-        # Step 4: Video Creation
-        processing_jobs[job_id].update({
-            "progress": 70,
-            "current_step": "Video Creation",
-            "message": "Creating video..."
-        })
-        
-        video_path = await video_service.create_video(
-            script, audio_path, category, job_id
-        )
-        
-        # Step 5: Marketing Content
-        processing_jobs[job_id].update({
-            "progress": 90,
-            "current_step": "Marketing Content",
-            "message": "Generating captions and hashtags..."
-        })
-        
-        marketing = await ai_service.generate_marketing_content(script, category) if use_ai else {}
+        job_store.update(job_id, status="processing", started_at=time.time())
+        results = await pipeline.run()
+        analysis = results["analyze"]
         
         # Complete
-        processing_jobs[job_id].update({
-            "status": "completed",
-            "progress": 100,
-            "current_step": "Completed",
-            "message": "Video generation completed successfully!",
-            "result": {
-                "video_path": video_path,
-                "audio_path": audio_path,
-                "script": script,
-                "category": category,
-                "marketing": marketing,
+        job_store.update(
+            job_id,
+            status="completed",
+            progress=100,
+            current_step="Completed",
+            message="Video generation completed successfully!",
+            stage_timings=pipeline.timings,
+            result={
+                "video_path": results["video"],
+                "audio_path": results["voice"],
+                "script": analysis["script"],
+                "category": analysis["category"],
+                "marketing": results["marketing"],
                 "duration": duration,
                 "file_size": "15.2 MB",
                 "resolution": "1080x1920"
             }
-        })
+        )
         
     except Exception as e:
-        processing_jobs[job_id].update({
-            "status": "failed",
-            "error": str(e),
-            "current_step": "Error",
-            "message": f"Processing failed: {str(e)}"
-        })
+        job_store.update(
+            job_id,
+            status="failed",
+            error=str(e),
+            current_step="Error",
+            message=f"Processing failed: {str(e)}",
+            stage_timings=pipeline.timings
+        )
+    finally:
+        running_jobs.discard(job_id)
+
+async def resume_job(job_id: str):
+    """Run a stored job again from its saved parameters and checkpoints"""
+    job = job_store.get(job_id)
+    if job is None:
+        return
+    params = job.get("params")
+    if not params:
+        job_store.update(job_id, status="failed", error="Job has no stored parameters, cannot resume")
+        return
+    
+    if params.get("pipeline") == "v2":
+        await process_content_to_video_v2(
+            job_id, params["url"], params["duration"], params["voice_style"], params.get("use_ai", True),
+            params.get("bypass_cache", False)
+        )
+    else:
+        await process_content_to_video(
+            job_id, params.get("file_path"), params.get("filename"), params.get("url"),
+            params["duration"], params["voice_style"], params.get("chapter"), params.get("bypass_cache", False)
+        )
+
+@app.on_event("startup")
+async def start_job_recovery():
+    """Resume jobs left behind by a crashed or redeployed worker"""
+    loop = asyncio.get_running_loop()
+    JobRecovery.from_env(
+        job_store,
+        resubmit=lambda job_id: asyncio.run_coroutine_threadsafe(resume_job(job_id), loop),
+        owned_jobs=lambda: list(running_jobs)
+    ).start()
+
+@app.on_event("shutdown")
+async def close_http_client():
+    """Close pooled keep-alive connections of the app's event loop"""
+    await http_client.aclose()
+    await llm_client.aclose()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Streaming multipart/form-data parser
+Writes uploaded files to a spool file on disk while hashing them, chunk by chunk
+"""
+
+import os
+import uuid
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', 200 * 1024 * 1024))
+UPLOAD_DIR = os.environ.get('UPLOAD_DIR', 'uploads')
+READ_CHUNK_SIZE = 64 * 1024
+
+# Non-file fields are kept in memory, so they get a small limit of their own
+MAX_FIELD_BYTES = 64 * 1024
+MAX_HEADER_BYTES = 16 * 1024
+
+
+class UploadTooLarge(Exception):
+    """The request body exceeds the upload limit (HTTP 413)"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds the {limit // (1024 * 1024)} MB limit")
+        self.limit = limit
+
+
+class MultipartError(ValueError):
+    """The body is not valid multipart/form-data (HTTP 400)"""
+
+
+class SpooledUpload:
+    """A file part that has been written to disk"""
+
+    def __init__(self, field: str, filename: str, content_type: str, path: str, size: int, sha256: str):
+        self.field = field
+        self.filename = filename
+        self.content_type = content_type
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    @property
+    def extension(self) -> str:
+        return Path(self.filename).suffix.lower().lstrip(".")
+
+    def move_to(self, target: str):
+        """Rename the spool file (same filesystem, no copy)"""
+        os.replace(self.path, target)
+        self.path = target
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "filename": self.filename,
+            "content_type": self.content_type,
+            "path": self.path,
+            "size": self.size,
+            "sha256": self.sha256
+        }
+
+
+class SpoolWriter:
+    """Append-only spool file that tracks size and SHA-256 as data arrives"""
+
+    def __init__(self, spool_dir: str = UPLOAD_DIR, max_bytes: int = MAX_UPLOAD_BYTES):
+        os.makedirs(spool_dir, exist_ok=True)
+        self.path = os.path.join(spool_dir, f".{uuid.uuid4().hex}.part")
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file = open(self.path, "wb")
+
+    def write(self, data) -> None:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(self.max_bytes)
+        self._hash.update(data)
+        self._file.write(data)
+
+    def close(self) -> str:
+        """Close the file and return the hex digest"""
+        self._file.close()
+        return self._hash.hexdigest()
+
+    def discard(self):
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def parse_options_header(value: str) -> Tuple[str, Dict[str, str]]:
+    """Split ``type/subtype; key="value"`` into the main value and params"""
+    parts = value.split(";")
+    params = {}
+    for part in parts[1:]:
+        key, _, param = part.strip().partition("=")
+        if key:
+            param = param.strip()
+            if len(param) >= 2 and param[0] == param[-1] == '"':
+                param = param[1:-1].replace('\\"', '"')
+            params[key.lower()] = param
+    return parts[0].strip().lower(), params
+
+
+class MultipartParser:
+    """Push parser: ``feed()`` body chunks as they arrive, then ``close()``
+
+    File parts stream straight into SpoolWriters; only the tail of the
+    buffer that might hold a partial boundary is kept in memory, so memory
+    use is bounded by the chunk size regardless of the upload size.
+    """
+
+    def __init__(self, boundary: str, spool_dir: str = UPLOAD_DIR, max_bytes: int = MAX_UPLOAD_BYTES):
+        if not boundary or len(boundary) > 200:
+            raise MultipartError("Invalid multipart boundary")
+        self.spool_dir = spool_dir
+        self.max_bytes = max_bytes
+        self.fields: Dict[str, str] = {}
+        self.files: List[SpooledUpload] = []
+        # The first boundary has no leading CRLF; pretend it had one
+        self._delimiter = b"\r\n--" + boundary.encode("latin-1")
+        self._buffer = bytearray(b"\r\n")
+        self._state = "preamble"
+        self._received = 0
+        self._part: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_content_type(cls, content_type: Optional[str], **kwargs) -> "MultipartParser":
+        mime, params = parse_options_header(content_type or "")
+        if mime != "multipart/form-data" or "boundary" not in params:
+            raise MultipartError("Expected multipart/form-data with a boundary")
+        return cls(params["boundary"], **kwargs)
+
+    def feed(self, chunk: bytes):
+        self._received += len(chunk)
+        if self._received > self.max_bytes + MAX_HEADER_BYTES:
+            raise UploadTooLarge(self.max_bytes)
+        self._buffer += chunk
+        try:
+            self._process()
+        except Exception:
+            self.abort()
+            raise
+
+    def close(self) -> Tuple[Dict[str, str], List[SpooledUpload]]:
+        """Finish parsing; returns ``(fields, files)``"""
+        if self._state != "done":
+            self.abort()
+            raise MultipartError("Multipart body ended before the closing boundary")
+        return self.fields, self.files
+
+    def abort(self):
+        """Delete everything spooled so far"""
+        if self._part and self._part.get("writer"):
+            self._part["writer"].discard()
+        self._part = None
+        for upload in self.files:
+            upload.discard()
+        self.files = []
+        self._state = "done"
+
+    def _process(self):
+        delimiter = self._delimiter
+        while True:
+            if self._state == "preamble":
+                index = self._buffer.find(delimiter)
+                if index < 0:
+                    # Keep only what could be the start of the delimiter
+                    del self._buffer[:max(0, len(self._buffer) - len(delimiter))]
+                    return
+                del self._buffer[:index + len(delimiter)]
+                self._state = "after_boundary"
+
+            elif self._state == "after_boundary":
+                if len(self._buffer) < 2:
+                    return
+                if self._buffer[:2] == b"--":
+                    self._state = "done"
+                    self._buffer.clear()
+                    return
+                line_end = self._buffer.find(b"\r\n")
+                if line_end < 0:
+                    if len(self._buffer) > 64:
+                        raise MultipartError("Malformed boundary line")
+                    return
+                del self._buffer[:line_end + 2]
+                self._state = "headers"
+
+            elif self._state == "headers":
+                end = self._buffer.find(b"\r\n\r\n")
+                if end < 0:
+                    if len(self._buffer) > MAX_HEADER_BYTES:
+                        raise MultipartError("Part headers too large")
+                    return
+                self._start_part(bytes(self._buffer[:end]))
+                del self._buffer[:end + 4]
+                self._state = "body"
+
+            elif self._state == "body":
+                index = self._buffer.find(delimiter)
+                if index < 0:
+                    safe = len(self._buffer) - len(delimiter) + 1
+                    if safe > 0:
+                        self._write_part(self._buffer[:safe])
+                        del self._buffer[:safe]
+                    return
+                self._write_part(self._buffer[:index])
+                del self._buffer[:index + len(delimiter)]
+                self._finish_part()
+                self._state = "after_boundary"
+
+            else:  # done: ignore the epilogue
+                self._buffer.clear()
+                return
+
+    def _start_part(self, raw_headers: bytes):
+        headers = {}
+        for line in raw_headers.decode("utf-8", "replace").split("\r\n"):
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        disposition, params = parse_options_header(headers.get("content-disposition", ""))
+        if disposition != "form-data" or "name" not in params:
+            raise MultipartError("Part without a form-data name")
+
+        part = {"name": params["name"]}
+        if "filename" in params:
+            part["filename"] = os.path.basename(params["filename"].replace("\\", "/"))
+            part["content_type"] = headers.get("content-type", "application/octet-stream")
+            part["writer"] = SpoolWriter(self.spool_dir, self.max_bytes)
+        else:
+            part["value"] = bytearray()
+        self._part = part
+
+    def _write_part(self, data):
+        if not len(data):
+            return
+        part = self._part
+        if "writer" in part:
+            part["writer"].write(data)
+        else:
+            part["value"] += data
+            if len(part["value"]) > MAX_FIELD_BYTES:
+                raise MultipartError(f"Field '{part['name']}' is too large")
+
+    def _finish_part(self):
+        part, self._part = self._part, None
+        if "writer" in part:
+            writer = part["writer"]
+            digest = writer.close()
+            if part["filename"]:
+                self.files.append(SpooledUpload(
+                    part["name"], part["filename"], part["content_type"], writer.path, writer.size, digest
+                ))
+            else:
+                # Empty file input: browsers send a part with filename=""
+                writer.discard()
+        else:
+            self.fields[part["name"]] = part["value"].decode("utf-8", "replace")
+
+
+def parse_request_body(stream, content_type: Optional[str], content_length: int,
+                       spool_dir: str = UPLOAD_DIR,
+                       max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[Dict[str, str], List[SpooledUpload]]:
+    """Parse a blocking request body of known length (http.server's ``rfile``)
+
+    Oversized requests are refused from Content-Length before any byte is
+    read, and counted again while streaming in case the header lies.
+    """
+    if content_length > max_bytes + MAX_HEADER_BYTES:
+        raise UploadTooLarge(max_bytes)
+    parser = MultipartParser.from_content_type(content_type, spool_dir=spool_dir, max_bytes=max_bytes)
+    remaining = content_length
+    while remaining > 0:
+        chunk = stream.read(min(READ_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        parser.feed(chunk)
+    return parser.close()
+
+
+async def parse_request_stream(chunks, content_type: Optional[str], content_length: Optional[int] = None,
+                               spool_dir: str = UPLOAD_DIR,
+                               max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[Dict[str, str], List[SpooledUpload]]:
+    """Parse an async iterator of body chunks (Starlette's ``request.stream()``)
+
+    Disk writes happen inline; they go to the page cache and are small
+    compared to the network reads, so no thread hop per chunk.
+    """
+    if content_length is not None and content_length > max_bytes + MAX_HEADER_BYTES:
+        raise UploadTooLarge(max_bytes)
+    parser = MultipartParser.from_content_type(content_type, spool_dir=spool_dir, max_bytes=max_bytes)
+    async for chunk in chunks:
+        if chunk:
+            parser.feed(chunk)
+    return parser.close()
+
+
+# Export for easy import
+__all__ = ['MultipartParser', 'SpooledUpload', 'SpoolWriter', 'parse_request_body', 'parse_request_stream',
+           'UploadTooLarge', 'MultipartError', 'MAX_UPLOAD_BYTES', 'UPLOAD_DIR']
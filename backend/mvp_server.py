@@ -8,14 +8,33 @@ Sử dụng http.server thay vì FastAPI
 import json
 import os
 import uuid
-import threading
 import time
 import asyncio
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import logging
 from pathlib import Path
 
+from http_server_pool import create_server
+from job_scheduler import job_scheduler, SchedulerFull
+from job_store import job_store
+from job_events import sse_broadcaster, format_sse
+from job_recovery import JobRecovery
+from job_workspace import JobWorkspace
+from pipeline import Stage, StagePipeline
+from render_pool import render_pool
+from file_streaming import plan_file_response, send_file
+from multipart_upload import parse_request_body, UploadTooLarge, MultipartError
+from upload_store import upload_store, extraction_cache
+from pdf_extraction import pdf_extraction_pool
+from http_client import http_client
+from http_cache import http_cache
+from document_index import document_indexer, index_summary, ChapterNotFound
+from prompt_budget import prompt_budget
+from llm_cache import llm_cache
+from llm_client import llm_client
+from document_readers import get_reader
+
 # Import our services
 try:
     from ai_services import content_processor, voice_generator, marketing_generator
@@ -50,10 +69,17 @@ logger = logging.getLogger(__name__)
 os.makedirs("uploads", exist_ok=True)
 os.makedirs("outputs", exist_ok=True)
 
-# Lưu trữ jobs đang xử lý (trong production sẽ dùng database)
-jobs = {}
+# Jobs are persisted in the shared job store (SQLite by default)
+
+# Pooled server instance, set by run_mvp_server (used for /health metrics)
+httpd = None
 
 class MVPHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps polling clients on one connection; idle sockets are
+    # closed after the keep-alive timeout so they don't pin pool workers
+    protocol_version = "HTTP/1.1"
+    timeout = int(os.environ.get('MVP_KEEPALIVE_TIMEOUT', 5))
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -94,12 +120,21 @@ class MVPHandler(BaseHTTPRequestHandler):
                 self.handle_root()
             elif path == "/health":
                 self.handle_health()
+            elif path.startswith("/api/job/") and path.endswith("/events"):
+                job_id = path.split("/")[-2]
+                self.handle_job_events(job_id)
             elif path.startswith("/api/job/"):
                 job_id = path.split("/")[-1]
                 self.handle_job_status(job_id)
+            elif path.startswith("/api/document/") and path.endswith("/chapters"):
+                file_id = path.split("/")[-2]
+                self.handle_document_chapters(file_id)
             elif path.startswith("/api/download/"):
                 file_id = path.split("/")[-1]
                 self.handle_download(file_id)
+            elif path.startswith("/api/preview/"):
+                file_id = path.split("/")[-1]
+                self.handle_download(file_id, inline=True)
             else:
                 self.send_error(404, "Endpoint not found")
                 
@@ -107,6 +142,16 @@ class MVPHandler(BaseHTTPRequestHandler):
             logger.error(f"Error handling GET request: {e}")
             self.send_error_response(500, f"Internal error: {str(e)}")
 
+    def do_HEAD(self):
+        """Handle HEAD requests (video players probe size and range support)"""
+        path = urlparse(self.path).path
+        if path.startswith("/api/download/"):
+            self.handle_download(path.split("/")[-1])
+        elif path.startswith("/api/preview/"):
+            self.handle_download(path.split("/")[-1], inline=True)
+        else:
+            self.send_error(404, "Endpoint not found")
+
     def do_POST(self):
         """Handle POST requests"""
         logger.info(f"POST request for {self.path}")
@@ -116,6 +161,9 @@ class MVPHandler(BaseHTTPRequestHandler):
                 self.handle_upload()
             elif self.path == "/api/process":
                 self.handle_process()
+            elif self.path.startswith("/api/job/") and self.path.endswith("/retry"):
+                job_id = self.path.split("/")[-2]
+                self.handle_job_retry(job_id)
             else:
                 self.send_error(404, "Endpoint not found")
                 
@@ -136,7 +184,10 @@ class MVPHandler(BaseHTTPRequestHandler):
                 "POST /api/upload": "Upload file",
                 "POST /api/process": "Process content",
                 "GET /api/job/{id}": "Check job status",
-                "GET /api/download/{id}": "Download result"
+                "GET /api/job/{id}/events": "Job progress stream (SSE)",
+                "GET /api/document/{file_id}/chapters": "Chapter index of an uploaded PDF",
+                "GET /api/download/{id}": "Download result",
+                "GET /api/preview/{id}": "Stream result for playback"
             }
         }
         self.send_json_response(response_data)
@@ -147,7 +198,7 @@ class MVPHandler(BaseHTTPRequestHandler):
             "status": "OK",
             "server": "enhanced_mvp_server",
             "timestamp": int(time.time()),
-            "jobs_count": len(jobs),
+            "jobs_count": job_store.count(),
             "ai_services": AI_SERVICES_AVAILABLE,
             "content_extraction": CONTENT_EXTRACTOR_AVAILABLE,
             "video_generation": VIDEO_GENERATOR_AVAILABLE,
@@ -158,30 +209,66 @@ class MVPHandler(BaseHTTPRequestHandler):
                 "url_extraction": CONTENT_EXTRACTOR_AVAILABLE,
                 "video_creation": VIDEO_GENERATOR_AVAILABLE,
                 "voice_synthesis": AI_SERVICES_AVAILABLE
-            }
+            },
+            "server_metrics": httpd.metrics.snapshot() if httpd else None,
+            "scheduler": job_scheduler.stats(),
+            "sse": sse_broadcaster.stats(),
+            "render_pool": render_pool.stats(),
+            "extraction_cache": extraction_cache.stats(),
+            "pdf_extraction": pdf_extraction_pool.stats(),
+            "http_client": http_client.stats(),
+            "http_cache": http_cache.stats(),
+            "prompt_budget": prompt_budget.stats(),
+            "llm_cache": llm_cache.stats(),
+            "llm_client": llm_client.stats()
         }
         self.send_json_response(response_data)
 
     def handle_upload(self):
-        """Handle file upload"""
+        """Handle file upload (multipart body streamed to disk)"""
         try:
-            # Parse multipart form data (simplified)
-            content_length = int(self.headers.get('Content-Length', 0))
+            if 'Content-Length' not in self.headers:
+                self.close_connection = True
+                self.send_error_response(411, "Content-Length required")
+                return
+            content_length = int(self.headers['Content-Length'])
             if content_length == 0:
                 self.send_error_response(400, "No file uploaded")
                 return
+
+            try:
+                fields, files = parse_request_body(
+                    self.rfile, self.headers.get('Content-Type'), content_length
+                )
+            except UploadTooLarge as e:
+                # The rest of the body is never read, so the connection can't be reused
+                self.close_connection = True
+                self.send_error_response(413, str(e))
+                return
+            except MultipartError as e:
+                self.close_connection = True
+                self.send_error_response(400, str(e))
+                return
+
+            if not files:
+                self.send_error_response(400, "No file uploaded")
+                return
+            upload = files[0]
+            for extra in files[1:]:
+                extra.discard()
                 
-            # Generate unique file ID
-            file_id = str(uuid.uuid4())
-            
-            # Simulate file saving (trong thực tế sẽ parse multipart data)
-            file_path = f"uploads/{file_id}.pdf"
+            # The content hash is the file ID, so re-uploads share one file
+            file_id, file_path, deduplicated = upload_store.store(upload)
             
             response_data = {
                 "success": True,
                 "file_id": file_id,
                 "message": "File uploaded successfully",
-                "file_path": file_path
+                "file_path": file_path,
+                "deduplicated": deduplicated,
+                "filename": upload.filename,
+                "size": upload.size,
+                "sha256": upload.sha256
             }
             self.send_json_response(response_data)
             
@@ -201,6 +288,15 @@ class MVPHandler(BaseHTTPRequestHandler):
             if 'content_type' not in request_data:
                 self.send_error_response(400, "Missing content_type")
                 return
+            chapter = (request_data.get('settings') or {}).get('chapter')
+            if chapter is not None and (not isinstance(chapter, int) or isinstance(chapter, bool) or chapter < 1):
+                self.send_error_response(400, "chapter must be a positive chapter number")
+                return
+            if chapter is not None:
+                error = self.check_chapter(request_data, chapter)
+                if error:
+                    self.send_error_response(400, error)
+                    return
                 
             # Generate job ID
             job_id = str(uuid.uuid4())
@@ -208,7 +304,7 @@ class MVPHandler(BaseHTTPRequestHandler):
             # Create job
             job = {
                 "id": job_id,
-                "status": "processing",
+                "status": "queued",
                 "progress": 0,
                 "created_at": int(time.time()),
                 "content_type": request_data['content_type'],
@@ -219,16 +315,26 @@ class MVPHandler(BaseHTTPRequestHandler):
                 "error": None
             }
             
-            jobs[job_id] = job
+            job_store.create(job)
             
-            # Start processing in background
-            threading.Thread(target=self.process_content_background, args=(job_id,)).start()
+            # Queue for the worker pool; refuse with 429 when the queue is full
+            try:
+                job_scheduler.submit(job_id, lambda: process_job(job_id))
+            except SchedulerFull as e:
+                job_store.delete(job_id)
+                logger.warning(f"⚠️ Job queue full, rejecting job {job_id}")
+                self.send_error_response(
+                    429,
+                    "Server is busy, please retry later",
+                    headers={"Retry-After": str(e.retry_after)}
+                )
+                return
             
             response_data = {
                 "success": True,
                 "job_id": job_id,
-                "message": "Processing started",
-                "status": "processing"
+                "message": "Processing queued",
+                "status": "queued"
             }
             self.send_json_response(response_data)
             
@@ -236,19 +342,76 @@ class MVPHandler(BaseHTTPRequestHandler):
             logger.error(f"Process error: {e}")
             self.send_error_response(500, f"Processing failed: {str(e)}")
 
+    def check_chapter(self, request_data, chapter):
+        """Why ``chapter`` can't be made into a video, or None if it may be
+
+        Only an index built earlier is consulted: building one reads the
+        whole book, so without it the job is queued and its extract stage
+        fails it if the chapter does not exist.
+        """
+        file_path = upload_store.path_for(request_data.get('file_id') or '')
+        if request_data['content_type'] == 'url' or file_path is None:
+            return "chapter requires an uploaded file"
+        if not file_path.lower().endswith(".pdf"):
+            return "Chapters are only available for PDF files"
+        index = document_indexer.cached_index(file_path)
+        if index is not None:
+            try:
+                document_indexer.chapter(index, chapter)
+            except ChapterNotFound as e:
+                return str(e)
+        return None
+
+    def handle_job_retry(self, job_id):
+        """Re-queue a failed job; finished stages are restored from checkpoints"""
+        try:
+            job = job_store.get(job_id)
+            if job is None:
+                self.send_error_response(404, "Job not found")
+                return
+            if job["status"] not in ("failed", "error"):
+                self.send_error_response(409, f"Job is {job['status']}, only failed jobs can be retried")
+                return
+
+            job_store.update(job_id, status="queued", error=None, current_step="Queued for retry")
+            try:
+                job_scheduler.submit(job_id, lambda: process_job(job_id))
+            except SchedulerFull as e:
+                job_store.update(job_id, status=job["status"], error=job.get("error"))
+                self.send_error_response(
+                    429,
+                    "Server is busy, please retry later",
+                    headers={"Retry-After": str(e.retry_after)}
+                )
+                return
+
+            self.send_json_response({
+                "success": True,
+                "job_id": job_id,
+                "message": "Retry queued",
+                "status": "queued"
+            })
+
+        except Exception as e:
+            logger.error(f"Job retry error: {e}")
+            self.send_error_response(500, f"Retry failed: {str(e)}")
+
     def handle_job_status(self, job_id):
         """Check job status"""
         try:
-            if job_id not in jobs:
+            job = job_store.get(job_id)
+            if job is None:
                 self.send_error_response(404, "Job not found")
                 return
                 
-            job = jobs[job_id]
             response_data = {
                 "job_id": job_id,
                 "status": job["status"],
                 "progress": job["progress"],
+                "current_step": job.get("current_step"),
+                "render_progress": job.get("render_progress"),
                 "created_at": job["created_at"],
+                "stage_timings": job.get("stage_timings"),
                 "result": job.get("result"),
                 "error": job.get("error")
             }
@@ -258,185 +421,114 @@ class MVPHandler(BaseHTTPRequestHandler):
             logger.error(f"Job status error: {e}")
             self.send_error_response(500, f"Status check failed: {str(e)}")
 
-    def handle_download(self, file_id):
-        """Handle file download"""
+    def handle_document_chapters(self, file_id):
+        """Chapter index of an uploaded PDF (built on first request, then cached)"""
+        try:
+            file_path = upload_store.path_for(file_id)
+            if file_path is None:
+                self.send_error_response(404, "File not found")
+                return
+            if not file_path.lower().endswith(".pdf"):
+                self.send_error_response(400, "Chapter index is only available for PDF files")
+                return
+
+            # Indexing reads the whole book: build it off the request and
+            # have the client poll until it is ready
+            index = document_indexer.cached_index(file_path)
+            if index is None:
+                document_indexer.build_in_background(file_path)
+                self.send_json_response(
+                    {"success": True, "file_id": file_id, "status": "indexing"},
+                    202,
+                    headers={"Retry-After": "5"}
+                )
+                return
+            self.send_json_response(dict(index_summary(index), success=True, file_id=file_id))
+
+        except Exception as e:
+            logger.error(f"Chapter index error: {e}")
+            self.send_error_response(500, f"Chapter index failed: {str(e)}")
+
+    def handle_job_events(self, job_id):
+        """Stream job progress as Server-Sent Events"""
+        if job_store.get(job_id) is None:
+            self.send_error_response(404, "Job not found")
+            return
+
+        # The stream has no length, so the connection ends with it
+        self.close_connection = True
+        self.send_response(200)
+        self.send_cors_headers()
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.flush()
+
+        # Hand the socket to the broadcaster thread and free this worker
+        if httpd is not None and sse_broadcaster.subscribe(self.connection, job_id):
+            httpd.detach_request(self.connection)
+        else:
+            self.wfile.write(format_sse("error", {"job_id": job_id, "error": "Too many event streams"}))
+
+    def handle_download(self, file_id, inline=False):
+        """Stream a result video (Range requests let <video> seek)"""
         try:
-            # Simulate file download
             file_path = f"outputs/{file_id}.mp4"
+            job = job_store.get(file_id)
+            if job and job.get("result"):
+                # Finished videos live in the job's workspace
+                file_path = job["result"].get("video_path") or file_path
             
             if not os.path.exists(file_path):
                 self.send_error_response(404, "File not found")
                 return
-                
-            # Send file (simplified - trong thực tế sẽ stream file)
-            response_data = {
-                "success": True,
-                "file_id": file_id,
-                "download_url": f"/outputs/{file_id}.mp4",
-                "message": "File ready for download"
-            }
-            self.send_json_response(response_data)
+            
+            # API clients asking for JSON get the links instead of the bytes
+            accept = self.headers.get('Accept', '')
+            if not inline and 'application/json' in accept and 'video/' not in accept and 'text/html' not in accept:
+                self.send_json_response({
+                    "success": True,
+                    "file_id": file_id,
+                    "download_url": f"/api/download/{file_id}",
+                    "preview_url": f"/api/preview/{file_id}",
+                    "size": os.path.getsize(file_path),
+                    "message": "File ready for download"
+                })
+                return
+            
+            self.send_file_response(file_path, f"video_{file_id}.mp4", inline)
             
         except Exception as e:
             logger.error(f"Download error: {e}")
             self.send_error_response(500, f"Download failed: {str(e)}")
 
-    def process_content_background(self, job_id):
-        """Background processing with real AI services"""
+    def send_file_response(self, file_path, filename, inline):
+        """Send a file (or the requested byte range) with CORS and caching headers"""
+        plan = plan_file_response(file_path, self.headers, filename=filename, inline=inline)
+        self.send_response(plan.status)
+        self.send_cors_headers()
+        for name, value in plan.headers.items():
+            self.send_header(name, value)
+        self.end_headers()
         
-        async def async_process():
+        if self.command != "HEAD" and plan.has_body:
+            # Zero-copy from the page cache; nothing is read into Python memory
             try:
-                job = jobs[job_id]
-                logger.info(f"Starting background processing for job {job_id} (AI: {AI_SERVICES_AVAILABLE})")
-                
-                # Step 1: Extract content
-                job["progress"] = 10
-                job["current_step"] = "Extracting content"
-                
-                # Real content extraction
-                if CONTENT_EXTRACTOR_AVAILABLE:
-                    logger.info(f"Job {job_id}: Using real content extraction")
-                    if job["content_type"] == "url":
-                        extracted_data = await content_extractor.extract_content("url", job.get('url', ''))
-                    else:
-                        # For file uploads, use file path
-                        file_id = job.get('file_id', '')
-                        file_path = f"uploads/{file_id}"
-                        extracted_data = await content_extractor.extract_content("pdf", file_path)
-                    
-                    content = extracted_data.get('content', '')
-                    content_metadata = extracted_data.get('metadata', {})
-                else:
-                    logger.info(f"Job {job_id}: Using simulated content extraction")
-                    if job["content_type"] == "url":
-                        content = f"Sample content from URL: {job.get('url', '')}"
-                    else:
-                        content = "Sample content from uploaded file"
-                    content_metadata = {"title": "Sample Content"}
-                
-                logger.info(f"Job {job_id}: Content extracted ({len(content)} chars)")
-                
-                # Step 2: AI Content Analysis
-                job["progress"] = 30
-                job["current_step"] = "Analyzing with AI"
-                
-                if AI_SERVICES_AVAILABLE:
-                    logger.info(f"Job {job_id}: Using real AI content analysis")
-                    script_data = await content_processor.analyze_content(
-                        content=content,
-                        duration=job["settings"].get("duration", 180)
-                    )
-                else:
-                    logger.info(f"Job {job_id}: Using simulated content analysis")
-                    script_data = {
-                        "hook": "📚 Bạn có biết bí mật này từ cuốn sách này không?",
-                        "main_points": ["Điểm quan trọng", "Insight thú vị", "Kết luận"],
-                        "script": "Generated script for TikTok video...",
-                        "category": "education",
-                        "keywords": ["sách", "kiến thức"],
-                        "estimated_duration": job["settings"].get("duration", 180)
-                    }
-                    time.sleep(2)
-                
-                # Step 3: Voice Generation
-                job["progress"] = 50
-                job["current_step"] = "Generating voiceover"
-                
-                if AI_SERVICES_AVAILABLE:
-                    logger.info(f"Job {job_id}: Using real voice generation")
-                    voice_file = await voice_generator.generate_speech(
-                        text=script_data['script'],
-                        voice_style=job["settings"].get('voice_style', 'professional')
-                    )
-                else:
-                    logger.info(f"Job {job_id}: Using simulated voice generation")
-                    voice_file = f"outputs/simulated_voice_{job_id}.mp3"
-                    time.sleep(3)
-                
-                # Step 4: Marketing Content
-                job["progress"] = 70
-                job["current_step"] = "Creating marketing content"
-                
-                if AI_SERVICES_AVAILABLE:
-                    logger.info(f"Job {job_id}: Using real marketing generation")
-                    marketing_data = await marketing_generator.generate_marketing(
-                        script=script_data['script'],
-                        category=script_data['category'],
-                        keywords=script_data['keywords']
-                    )
-                else:
-                    logger.info(f"Job {job_id}: Using simulated marketing generation")
-                    marketing_data = {
-                        "caption": "📚✨ Kiến thức vàng từ sách hay!",
-                        "hashtags": ["#sachhay", "#kienthuc", "#viral", "#fyp"],
-                        "description": "Video chia sẻ kiến thức từ sách hay",
-                        "hook": "Bạn nghĩ gì về video này?"
-                    }
-                    time.sleep(1)
-                
-                # Step 5: Video Generation
-                job["progress"] = 90
-                job["current_step"] = "Generating video"
-                
-                if VIDEO_GENERATOR_AVAILABLE:
-                    logger.info(f"Job {job_id}: Using real video generation")
-                    video_result = await video_generator.generate_video(
-                        script_data=script_data,
-                        voice_file=voice_file,
-                        settings=job["settings"]
-                    )
-                    video_path = video_result.get('video_path', '')
-                    video_filename = video_result.get('filename', '')
-                else:
-                    logger.info(f"Job {job_id}: Using simulated video generation")
-                    video_path = f"outputs/simulated_video_{job_id}.mp4"
-                    video_filename = f"simulated_video_{job_id}.mp4"
-                    time.sleep(3)
-                
-                # Complete job
-                job["status"] = "completed"
-                job["progress"] = 100
-                job["current_step"] = "Completed"
-                job["result"] = {
-                    "video_file": video_filename,
-                    "video_path": video_path,
-                    "voice_file": voice_file,
-                    "script": script_data['script'],
-                    "script_data": script_data,
-                    "content_metadata": content_metadata if 'content_metadata' in locals() else {},
-                    "duration": f"{job['settings'].get('duration', 60)} seconds",
-                    "format": "MP4",
-                    "resolution": "1080x1920",
-                    "voice_style": job["settings"].get('voice_style', 'professional'),
-                    "marketing": marketing_data,
-                    "ai_powered": AI_SERVICES_AVAILABLE,
-                    "content_extraction": CONTENT_EXTRACTOR_AVAILABLE,
-                    "video_generation": VIDEO_GENERATOR_AVAILABLE
-                }
-                
-                logger.info(f"✅ Job {job_id} completed successfully (AI: {AI_SERVICES_AVAILABLE})")
-                
-            except Exception as e:
-                logger.error(f"❌ Background processing error for job {job_id}: {e}")
-                job["status"] = "failed"
-                job["error"] = str(e)
-        
-        # Run async function in thread
-        def run_async():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(async_process())
-            loop.close()
-        
-        thread = threading.Thread(target=run_async)
-        thread.start()
+                send_file(self.connection, file_path, plan.offset, plan.length)
+            except OSError:
+                # Client went away mid-transfer (players do this when seeking)
+                self.close_connection = True
 
-    def send_json_response(self, data, status_code=200):
+    def send_json_response(self, data, status_code=200, headers=None):
         """Send JSON response with CORS headers"""
         try:
-            json_data = json.dumps(data, indent=2)
+            json_data = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
             self.send_response(status_code)
             self.send_cors_headers()  # CORS headers for all responses
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
             self.send_header('Content-Type', 'application/json; charset=utf-8')
             self.send_header('Content-Length', str(len(json_data.encode('utf-8'))))
             self.end_headers()
@@ -446,7 +538,7 @@ class MVPHandler(BaseHTTPRequestHandler):
             logger.error(f"❌ Error sending JSON response: {e}")
             self.send_error(500, f"Response error: {str(e)}")
 
-    def send_error_response(self, status_code, message):
+    def send_error_response(self, status_code, message, headers=None):
         """Send error response with CORS headers"""
         error_data = {
             "error": True,
@@ -454,25 +546,215 @@ class MVPHandler(BaseHTTPRequestHandler):
             "message": message,
             "timestamp": int(time.time())
         }
-        self.send_json_response(error_data, status_code)
+        self.send_json_response(error_data, status_code, headers)
 
     def log_message(self, format, *args):
         """Override to use logger"""
         logger.info(format % args)
 
+async def process_job(job_id):
+    """Run the full pipeline for one job (executed by the job scheduler)"""
+    job = job_store.get(job_id)
+    settings = job["settings"]
+    limiter = job_scheduler.limiter
+    # Finished stages are checkpointed here, so a retry skips them
+    workspace = JobWorkspace(job_id)
+
+    # Step 1: Extract content
+    async def extract_stage(results):
+        if CONTENT_EXTRACTOR_AVAILABLE:
+            logger.info(f"Job {job_id}: Using real content extraction")
+            if job["content_type"] == "url":
+                extracted_data = await content_extractor.extract_content("url", job.get('url', ''))
+            else:
+                # For file uploads, use file path; the stored extension picks
+                # the extractor (EPUB, DOCX, TXT), anything else is read as PDF
+                file_id = job.get('file_id', '')
+                file_path = upload_store.path_for(file_id)
+                if file_path is None:
+                    raise ValueError(f"Uploaded file {file_id} not found")
+                file_type = Path(file_path).suffix.lstrip('.').lower()
+                if get_reader(file_type) is None:
+                    file_type = "pdf"
+                # settings.chapter selects one chapter of the document's index
+                extracted_data = await content_extractor.extract_content(
+                    file_type, file_path, chapter=settings.get("chapter")
+                )
+        else:
+            logger.info(f"Job {job_id}: Using simulated content extraction")
+            if job["content_type"] == "url":
+                content = f"Sample content from URL: {job.get('url', '')}"
+            else:
+                content = "Sample content from uploaded file"
+            extracted_data = {"content": content, "metadata": {"title": "Sample Content"}}
+
+        logger.info(f"Job {job_id}: Content extracted ({len(extracted_data.get('content', ''))} chars)")
+        return extracted_data
+
+    # Step 2: AI Content Analysis
+    async def analyze_stage(results):
+        content = results["extract"].get('content', '')
+        if AI_SERVICES_AVAILABLE:
+            logger.info(f"Job {job_id}: Using real AI content analysis")
+            async with limiter.slot("llm"):
+                return await content_processor.analyze_content(
+                    content=content,
+                    duration=settings.get("duration", 180),
+                    bypass_cache=bool(settings.get("bypass_cache", False))
+                )
+
+        logger.info(f"Job {job_id}: Using simulated content analysis")
+        await asyncio.sleep(2)
+        return {
+            "hook": "📚 Bạn có biết bí mật này từ cuốn sách này không?",
+            "main_points": ["Điểm quan trọng", "Insight thú vị", "Kết luận"],
+            "script": "Generated script for TikTok video...",
+            "category": "education",
+            "keywords": ["sách", "kiến thức"],
+            "estimated_duration": settings.get("duration", 180)
+        }
+
+    # Step 3: Voice Generation
+    async def voice_stage(results):
+        script_data = results["analyze"]
+        if AI_SERVICES_AVAILABLE:
+            logger.info(f"Job {job_id}: Using real voice generation")
+            async with limiter.slot("tts"):
+                voice_file = await voice_generator.generate_speech(
+                    text=script_data['script'],
+                    voice_style=settings.get('voice_style', 'professional')
+                )
+            return workspace.adopt_file("voice", voice_file)
+
+        logger.info(f"Job {job_id}: Using simulated voice generation")
+        await asyncio.sleep(3)
+        return f"outputs/simulated_voice_{job_id}.mp3"
+
+    # Step 4: Marketing Content (only needs the script, runs alongside voice/video)
+    async def marketing_stage(results):
+        script_data = results["analyze"]
+        if AI_SERVICES_AVAILABLE:
+            logger.info(f"Job {job_id}: Using real marketing generation")
+            async with limiter.slot("llm"):
+                return await marketing_generator.generate_marketing(
+                    script=script_data['script'],
+                    category=script_data['category'],
+                    keywords=script_data['keywords'],
+                    bypass_cache=bool(settings.get("bypass_cache", False))
+                )
+
+        logger.info(f"Job {job_id}: Using simulated marketing generation")
+        await asyncio.sleep(1)
+        return {
+            "caption": "📚✨ Kiến thức vàng từ sách hay!",
+            "hashtags": ["#sachhay", "#kienthuc", "#viral", "#fyp"],
+            "description": "Video chia sẻ kiến thức từ sách hay",
+            "hook": "Bạn nghĩ gì về video này?"
+        }
+
+    # Step 5: Video Generation
+    async def video_stage(results):
+        if VIDEO_GENERATOR_AVAILABLE:
+            logger.info(f"Job {job_id}: Using real video generation")
+            async with limiter.slot("render"):
+                video_result = await video_generator.generate_video(
+                    script_data=results["analyze"],
+                    voice_file=results["voice"],
+                    settings=settings,
+                    on_progress=lambda fraction: job_store.update(job_id, render_progress=int(fraction * 100))
+                )
+            if isinstance(video_result, dict) and video_result.get("video_path"):
+                video_result["video_path"] = workspace.adopt_file("video", video_result["video_path"])
+            return video_result
+
+        logger.info(f"Job {job_id}: Using simulated video generation")
+        await asyncio.sleep(3)
+        return {
+            "video_path": f"outputs/simulated_video_{job_id}.mp4",
+            "filename": f"simulated_video_{job_id}.mp4"
+        }
+
+    # Stages that call blocking SDKs are offloaded so they overlap; rendering
+    # already runs in the render worker processes
+    pipeline = StagePipeline(
+        [
+            Stage("extract", extract_stage, label="Extracting content", weight=1),
+            Stage("analyze", analyze_stage, deps=["extract"], label="Analyzing with AI", weight=2),
+            Stage("voice", voice_stage, deps=["analyze"], label="Generating voiceover", weight=2, offload=True),
+            Stage("marketing", marketing_stage, deps=["analyze"], label="Creating marketing content", weight=1, offload=True),
+            Stage("video", video_stage, deps=["analyze", "voice"], label="Generating video", weight=4)
+        ],
+        on_progress=lambda progress, step, timings: job_store.update(
+            job_id, progress=progress, current_step=step, stage_timings=timings
+        ),
+        checkpoint=workspace
+    )
+
+    try:
+        job_store.update(job_id, status="processing", started_at=time.time())
+        logger.info(f"Starting background processing for job {job_id} (AI: {AI_SERVICES_AVAILABLE})")
+
+        results = await pipeline.run()
+        script_data = results["analyze"]
+        video_result = results["video"]
+
+        # Complete job
+        job_store.update(
+            job_id,
+            status="completed",
+            progress=100,
+            current_step="Completed",
+            stage_timings=pipeline.timings,
+            result={
+                "video_file": video_result.get('filename', ''),
+                "video_path": video_result.get('video_path', ''),
+                "voice_file": results["voice"],
+                "script": script_data['script'],
+                "script_data": script_data,
+                "content_metadata": results["extract"].get('metadata', {}),
+                "duration": f"{settings.get('duration', 60)} seconds",
+                "format": "MP4",
+                "resolution": "1080x1920",
+                "voice_style": settings.get('voice_style', 'professional'),
+                "marketing": results["marketing"],
+                "ai_powered": AI_SERVICES_AVAILABLE,
+                "content_extraction": CONTENT_EXTRACTOR_AVAILABLE,
+                "video_generation": VIDEO_GENERATOR_AVAILABLE
+            }
+        )
+
+        logger.info(f"✅ Job {job_id} completed successfully (AI: {AI_SERVICES_AVAILABLE})")
+
+    except Exception as e:
+        logger.error(f"❌ Background processing error for job {job_id}: {e}")
+        job_store.update(job_id, status="failed", error=str(e), stage_timings=pipeline.timings)
+
 def run_mvp_server(host='127.0.0.1', port=8005):
     """Start the MVP HTTP server"""
+    global httpd
     try:
         server_address = (host, port)
-        httpd = HTTPServer(server_address, MVPHandler)
+        httpd = create_server(server_address, MVPHandler)
+
+        # Heartbeat our jobs and pick up the ones a dead worker left behind
+        recovery = JobRecovery.from_env(
+            job_store,
+            resubmit=lambda job_id: job_scheduler.submit(job_id, lambda: process_job(job_id)),
+            owned_jobs=job_scheduler.active_job_ids
+        )
+        recovery.start()
         logger.info(f"🚀 MVP Server starting on http://{host}:{port}")
+        logger.info(f"🧵 Connection workers: {httpd.max_workers} (queue: {httpd.max_queued})")
         logger.info("Available endpoints:")
         logger.info("  GET  /          - API info")
         logger.info("  GET  /health    - Health check")
         logger.info("  POST /api/upload - Upload file")
         logger.info("  POST /api/process - Process content")
         logger.info("  GET  /api/job/{id} - Job status")
+        logger.info("  GET  /api/job/{id}/events - Job progress (SSE)")
+        logger.info("  POST /api/job/{id}/retry - Retry a failed job")
         logger.info("  GET  /api/download/{id} - Download result")
+        logger.info("  GET  /api/preview/{id} - Stream result for playback")
         logger.info("✅ Server ready!")
         httpd.serve_forever()
     except KeyboardInterrupt:
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Representative page sampling for long PDFs
+Picks pages spread across the body of a book and extracts only those, skipping front matter, indexes and blank pages
+"""
+
+import os
+import re
+import math
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from pdf_extraction import pdf_extraction_pool, pdf_info
+
+logger = logging.getLogger(__name__)
+
+# "sample" spreads the content budget over the whole book; "head" reads
+# from the first page until the budget is met, as before
+EXTRACTION_MODE = os.environ.get('PDF_EXTRACTION_MODE', 'sample')
+
+# Shorter documents are read from the start
+SAMPLE_MIN_PAGES = int(os.environ.get('PDF_SAMPLE_MIN_PAGES', 40))
+
+# Cleaned characters on a typical book page; sizes the sample to the budget
+PAGE_CHARS_ESTIMATE = 1800
+MIN_SAMPLE_PAGES = 4
+MAX_SAMPLE_PAGES = int(os.environ.get('PDF_MAX_SAMPLE_PAGES', 30))
+
+# Share of pages at each end never sampled (cover, copyright, contents /
+# notes, index, colophon)
+FRONT_MATTER_SHARE = 0.05
+BACK_MATTER_SHARE = 0.08
+
+# A rejected page is replaced by the next page of its stretch, at most
+# this many times
+MAX_RETRIES = 2
+
+# Pages with fewer letters are blank, figures or part titles
+MIN_PAGE_LETTERS = 400
+
+# Short pages carrying these are copyright pages, imprints or contents
+FRONT_MATTER_CHARS = 1500
+FRONT_MATTER_RE = re.compile(
+    r'isbn|all rights reserved|copyright|©|bản quyền|nhà xuất bản|table of contents|mục lục',
+    re.IGNORECASE
+)
+
+# A line ending in page references ("Hegel, 12, 48-50"): tables of
+# contents and indexes are mostly made of them
+PAGE_REFERENCE_LINE_RE = re.compile(r'\d[\d\s,.–-]*$')
+MIN_REFERENCE_LINES = 5
+REFERENCE_LINE_SHARE = 0.5
+
+
+def page_kind(text: str) -> str:
+    """'body' for a page worth sampling, else why not: 'blank', 'index' or 'front'"""
+    letters = sum(char.isalpha() for char in text)
+    if letters < MIN_PAGE_LETTERS:
+        return "blank"
+    lines = [line for line in text.splitlines() if line.strip()]
+    references = sum(1 for line in lines if PAGE_REFERENCE_LINE_RE.search(line))
+    if len(lines) >= MIN_REFERENCE_LINES and references >= len(lines) * REFERENCE_LINE_SHARE:
+        return "index"
+    if len(text) < FRONT_MATTER_CHARS and FRONT_MATTER_RE.search(text):
+        return "front"
+    return "body"
+
+
+def plan_sample(total: int, budget: int, max_pages: int = MAX_SAMPLE_PAGES) -> List[List[int]]:
+    """Candidate pages for each stretch of the book's body, in page order
+
+    The body (the book without its first and last few pages) is cut into
+    equal stretches, one sampled page each: the middle page of the stretch
+    first, then the pages after it if that one is rejected.
+    """
+    first = min(total - 1, math.ceil(total * FRONT_MATTER_SHARE))
+    stop = max(first + 1, total - math.ceil(total * BACK_MATTER_SHARE))
+    count = min(stop - first, max_pages, max(MIN_SAMPLE_PAGES, math.ceil(budget / PAGE_CHARS_ESTIMATE)))
+    if count <= 0:
+        return []
+    width = (stop - first) / count
+    stretches = []
+    for n in range(count):
+        low = first + int(n * width)
+        high = first + int((n + 1) * width)
+        middle = (low + high) // 2
+        stretches.append(list(range(middle, min(high, middle + MAX_RETRIES + 1))))
+    return stretches
+
+
+def fit_to_budget(texts: List[str], budget: int, separator: str = " ") -> str:
+    """Join page texts, giving each an even share of the budget
+
+    Pages shorter than their share hand the rest on to longer ones; a cut
+    page ends at its last full sentence when there is one near the cut.
+    """
+    limits = [0] * len(texts)
+    remaining = budget
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    for placed, i in enumerate(order):
+        share = max(0, remaining // (len(texts) - placed) - len(separator))
+        limits[i] = min(len(texts[i]), share)
+        remaining -= limits[i] + len(separator)
+
+    parts = []
+    for text, limit in zip(texts, limits):
+        if limit < len(text):
+            cut = text.rfind('. ', 0, limit)
+            text = text[:cut + 1] if cut >= limit * 0.6 else text[:limit]
+        if text:
+            parts.append(text)
+    return separator.join(parts)[:budget]
+
+
+class PageSampler:
+    """Extracts a sample of pages spread across a long PDF"""
+
+    def __init__(self, min_pages: int = SAMPLE_MIN_PAGES, max_pages: int = MAX_SAMPLE_PAGES):
+        self.min_pages = min_pages
+        self.max_pages = max_pages
+
+    def applies(self, pages: int) -> bool:
+        return EXTRACTION_MODE == "sample" and pages >= self.min_pages
+
+    async def sample(self, path: str, budget: int, clean: Optional[Callable[[str], str]] = None,
+                     info: Optional[Dict[str, Any]] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Text of representative pages within ``budget`` and document info
+
+        Only the sampled pages (and the replacements for rejected ones) are
+        extracted. Returns None when the document is too short to sample or
+        no sampled page has body text; read it from the start instead.
+        ``info`` lists the sampled pages (1-based) under ``sampled_pages``.
+        Pass the document's ``pdf_info`` to save reading it again.
+        """
+        info = dict(info) if info is not None else await asyncio.to_thread(pdf_info, path)
+        if not self.applies(info["pages"]):
+            return None
+
+        stretches = plan_sample(info["pages"], budget, self.max_pages)
+        chosen: Dict[int, Tuple[int, str]] = {}
+        rejected: Counter = Counter()
+        for attempt in range(MAX_RETRIES + 1):
+            wanted = {n: stretch[attempt] for n, stretch in enumerate(stretches)
+                      if n not in chosen and attempt < len(stretch)}
+            if not wanted:
+                break
+            texts = await pdf_extraction_pool.extract_selected(path, list(wanted.values()))
+            for n, number in wanted.items():
+                kind = page_kind(texts[number])
+                if kind == "body":
+                    chosen[n] = (number, texts[number])
+                else:
+                    rejected[kind] += 1
+
+        if not chosen:
+            logger.info(f"📄 No body pages among {sum(rejected.values())} sampled, reading from the start")
+            return None
+
+        pages = [chosen[n] for n in sorted(chosen)]
+        texts = [clean(text) if clean else text for _, text in pages]
+        info["sampled_pages"] = [number + 1 for number, _ in pages]
+        info["extracted_pages"] = len(pages) + sum(rejected.values())
+        logger.info(f"📄 Sampled {len(pages)} of {info['pages']} pages"
+                    + (f", skipped {dict(rejected)}" if rejected else ""))
+        return fit_to_budget(texts, budget), info
+
+
+# Initialize shared sampler
+page_sampler = PageSampler()
+
+# Export for easy import
+__all__ = ['page_sampler', 'PageSampler', 'page_kind', 'plan_sample', 'fit_to_budget', 'EXTRACTION_MODE']
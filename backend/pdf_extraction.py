@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Parallel page-level PDF text extraction
+Splits a document's pages across worker processes and reassembles them in order
+"""
+
+import io
+import os
+import math
+import mmap
+import asyncio
+import itertools
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Callable, Collection, Iterable, Iterator, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Minimum pages per task: large enough to amortise opening the document
+# in the worker, small enough that the budget check can stop work early
+PAGES_PER_TASK = int(os.environ.get('PDF_PAGES_PER_TASK', 8))
+
+# Tasks per worker for big documents; each task walks the page tree up to
+# its range, so fewer, larger tasks keep that overhead small
+TASKS_PER_WORKER = 4
+
+
+class _MappedStream(io.RawIOBase):
+    """A read-only file object over a MappedPDF with its own position
+
+    Parsers seek freely, so pdfplumber and PyPDF2 each get their own
+    stream; reads copy only the bytes asked for out of the mapping.
+    """
+
+    def __init__(self, view: memoryview):
+        super().__init__()
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._pos = offset
+        return offset
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else min(self._pos + size, len(self._view))
+        if end <= self._pos:
+            return b""
+        data = self._view[self._pos:end].tobytes()
+        self._pos = end
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._view = memoryview(b"")
+        super().close()
+
+
+class MappedPDF:
+    """One read-only mapping of a PDF shared by every parser that opens it
+
+    A path is memory-mapped rather than read: the kernel pages the file in
+    as parsers touch it, straight from the page cache, and the pages stay
+    reclaimable. Bytes are wrapped without copying. ``stream()`` hands out
+    independent file objects over the same memory, so the pdfplumber
+    attempt and the PyPDF2 fallback never hold separate copies of the file
+    (PyPDF2 given a path would read all of it into a BytesIO).
+    """
+
+    def __init__(self, source: Union[str, bytes]):
+        self._mmap = None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._view = memoryview(source)
+            return
+        with open(source, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                self._view = memoryview(b"")
+                return
+            # The mapping keeps its own reference to the file
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+    def stream(self) -> _MappedStream:
+        return _MappedStream(self._view)
+
+    def close(self):
+        try:
+            self._view.release()
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:
+            # A parser still holds a slice; the mapping goes with it
+            pass
+
+    def __enter__(self) -> "MappedPDF":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _forget_objects(plumber, reader):
+    """Drop the parsers' caches of resolved objects after a page
+
+    pdfminer and PyPDF2 keep every object they resolve (image and content
+    streams included) for the life of the document, so a scanned book
+    would otherwise end up in memory page by page. Shared objects such as
+    fonts are cached separately and survive.
+    """
+    cached = getattr(getattr(plumber, "doc", None), "_cached_objs", None)
+    if cached:
+        cached.clear()
+    if reader is not None:
+        reader.resolved_objects.clear()
+
+
+def _iter_pages(source: Union[str, bytes], start: int = 0, stop: Optional[int] = None,
+                only: Optional[Collection[int]] = None) -> Iterator[Tuple[str, bool]]:
+    """Yield ``(text, fell_back)`` for pages ``[start, stop)``, one at a time
+
+    The page tree is walked lazily and each page is laid out only when the
+    consumer asks for it, so a caller that stops iterating never opens the
+    remaining pages. pdfplumber's own ``pages=`` filter would resolve every
+    page object in the file up front. A page pdfplumber can't handle is
+    retried with PyPDF2 on its own instead of abandoning the whole document.
+    Both parsers read the same MappedPDF, and neither keeps a page's
+    objects once its text is out. With ``only``, other pages in the range
+    are passed over without being laid out and yield nothing.
+    """
+    document = MappedPDF(source)
+    plumber = None
+    page_objects = None
+    try:
+        import pdfplumber
+        from pdfplumber.page import Page
+        from pdfminer.pdfpage import PDFPage
+        plumber = pdfplumber.open(document.stream())
+        page_objects = itertools.islice(PDFPage.create_pages(plumber.doc), start, stop)
+    except Exception as e:
+        logger.warning(f"⚠️ pdfplumber could not open the PDF, using PyPDF2: {e}")
+
+    reader = None
+    number = start
+    try:
+        while stop is None or number < stop:
+            text = None
+            page_obj = None
+            if page_objects is not None:
+                try:
+                    page_obj = next(page_objects, None)
+                except Exception:
+                    # Broken page tree: PyPDF2 takes over from here
+                    page_obj, page_objects = None, None
+                if page_obj is None and page_objects is not None:
+                    return
+            if only is not None and number not in only:
+                number += 1
+                continue
+            if page_obj is not None:
+                try:
+                    page = Page(plumber, page_obj, page_number=number + 1, initial_doctop=0)
+                    text = page.extract_text() or ""
+                    # Drop the parsed layout objects before the next page
+                    page.flush_cache()
+                except Exception:
+                    text = None
+
+            fell_back = text is None
+            if fell_back:
+                if reader is None:
+                    try:
+                        import PyPDF2
+                        reader = PyPDF2.PdfReader(document.stream())
+                    except Exception as e:
+                        logger.warning(f"⚠️ PyPDF2 could not open the PDF: {e}")
+                        return
+                if number >= len(reader.pages):
+                    return
+                try:
+                    text = reader.pages[number].extract_text() or ""
+                except Exception:
+                    text = ""
+            _forget_objects(plumber, reader)
+            yield text, fell_back
+            number += 1
+    finally:
+        if plumber is not None:
+            plumber.close()
+        reader = page_objects = plumber = None
+        document.close()
+
+
+def iter_page_texts(source: Union[str, bytes], start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Page texts of a PDF path or bytes, extracted lazily in page order"""
+    pages = _iter_pages(source, start, stop)
+    try:
+        for text, _ in pages:
+            yield text
+    finally:
+        pages.close()
+
+
+def join_within_budget(texts: Iterable[str], budget: Optional[int], separator: str = " ") -> str:
+    """Join non-empty texts until ``budget`` characters, then stop pulling
+
+    Pieces go into a list and are joined once, so building the result is
+    linear in its length. If ``texts`` is a generator it is closed as soon
+    as the budget is met, so no further pages are extracted.
+    """
+    parts: List[str] = []
+    length = 0
+    try:
+        for text in texts:
+            if not text:
+                continue
+            parts.append(text)
+            length += len(text) + len(separator)
+            if budget is not None and length >= budget:
+                break
+    finally:
+        close = getattr(texts, "close", None)
+        if close is not None:
+            close()
+    joined = separator.join(parts)
+    return joined if budget is None else joined[:budget]
+
+
+def extract_page_range(path: str, start: int, stop: int) -> Tuple[int, List[str], int]:
+    """Extract pages ``[start, stop)`` (runs in a worker process)
+
+    Each worker opens the file itself; only the path and the page texts
+    cross the process boundary. Returns ``(start, texts, fallback_pages)``.
+    """
+    texts: List[str] = []
+    fallbacks = 0
+    for text, fell_back in _iter_pages(path, start, stop):
+        texts.append(text)
+        fallbacks += fell_back
+    # Keep list indexes aligned with page numbers even if the file ends early
+    texts.extend([""] * (stop - start - len(texts)))
+    return start, texts, fallbacks
+
+
+def extract_selected_pages(path: str, numbers: Sequence[int]) -> Tuple[Dict[int, str], int]:
+    """Extract only the given pages (runs in a worker process)
+
+    The document is opened once and the pages in between are skipped
+    without layout. Returns ``({page: text}, fallback_pages)``.
+    """
+    numbers = sorted(set(numbers))
+    texts: Dict[int, str] = {}
+    fallbacks = 0
+    if not numbers:
+        return texts, fallbacks
+    pages = _iter_pages(path, numbers[0], numbers[-1] + 1, only=frozenset(numbers))
+    for number, (text, fell_back) in zip(numbers, pages):
+        texts[number] = text
+        fallbacks += fell_back
+    return texts, fallbacks
+
+
+def _page_count(doc) -> int:
+    """Pages of a pdfminer document from the page tree root's /Count
+
+    The tree is only walked (lazily, no page laid out) when the root has no
+    usable /Count.
+    """
+    from pdfminer.pdftypes import resolve1
+    from pdfminer.pdfpage import PDFPage
+    try:
+        count = resolve1(resolve1(doc.catalog["Pages"])["Count"])
+        if isinstance(count, int) and count >= 0:
+            return count
+    except Exception:
+        pass
+    return sum(1 for _ in PDFPage.create_pages(doc))
+
+
+def pdf_info(path: str) -> Dict[str, Any]:
+    """Page count and document metadata without resolving any page"""
+    with MappedPDF(path) as document:
+        try:
+            import pdfplumber
+            with pdfplumber.open(document.stream()) as pdf:
+                metadata = pdf.metadata or {}
+                return {
+                    "pages": _page_count(pdf.doc),
+                    "title": metadata.get("Title", ""),
+                    "author": metadata.get("Author", ""),
+                    "subject": metadata.get("Subject", "")
+                }
+        except Exception as e:
+            logger.warning(f"⚠️ pdfplumber metadata failed, trying PyPDF2: {e}")
+
+        import PyPDF2
+        reader = PyPDF2.PdfReader(document.stream())
+        metadata = reader.metadata or {}
+        return {
+            "pages": len(reader.pages),
+            "title": metadata.get("/Title", ""),
+            "author": metadata.get("/Author", ""),
+            "subject": metadata.get("/Subject", "")
+        }
+
+
+class PDFExtractionPool:
+    """Process pool that extracts page ranges concurrently"""
+
+    def __init__(self, workers: int, pages_per_task: int = PAGES_PER_TASK):
+        self.workers = max(1, workers)
+        self.pages_per_task = max(1, pages_per_task)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.pages = 0
+        self.skipped_pages = 0
+        self.fallback_pages = 0
+
+    @classmethod
+    def from_env(cls) -> "PDFExtractionPool":
+        return cls(workers=int(os.environ.get('PDF_WORKERS', os.cpu_count() or 1)))
+
+    def _ensure_started(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                logger.info(f"📄 PDF extraction pool started: {self.workers} worker processes")
+            return self._executor
+
+    async def extract_pages(self, path: str, budget: Optional[int] = None, max_pages: Optional[int] = None,
+                            clean: Optional[Callable[[str], str]] = None, start: int = 0,
+                            stop: Optional[int] = None,
+                            info: Optional[Dict[str, Any]] = None) -> Tuple[List[str], Dict[str, Any]]:
+        """Page texts in page order plus document info
+
+        Only pages ``[start, stop)`` are read (at most ``max_pages`` of
+        them). ``clean`` is applied to each page as it arrives, and the
+        cleaned length counts towards ``budget``; once the pages received so
+        far (contiguous from ``start``) reach it, no further pages are
+        extracted. Empty pages are kept as "" so ``pages[i]`` is page
+        ``start + i``. Pass ``info`` (from ``pdf_info``) if the caller
+        already has it, so the file is not opened for it again.
+        """
+        info = dict(info) if info is not None else await asyncio.to_thread(pdf_info, path)
+        stop = info["pages"] if stop is None else min(stop, info["pages"])
+        start = min(max(0, start), stop)
+        if max_pages is not None:
+            stop = min(stop, start + max_pages)
+        total = stop - start
+        task_size = max(self.pages_per_task, math.ceil(total / (self.workers * TASKS_PER_WORKER)))
+        ranges = [(first, min(first + task_size, stop))
+                  for first in range(start, stop, task_size)]
+
+        # One task, or one worker: the IPC would cost more than it buys, so
+        # extract on a thread page by page, stopping at the exact page that
+        # meets the budget
+        if len(ranges) > 1 and self.workers > 1:
+            pages, fallbacks = await self._extract_ranges(path, start, ranges, budget, clean)
+        else:
+            pages, fallbacks = await asyncio.to_thread(self._extract_sequential, path, start, stop, budget, clean)
+
+        with self._lock:
+            self.documents += 1
+            self.pages += len(pages)
+            self.skipped_pages += total - len(pages)
+            self.fallback_pages += fallbacks
+        info["extracted_pages"] = len(pages)
+        return pages, info
+
+    async def extract_selected(self, path: str, numbers: Sequence[int],
+                               clean: Optional[Callable[[str], str]] = None) -> Dict[int, str]:
+        """Texts of the given pages only, keyed by page number
+
+        Pages are split into one contiguous group per worker; a page past
+        the end of the document comes back as "".
+        """
+        numbers = sorted(set(numbers))
+        group_size = max(1, math.ceil(len(numbers) / self.workers))
+        groups = [numbers[i:i + group_size] for i in range(0, len(numbers), group_size)]
+        if len(groups) > 1:
+            loop = asyncio.get_running_loop()
+            executor = self._ensure_started()
+            results = await asyncio.gather(*[
+                loop.run_in_executor(executor, extract_selected_pages, path, group) for group in groups
+            ])
+        else:
+            results = [await asyncio.to_thread(extract_selected_pages, path, numbers)]
+
+        texts: Dict[int, str] = {}
+        fallbacks = 0
+        for group_texts, group_fallbacks in results:
+            texts.update(group_texts)
+            fallbacks += group_fallbacks
+        with self._lock:
+            self.pages += len(texts)
+            self.fallback_pages += fallbacks
+        return {number: clean(texts[number]) if clean and texts.get(number) else texts.get(number, "")
+                for number in numbers}
+
+    def _extract_sequential(self, path, start, stop, budget, clean):
+        pages: List[str] = []
+        fallbacks = 0
+        measured = 0
+        page_iter = _iter_pages(path, start, stop)
+        try:
+            for text, fell_back in page_iter:
+                text = clean(text) if clean and text else text
+                pages.append(text)
+                fallbacks += fell_back
+                measured += len(text)
+                if budget is not None and measured >= budget:
+                    break
+        finally:
+            page_iter.close()
+        return pages, fallbacks
+
+    async def _extract_ranges(self, path, start, ranges, budget, clean):
+        loop = asyncio.get_running_loop()
+        executor = self._ensure_started()
+        pending = list(ranges)
+        running = set()
+        done_by_start: Dict[int, Tuple[int, List[str], int]] = {}
+        pages: List[str] = []
+        fallbacks = 0
+        measured = 0
+
+        try:
+            while pending or running:
+                budget_met = budget is not None and measured >= budget
+                while pending and len(running) < self.workers and not budget_met:
+                    first, last = pending.pop(0)
+                    running.add(loop.run_in_executor(executor, extract_page_range, path, first, last))
+                if not running:
+                    break
+
+                finished, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    result = task.result()
+                    done_by_start[result[0]] = result
+
+                # Only the contiguous prefix counts towards the budget; ranges
+                # past a gap wait for the earlier one (or are dropped if the
+                # prefix alone meets the budget)
+                while start + len(pages) in done_by_start and not (budget is not None and measured >= budget):
+                    _, texts, fallback_pages = done_by_start.pop(start + len(pages))
+                    fallbacks += fallback_pages
+                    for text in texts:
+                        text = clean(text) if clean and text else text
+                        pages.append(text)
+                        measured += len(text)
+                if budget is not None and measured >= budget:
+                    pending.clear()
+        finally:
+            for task in running:
+                task.cancel()
+        return pages, fallbacks
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "documents": self.documents,
+                "pages": self.pages,
+                "skipped_pages": self.skipped_pages,
+                "fallback_pages": self.fallback_pages
+            }
+
+
+# Initialize extraction pool (worker processes start with the first large PDF)
+pdf_extraction_pool = PDFExtractionPool.from_env()
+
+# Export for easy import
+__all__ = ['pdf_extraction_pool', 'PDFExtractionPool', 'MappedPDF', 'extract_page_range', 'extract_selected_pages',
+           'iter_page_texts', 'join_within_budget', 'pdf_info']
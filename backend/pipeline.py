@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Stage DAG executor for the video pipeline
+Runs each stage as soon as the stages it depends on have finished
+"""
+
+import os
+import time
+import asyncio
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Callable, Awaitable, Optional, Iterable
+
+logger = logging.getLogger(__name__)
+
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+ProgressCallback = Callable[[int, str, Dict[str, Any]], None]
+
+# Threads for stages whose "async" code actually blocks (MoviePy, sync SDKs)
+_offload_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('STAGE_OFFLOAD_THREADS', 16)),
+    thread_name_prefix="stage-offload"
+)
+_thread_state = threading.local()
+
+
+def _run_in_thread_loop(func: StageFunc, results: Dict[str, Any]) -> Any:
+    """Run a stage coroutine on this offload thread's long-lived loop"""
+    loop = getattr(_thread_state, "loop", None)
+    if loop is None:
+        loop = asyncio.new_event_loop()
+        _thread_state.loop = loop
+    return loop.run_until_complete(func(results))
+
+
+class StageFailed(Exception):
+    """A pipeline stage raised; the original error is chained"""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"Stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class Stage:
+    """One node of the pipeline graph
+
+    ``func`` receives the results of all finished stages keyed by name.
+    Set ``offload`` for stages that block the event loop so they run on a
+    separate thread and can overlap with the other stages.
+    """
+
+    def __init__(self, name: str, func: StageFunc, deps: Iterable[str] = (),
+                 label: Optional[str] = None, weight: float = 1.0, offload: bool = False):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.label = label or name
+        self.weight = weight
+        self.offload = offload
+
+
+class StagePipeline:
+    """Executes a set of stages respecting their dependencies
+
+    With a ``checkpoint`` (see job_workspace.JobWorkspace) every finished
+    stage is saved, and stages already checkpointed are skipped on the
+    next run so a retry resumes from the first incomplete stage.
+    """
+
+    def __init__(self, stages: List[Stage], on_progress: Optional[ProgressCallback] = None, checkpoint=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.on_progress = on_progress
+        self.checkpoint = checkpoint
+        self.timings: Dict[str, Any] = {}
+        self._validate()
+
+    def _validate(self):
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+        # Kahn's algorithm: every stage must become runnable eventually
+        remaining = {name: set(stage.deps) for name, stage in self.stages.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Pipeline has a dependency cycle among {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    async def run(self, results: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run every stage not already present in ``results``"""
+        results = dict(results or {})
+        if self.checkpoint is not None:
+            for name, value in self.checkpoint.load().items():
+                if name in self.stages and name not in results:
+                    results[name] = value
+                    self.timings[name] = {"status": "restored"}
+                    logger.info(f"♻️ Stage {name} restored from checkpoint")
+        pending = {name for name in self.stages if name not in results}
+        running: Dict[asyncio.Task, str] = {}
+        started = time.time()
+
+        try:
+            while pending or running:
+                for name in sorted(pending):
+                    if all(dep in results for dep in self.stages[name].deps):
+                        pending.discard(name)
+                        running[asyncio.ensure_future(self._run_stage(name, results))] = name
+                self._report(results, running.values())
+
+                if not running:
+                    raise RuntimeError(f"Stages {sorted(pending)} can never run")
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    error = task.exception()
+                    if error is not None:
+                        raise StageFailed(name, error) from error
+                    results[name] = task.result()
+        except BaseException:
+            for task, name in running.items():
+                task.cancel()
+                self.timings.setdefault(name, {})["status"] = "cancelled"
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            raise
+        finally:
+            stage_total = sum(t.get("duration_ms", 0) for t in self.timings.values() if isinstance(t, dict))
+            self.timings["_total"] = {
+                "wall_ms": int((time.time() - started) * 1000),
+                "stages_sum_ms": stage_total
+            }
+
+        self._report(results, ())
+        return results
+
+    async def _run_stage(self, name: str, results: Dict[str, Any]) -> Any:
+        stage = self.stages[name]
+        timing = {"status": "running", "started_at": time.time()}
+        self.timings[name] = timing
+        begin = time.perf_counter()
+        try:
+            if stage.offload:
+                loop = asyncio.get_running_loop()
+                value = await loop.run_in_executor(_offload_executor, _run_in_thread_loop, stage.func, dict(results))
+            else:
+                value = await stage.func(dict(results))
+            if self.checkpoint is not None:
+                self.checkpoint.save(name, value)
+            timing["status"] = "completed"
+            return value
+        except asyncio.CancelledError:
+            timing["status"] = "cancelled"
+            raise
+        except Exception:
+            timing["status"] = "failed"
+            raise
+        finally:
+            timing["duration_ms"] = int((time.perf_counter() - begin) * 1000)
+            logger.info(f"⏱️ Stage {name}: {timing['status']} in {timing['duration_ms']} ms")
+
+    def _report(self, results: Dict[str, Any], running: Iterable[str]):
+        if not self.on_progress:
+            return
+        total = sum(stage.weight for stage in self.stages.values()) or 1
+        finished = sum(self.stages[name].weight for name in results if name in self.stages)
+        progress = 5 + int(90 * finished / total)
+        labels = [self.stages[name].label for name in sorted(running)]
+        step = " + ".join(labels) if labels else "Finalizing"
+        try:
+            self.on_progress(progress, step, dict(self.timings))
+        except Exception as e:
+            logger.error(f"❌ Progress callback failed: {e}")
+
+
+__all__ = ['Stage', 'StagePipeline', 'StageFailed']
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Token budgets for LLM prompts
+Counts tokens for the target model, fits source content into its context window and meters usage per call
+"""
+
+import os
+import time
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from summarizer import condense_text, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+    logger.warning("⚠️ tiktoken not installed, estimating prompt tokens from UTF-8 length")
+
+# Context windows (prompt + completion) by model name; the longest
+# matching prefix wins, so dated snapshots inherit their family's window
+CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-1106": 128000,
+    "gpt-4-0125": 128000,
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo-instruct": 4096,
+    "gpt-3.5-turbo": 16385,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Chat format overhead: tokens around every message, and priming the reply
+TOKENS_PER_MESSAGE = 3
+REPLY_PRIMING_TOKENS = 3
+
+# Left free for tokenizer drift and the estimate's error
+SAFETY_TOKENS = int(os.environ.get('PROMPT_SAFETY_TOKENS', 64))
+
+Messages = List[Dict[str, str]]
+
+
+@lru_cache(maxsize=16)
+def _encoding(model: str):
+    """The model's tokenizer, loaded once per model (None without tiktoken)"""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # The BPE files are downloaded on first use
+        logger.warning(f"⚠️ No tokenizer for {model}, estimating tokens: {e}")
+        return None
+
+
+def token_counter(model: str) -> Callable[[str], int]:
+    """A function counting tokens of text for ``model``"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens(text: str, model: str) -> int:
+    return token_counter(model)(text)
+
+
+def context_window(model: str) -> int:
+    matches = [prefix for prefix in CONTEXT_WINDOWS if model.startswith(prefix)]
+    return CONTEXT_WINDOWS[max(matches, key=len)] if matches else DEFAULT_CONTEXT_WINDOW
+
+
+def count_messages(messages: Messages, model: str) -> int:
+    """Prompt tokens of a chat request, including the chat format overhead"""
+    count = token_counter(model)
+    return sum(TOKENS_PER_MESSAGE + count(message.get("content") or "") for message in messages) + REPLY_PRIMING_TOKENS
+
+
+def _usage(response: Any) -> Tuple[Optional[int], Optional[int]]:
+    """``(prompt_tokens, completion_tokens)`` reported by the API, if any"""
+    usage = getattr(response, "usage", None)
+    if usage is None and isinstance(response, dict):
+        usage = response.get("usage")
+    if usage is None:
+        return None, None
+    if isinstance(usage, dict):
+        return usage.get("prompt_tokens"), usage.get("completion_tokens")
+    return getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+
+
+def _reply_text(response: Any) -> str:
+    try:
+        return response.choices[0].message.content or ""
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return ""
+
+
+class PromptBudget:
+    """Fits prompts to a model's context window and meters tokens per call
+
+    Source content is condensed (extractively) to what the model has room
+    for once the fixed part of the prompt and the completion are counted.
+    Every call records its prompt and completion tokens, from the API's
+    usage report when there is one, counted locally otherwise.
+    """
+
+    def __init__(self, safety_tokens: int = SAFETY_TOKENS):
+        self.safety_tokens = safety_tokens
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Dict[str, Any]] = {}
+
+    def fit(self, build: Callable[[str], Messages], content: str, model: str, max_tokens: int,
+            content_tokens: Optional[int] = None) -> Tuple[Messages, int]:
+        """Chat messages with ``content`` condensed to fit, and the completion budget
+
+        ``build(content)`` returns the messages around the content. The
+        content gets at most ``content_tokens``, and never more than the
+        window leaves after the rest of the prompt and ``max_tokens``. If the
+        prompt still leaves less than ``max_tokens``, the completion budget
+        shrinks instead.
+        """
+        window = context_window(model)
+        room = window - count_messages(build(""), model) - max_tokens - self.safety_tokens
+        if content_tokens is not None:
+            room = min(room, content_tokens)
+        source = condense_text(content, room, token_counter(model)) if room > 0 else ""
+        messages = build(source)
+        completion = max(1, min(max_tokens, window - count_messages(messages, model) - self.safety_tokens))
+        return messages, completion
+
+    def fit_text(self, text: str, max_tokens: int, model: str) -> str:
+        """``text`` condensed to ``max_tokens`` tokens of ``model``"""
+        return condense_text(text, max_tokens, token_counter(model))
+
+    def record(self, label: str, model: str, messages: Messages, response: Any = None,
+               started: Optional[float] = None) -> Dict[str, Any]:
+        """Meter one call: prompt and completion tokens and latency"""
+        prompt_tokens, completion_tokens = _usage(response)
+        reported = prompt_tokens is not None
+        if prompt_tokens is None:
+            prompt_tokens = count_messages(messages, model)
+        if completion_tokens is None:
+            completion_tokens = count_tokens(_reply_text(response), model)
+        elapsed = time.perf_counter() - started if started is not None else 0.0
+
+        with self._lock:
+            totals = self._calls.setdefault(label, {
+                "model": model, "calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "counted_locally": 0, "seconds": 0.0
+            })
+            totals["model"] = model
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["counted_locally"] += not reported
+            totals["seconds"] += elapsed
+        logger.info(f"🧮 {label} ({model}): {prompt_tokens} prompt + {completion_tokens} completion tokens"
+                    f" in {elapsed:.1f}s")
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "seconds": elapsed}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = {label: dict(totals, seconds=round(totals["seconds"], 3))
+                     for label, totals in self._calls.items()}
+        return {"tokenizer": "tiktoken" if TIKTOKEN_AVAILABLE else "estimate", "calls": calls}
+
+
+# Initialize shared budget
+prompt_budget = PromptBudget()
+
+# Export for easy import
+__all__ = ['prompt_budget', 'PromptBudget', 'count_tokens', 'count_messages', 'token_counter', 'context_window']
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Multi-process render worker pool
+Runs MoviePy compositing and encoding outside the process that serves HTTP
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import importlib
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[float], None]
+
+# Set in each worker process by _init_worker
+_progress_queue = None
+
+
+def _init_worker(progress_queue):
+    """Worker start-up: import the heavy render stack once per process"""
+    global _progress_queue
+    _progress_queue = progress_queue
+    try:
+        import numpy  # noqa: F401
+        import moviepy.editor  # noqa: F401
+    except ImportError as e:
+        logging.getLogger(__name__).warning(f"⚠️ Render worker without MoviePy: {e}")
+
+
+def _run_render(target: str, spec: Dict[str, Any], render_id: str) -> Any:
+    """Executed in a worker: resolve ``module:function`` and call it"""
+    module_name, _, func_name = target.partition(":")
+    func = getattr(importlib.import_module(module_name), func_name)
+
+    last = [-1.0]
+
+    def report(fraction: float):
+        # Only forward whole-percent changes to keep IPC traffic small
+        fraction = max(0.0, min(1.0, fraction))
+        if _progress_queue is not None and fraction - last[0] >= 0.01:
+            last[0] = fraction
+            _progress_queue.put((render_id, fraction))
+
+    return func(spec, report)
+
+
+def moviepy_logger(progress: ProgressCallback):
+    """proglog logger that turns MoviePy's frame bar into ``progress`` calls"""
+    try:
+        from proglog import ProgressBarLogger
+    except ImportError:
+        return None
+
+    class _FrameProgressLogger(ProgressBarLogger):
+        def bars_callback(self, bar, attr, value, old_value=None):
+            # "t" is the video frame bar; "chunk" (audio) is ignored
+            if bar == "t" and attr == "index":
+                total = self.bars[bar].get("total") or 0
+                if total:
+                    progress(value / total)
+
+    return _FrameProgressLogger()
+
+
+class RenderPool:
+    """Process pool for renders, with progress relayed back over a queue
+
+    Jobs are ``(target, spec)`` pairs: ``target`` names a module-level
+    ``function(spec, progress)`` as ``"module:function"`` and ``spec`` is a
+    picklable dict, so nothing but plain data crosses the process boundary.
+    Workers are spawned (not forked) so they don't inherit server threads
+    and sockets, and are reused for every render.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._context = multiprocessing.get_context("spawn")
+        self._executor = None
+        self._progress_queue = None
+        self._listener = None
+        self._callbacks: Dict[str, ProgressCallback] = {}
+        self._lock = threading.Lock()
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._restarts = 0
+
+    @classmethod
+    def from_env(cls) -> "RenderPool":
+        return cls(workers=int(os.environ.get('RENDER_WORKERS', os.cpu_count() or 1)))
+
+    def _ensure_started(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                if self._progress_queue is None:
+                    self._progress_queue = self._context.Queue()
+                    self._listener = threading.Thread(
+                        target=self._listen, name="render-progress", daemon=True
+                    )
+                    self._listener.start()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=self._context,
+                    initializer=_init_worker,
+                    initargs=(self._progress_queue,)
+                )
+                logger.info(f"🎞️ Render pool started: {self.workers} worker processes")
+            return self._executor
+
+    async def render(self, target: str, spec: Dict[str, Any],
+                     on_progress: Optional[ProgressCallback] = None) -> Any:
+        """Run ``target(spec, progress)`` in a worker process and await its result"""
+        render_id = uuid.uuid4().hex
+        if on_progress is not None:
+            self._callbacks[render_id] = on_progress
+
+        executor = self._ensure_started()
+        with self._lock:
+            self._active += 1
+        started = time.monotonic()
+        try:
+            future = executor.submit(_run_render, target, spec, render_id)
+            result = await asyncio.wrap_future(future)
+            with self._lock:
+                self._completed += 1
+            logger.info(f"🎞️ Render {target} finished in {time.monotonic() - started:.1f}s")
+            return result
+        except BrokenProcessPool:
+            # A worker died (OOM, segfault in ffmpeg bindings); start fresh next time
+            with self._lock:
+                self._failed += 1
+                if self._executor is executor:
+                    self._executor = None
+                    self._restarts += 1
+            raise
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._active -= 1
+            self._callbacks.pop(render_id, None)
+
+    def _listen(self):
+        while True:
+            try:
+                item = self._progress_queue.get()
+            except (EOFError, OSError):
+                break
+            if item is None:
+                break
+            render_id, fraction = item
+            callback = self._callbacks.get(render_id)
+            if callback is None:
+                continue
+            try:
+                callback(fraction)
+            except Exception as e:
+                logger.error(f"❌ Render progress callback failed: {e}")
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if self._progress_queue is not None:
+            self._progress_queue.put(None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "started": self._executor is not None,
+                "active": self._active,
+                "completed": self._completed,
+                "failed": self._failed,
+                "restarts": self._restarts
+            }
+
+
+# Initialize render pool (worker processes start with the first render)
+render_pool = RenderPool.from_env()
+
+# Export for easy import
+__all__ = ['render_pool', 'RenderPool', 'moviepy_logger']
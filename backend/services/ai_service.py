@@ -1,8 +1,15 @@
-import openai
 import json
+import asyncio
 from typing import Dict, List, Any
 from config import settings
 from models.schemas import ContentCategory, MarketingContent
+from prompt_budget import prompt_budget
+from llm_cache import llm_cache
+from llm_client import llm_client
+
+# Thuộc khóa cache LLM: tăng khi đổi prompt
+ANALYSIS_PROMPT_VERSION = "analysis-v1"
+MARKETING_PROMPT_VERSION = "marketing-v1"
 
 class AIService:
     """Service để xử lý AI tasks với OpenAI GPT"""
@@ -11,11 +18,12 @@ class AIService:
         if not settings.openai_api_key:
             raise ValueError("OpenAI API key không được tìm thấy")
         
-        openai.api_key = settings.openai_api_key
-        self.client = openai.OpenAI(api_key=settings.openai_api_key)
+        # Client async dùng chung: pool kết nối và giới hạn request/token mỗi phút
+        llm_client.configure(api_key=settings.openai_api_key)
+        self.client = llm_client
     
-    async def analyze_content(self, content: str, target_duration: int) -> Dict[str, Any]:
-        """Phân tích nội dung và tạo script cho video"""
+    async def analyze_content(self, content: str, target_duration: int, bypass_cache: bool = False) -> Dict[str, Any]:
+        """Phân tích nội dung và tạo script cho video (``bypass_cache``: bỏ qua cache, tạo script mới)"""
         
         # Estimate words per minute for script (average speaking speed: 150-160 WPM)
         target_words = int(target_duration * 2.5)  # Conservative estimate
@@ -44,23 +52,36 @@ class AIService:
         }}
         """
         
-        user_prompt = f"Nội dung cần phân tích:\n\n{content[:8000]}"  # Limit content length
-        
-        try:
-            response = self.client.chat.completions.create(
-                model=settings.gpt_model,
-                messages=[
+        async def request():
+            # Tóm tắt trích xuất cục bộ (các câu tiêu biểu của toàn bộ nội dung),
+            # vừa với context window của model và max_tokens
+            messages, max_tokens = await asyncio.to_thread(
+                prompt_budget.fit,
+                lambda source: [
                     {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
+                    {"role": "user", "content": f"Nội dung cần phân tích:\n\n{source}"}
                 ],
-                max_tokens=settings.max_tokens,
-                temperature=settings.temperature
+                content, settings.gpt_model, settings.max_tokens, 1500
+            )
+            response = await self.client.chat(
+                "ai_service.analyze_content", settings.gpt_model, messages,
+                max_tokens=max_tokens, temperature=settings.temperature
             )
-            
-            result = response.choices[0].message.content
             
             # Parse JSON response
-            analysis = json.loads(result)
+            return json.loads(response.choices[0].message.content)
+        
+        # Cùng nội dung, thời lượng, model và prompt: dùng lại kết quả đã có
+        key = llm_cache.key(
+            "analyze_content", settings.gpt_model, ANALYSIS_PROMPT_VERSION,
+            {"content": content, "duration": target_duration},
+            {"temperature": settings.temperature, "max_tokens": settings.max_tokens}
+        )
+        
+        try:
+            analysis = await llm_cache.get_or_call(
+                key, request, task="ai_service.analyze_content", bypass=bypass_cache
+            )
             
             # Validate and set defaults
             analysis["category"] = analysis.get("category", "other")
@@ -77,8 +98,9 @@ class AIService:
         except Exception as e:
             raise Exception(f"Lỗi khi phân tích nội dung với AI: {str(e)}")
     
-    async def generate_marketing_content(self, script: str, category: str) -> MarketingContent:
-        """Tạo caption, hashtag và description cho video"""
+    async def generate_marketing_content(self, script: str, category: str,
+                                         bypass_cache: bool = False) -> MarketingContent:
+        """Tạo caption, hashtag và description cho video (``bypass_cache``: tạo nội dung mới)"""
         
         system_prompt = """
         Bạn là chuyên gia marketing content cho TikTok/social media. 
@@ -107,20 +129,28 @@ class AIService:
         Tạo marketing content phù hợp.
         """
         
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        
+        async def request():
+            response = await self.client.chat(
+                "ai_service.generate_marketing_content", settings.gpt_model, messages,
+                max_tokens=1000, temperature=0.8
+            )
+            return json.loads(response.choices[0].message.content)
+        
+        key = llm_cache.key(
+            "generate_marketing_content", settings.gpt_model, MARKETING_PROMPT_VERSION,
+            {"script": script, "category": category}, {"temperature": 0.8, "max_tokens": 1000}
+        )
+        
         try:
-            response = self.client.chat.completions.create(
-                model=settings.gpt_model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=1000,
-                temperature=0.8
+            marketing_data = await llm_cache.get_or_call(
+                key, request, task="ai_service.generate_marketing_content", bypass=bypass_cache
             )
             
-            result = response.choices[0].message.content
-            marketing_data = json.loads(result)
-            
             return MarketingContent(
                 caption=marketing_data.get("caption", ""),
                 hashtags=marketing_data.get("hashtags", []),
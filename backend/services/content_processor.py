@@ -1,13 +1,20 @@
 import os
-import io
+import asyncio
 import aiofiles
-import requests
+import httpx
 from bs4 import BeautifulSoup
-import PyPDF2
-import pdfplumber
 from typing import Optional
 from fastapi import UploadFile, HTTPException
 import validators
+from multipart_upload import SpoolWriter, UploadTooLarge, READ_CHUNK_SIZE
+from upload_store import upload_store, extraction_cache
+from pdf_extraction import pdf_extraction_pool, join_within_budget, pdf_info
+from http_cache import http_cache, BufferedParser
+from http_client import UnsupportedContent, ResponseTooLarge
+from text_normalizer import normalize_text
+from page_sampling import page_sampler, EXTRACTION_MODE
+from document_index import document_indexer, ChapterNotFound
+from document_readers import get_reader, read_document, DocumentReadError
 
 class ContentProcessor:
     """Service để xử lý và trích xuất nội dung từ PDF hoặc URL"""
@@ -21,15 +28,56 @@ class ContentProcessor:
         if not file.filename:
             raise HTTPException(status_code=400, detail="Tên file không hợp lệ")
         
-        file_extension = file.filename.split('.')[-1].lower()
+        # Copy to disk in chunks instead of holding the whole ebook in memory
+        spool = SpoolWriter()
+        try:
+            while True:
+                chunk = await file.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                spool.write(chunk)
+            digest = spool.close()
+            return await self.extract_from_path(spool.path, file.filename, digest)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        finally:
+            spool.discard()
+    
+    async def extract_from_path(self, file_path: str, filename: Optional[str] = None,
+                                digest: Optional[str] = None, chapter: Optional[int] = None) -> str:
+        """Trích xuất nội dung từ file đã lưu trên đĩa (hoặc một chương của file PDF)"""
         
-        # Read file content
-        content = await file.read()
+        file_extension = (filename or file_path).split('.')[-1].lower()
         
         if file_extension == 'pdf':
-            return await self._extract_from_pdf(content)
-        elif file_extension == 'txt':
-            return content.decode('utf-8')
+            # Same bytes, same text: reuse the extraction of an earlier upload
+            digest = digest or await asyncio.to_thread(upload_store.digest_of, file_path)
+            if chapter is not None:
+                return await extraction_cache.get_or_extract(
+                    digest,
+                    f"content_processor-pdf-{self.max_content_length}-chapter-{chapter}",
+                    lambda: self._extract_chapter(file_path, digest, chapter)
+                )
+            return await extraction_cache.get_or_extract(
+                digest,
+                f"content_processor-pdf-{self.max_content_length}-{EXTRACTION_MODE}",
+                lambda: self._extract_from_pdf(file_path)
+            )
+        elif chapter is not None:
+            raise HTTPException(
+                status_code=400,
+                detail="Chỉ có thể chọn chương với file PDF"
+            )
+        elif get_reader(file_extension) is not None:
+            # EPUB, DOCX, TXT: read chapter by chapter / paragraph by
+            # paragraph and stop at the content limit
+            digest = digest or await asyncio.to_thread(upload_store.digest_of, file_path)
+            reader = get_reader(file_extension)
+            return await extraction_cache.get_or_extract(
+                digest,
+                f"content_processor-{reader.source_type}-{self.max_content_length}",
+                lambda: self._extract_from_document(reader, file_path)
+            )
         else:
             raise HTTPException(
                 status_code=400, 
@@ -43,43 +91,15 @@ class ContentProcessor:
             raise HTTPException(status_code=400, detail="URL không hợp lệ")
         
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            
-            # Parse HTML content
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style", "nav", "header", "footer"]):
-                script.decompose()
-            
-            # Extract text from main content areas
-            content_selectors = [
-                'article',
-                '.content',
-                '.post-content',
-                '.entry-content',
-                'main',
-                '.main-content'
-            ]
-            
-            content = ""
-            for selector in content_selectors:
-                elements = soup.select(selector)
-                if elements:
-                    content = elements[0].get_text(strip=True, separator=' ')
-                    break
-            
-            # Fallback to body if no main content found
-            if not content:
-                content = soup.get_text(strip=True, separator=' ')
-            
-            # Clean and limit content
-            content = self._clean_text(content)
+            # Cached, conditional fetch on the shared pooled client; HTML is
+            # parsed off the event loop and only when the page changed
+            content = await http_cache.fetch_parsed(
+                url,
+                "content_processor-html",
+                lambda charset: BufferedParser(self._parse_html),
+                # A link to a PDF is spooled to disk and read like an upload
+                on_pdf=lambda path, sha256: self.extract_from_path(path, "document.pdf", sha256)
+            )
             
             if len(content) < 100:
                 raise HTTPException(
@@ -89,70 +109,117 @@ class ContentProcessor:
             
             return content[:self.max_content_length]
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Không thể truy cập URL: {str(e)}"
             )
+        except UnsupportedContent as e:
+            raise HTTPException(status_code=415, detail=str(e))
+        except ResponseTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500, 
                 detail=f"Lỗi khi xử lý URL: {str(e)}"
             )
     
-    async def _extract_from_pdf(self, pdf_content: bytes) -> str:
-        """Trích xuất text từ PDF"""
+    def _parse_html(self, html: bytes) -> str:
+        """Lấy text chính từ HTML đã tải về"""
+        soup = BeautifulSoup(html, 'html.parser')
         
-        try:
-            # Try with pdfplumber first (better for complex layouts)
-            with io.BytesIO(pdf_content) as pdf_file:
-                with pdfplumber.open(pdf_file) as pdf:
-                    text = ""
-                    for page in pdf.pages[:50]:  # Limit to first 50 pages
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                    
-                    if text.strip():
-                        return self._clean_text(text)[:self.max_content_length]
-        
-        except Exception:
-            # Fallback to PyPDF2
-            try:
-                with io.BytesIO(pdf_content) as pdf_file:
-                    pdf_reader = PyPDF2.PdfReader(pdf_file)
-                    text = ""
-                    
-                    for page_num in range(min(50, len(pdf_reader.pages))):
-                        page = pdf_reader.pages[page_num]
-                        text += page.extract_text() + "\n"
-                    
-                    if text.strip():
-                        return self._clean_text(text)[:self.max_content_length]
-                        
-            except Exception as e:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Không thể đọc file PDF: {str(e)}"
-                )
+        # Remove script and style elements
+        for script in soup(["script", "style", "nav", "header", "footer"]):
+            script.decompose()
+        
+        # Extract text from main content areas
+        content_selectors = [
+            'article',
+            '.content',
+            '.post-content',
+            '.entry-content',
+            'main',
+            '.main-content'
+        ]
+        
+        content = ""
+        for selector in content_selectors:
+            elements = soup.select(selector)
+            if elements:
+                content = elements[0].get_text(strip=True, separator=' ')
+                break
         
+        # Fallback to body if no main content found
+        if not content:
+            content = soup.get_text(strip=True, separator=' ')
+        
+        # Clean and limit content
+        return self._clean_text(content)
+    
+    async def _extract_from_pdf(self, pdf_path: str) -> str:
+        """Trích xuất text từ file PDF trên đĩa"""
+        
+        # Long books: only pages spread across the body are extracted, so
+        # the AI sees the book rather than its cover and table of contents
+        info = await asyncio.to_thread(pdf_info, pdf_path)
+        sampled = await page_sampler.sample(pdf_path, self.max_content_length, clean=self._clean_text, info=info)
+        if sampled is not None:
+            return sampled[0]
+        
+        # Pages are extracted in parallel worker processes, each reading a
+        # memory-mapped view of the file, and dispatching stops once enough
+        # cleaned text has arrived
+        pages, _ = await pdf_extraction_pool.extract_pages(
+            pdf_path,
+            budget=self.max_content_length,
+            max_pages=50,  # Limit to first 50 pages
+            clean=self._clean_text,
+            info=info
+        )
+        text = join_within_budget(pages, self.max_content_length)
+        
+        if text.strip():
+            return text
         raise HTTPException(
             status_code=400, 
             detail="File PDF trống hoặc không thể trích xuất text"
         )
     
-    def _clean_text(self, text: str) -> str:
-        """Làm sạch và chuẩn hóa text"""
-        
-        # Remove extra whitespace and newlines
-        import re
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'\n+', '\n', text)
+    async def _extract_from_document(self, reader, file_path: str) -> str:
+        """Trích xuất text từ EPUB, DOCX hoặc TXT trong giới hạn độ dài"""
+        try:
+            text, _ = await asyncio.to_thread(read_document, reader, file_path, self.max_content_length)
+        except DocumentReadError as e:
+            raise HTTPException(status_code=400, detail=f"File {reader.source_type.upper()} không hợp lệ: {str(e)}")
         
-        # Remove special characters but keep Vietnamese
-        text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]\'\"\n\u00C0-\u1EF9]', '', text)
+        if text.strip():
+            return text
+        raise HTTPException(
+            status_code=400, 
+            detail=f"File {reader.source_type.upper()} trống hoặc không thể trích xuất text"
+        )
+    
+    async def _extract_chapter(self, file_path: str, digest: str, chapter: int) -> str:
+        """Trích xuất một chương: chỉ đọc các trang của chương đó theo mục lục"""
+        try:
+            text, _ = await document_indexer.extract_chapter(
+                file_path, chapter, budget=self.max_content_length, digest=digest
+            )
+        except ChapterNotFound as e:
+            raise HTTPException(status_code=404, detail=str(e))
         
-        return text.strip()
+        if text.strip():
+            return text
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Chương {chapter} trống hoặc không thể trích xuất text"
+        )
+    
+    def _clean_text(self, text: str) -> str:
+        """Làm sạch và chuẩn hóa text"""
+        return normalize_text(text)
     
     def get_content_preview(self, content: str, max_length: int = 500) -> str:
         """Lấy preview của nội dung"""
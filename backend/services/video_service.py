@@ -1,5 +1,6 @@
 import os
 import asyncio
+import numpy as np
 from moviepy.editor import (
     VideoFileClip, AudioFileClip, ImageClip, TextClip, 
     CompositeVideoClip, concatenate_videoclips
@@ -7,10 +8,10 @@ from moviepy.editor import (
 from moviepy.config import check_for_package
 from PIL import Image, ImageDraw, ImageFont
 import textwrap
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable
 from config import settings
+from render_pool import render_pool, moviepy_logger
 import requests
-import random
 
 class VideoService:
     """Service để tạo video từ audio và nội dung"""
@@ -58,49 +59,59 @@ class VideoService:
             }
         }
     
-    async def create_video(self, script: str, audio_path: str, category: str, job_id: str) -> str:
-        """Tạo video từ script và audio"""
-        
+    async def create_video(self, script: str, audio_path: str, category: str, job_id: str,
+                           on_progress: Optional[Callable[[float], None]] = None) -> str:
+        """Tạo video từ script và audio (render chạy trong render worker pool)"""
+        
+        spec = {
+            "script": script,
+            "audio_path": audio_path,
+            "category": category,
+            "video_path": os.path.join(settings.output_folder, f"video_{job_id}.mp4")
+        }
         try:
-            # Get audio duration
-            audio_clip = AudioFileClip(audio_path)
-            duration = audio_clip.duration
-            
-            # Create video clips
-            video_clips = await self._create_video_scenes(script, category, duration)
-            
-            # Combine all clips
-            final_video = concatenate_videoclips(video_clips, method="compose")
-            
-            # Add audio
-            final_video = final_video.set_audio(audio_clip)
-            
-            # Output path
-            video_filename = f"video_{job_id}.mp4"
-            video_path = os.path.join(settings.output_folder, video_filename)
-            
-            # Export video
-            final_video.write_videofile(
-                video_path,
-                fps=30,
-                codec='libx264',
-                audio_codec='aac',
-                temp_audiofile='temp-audio.m4a',
-                remove_temp=True,
-                preset='medium',
-                ffmpeg_params=['-crf', '23']
-            )
-            
-            # Clean up
-            audio_clip.close()
-            final_video.close()
-            
-            return video_path
-            
+            return await render_pool.render("services.video_service:render_video", spec, on_progress)
         except Exception as e:
             raise Exception(f"Lỗi khi tạo video: {str(e)}")
     
-    async def _create_video_scenes(self, script: str, category: str, duration: float) -> List[VideoFileClip]:
+    def render(self, spec: Dict[str, Any], progress: Optional[Callable[[float], None]] = None) -> str:
+        """Dựng và encode video theo ``spec`` (chạy trong render worker)"""
+        
+        video_path = spec["video_path"]
+        
+        # Get audio duration
+        audio_clip = AudioFileClip(spec["audio_path"])
+        duration = audio_clip.duration
+        
+        # Create video clips
+        video_clips = self._create_video_scenes(spec["script"], spec["category"], duration)
+        
+        # Combine all clips
+        final_video = concatenate_videoclips(video_clips, method="compose")
+        
+        # Add audio
+        final_video = final_video.set_audio(audio_clip)
+        
+        # Export video (temp audio theo từng output để các render song song không đè nhau)
+        final_video.write_videofile(
+            video_path,
+            fps=30,
+            codec='libx264',
+            audio_codec='aac',
+            temp_audiofile=f"{video_path}.temp-audio.m4a",
+            remove_temp=True,
+            preset='medium',
+            ffmpeg_params=['-crf', '23'],
+            logger=moviepy_logger(progress) if progress else 'bar'
+        )
+        
+        # Clean up
+        audio_clip.close()
+        final_video.close()
+        
+        return video_path
+    
+    def _create_video_scenes(self, script: str, category: str, duration: float) -> List[VideoFileClip]:
         """Tạo các scene cho video"""
         
         # Split script into segments
@@ -195,17 +206,8 @@ class VideoService:
             color = tuple([int(c * alpha / 255) for c in [255, 255, 255]])
             draw.line([(0, y), (self.video_width, y)], fill=color, width=1)
         
-        # Save temporary background
-        bg_path = f"temp_bg_{random.randint(1000, 9999)}.png"
-        img.save(bg_path)
-        
-        # Create video clip
-        bg_clip = ImageClip(bg_path).set_duration(duration)
-        
-        # Clean up temp file
-        os.remove(bg_path)
-        
-        return bg_clip
+        # Create video clip straight from the pixels (no temp file shared between workers)
+        return ImageClip(np.asarray(img)).set_duration(duration)
     
     def _create_text_clip(self, text: str, theme: Dict[str, str], duration: float, position: str = "center") -> TextClip:
         """Tạo text clip với styling"""
@@ -290,4 +292,16 @@ class VideoService:
         thumbnail_path = os.path.join(settings.output_folder, thumbnail_filename)
         img.save(thumbnail_path)
         
-        return thumbnail_path 
\ No newline at end of file
+        return thumbnail_path 
+
+
+# Service instance used by render workers
+_render_service = None
+
+
+def render_video(spec: Dict[str, Any], progress: Optional[Callable[[float], None]] = None) -> str:
+    """Render pool entry point (see render_pool.RenderPool)"""
+    global _render_service
+    if _render_service is None:
+        _render_service = VideoService()
+    return _render_service.render(spec, progress)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Local extractive summarization for LLM prompts
+Condenses the whole extracted text to its most central sentences within a token budget
+"""
+
+import os
+import re
+import math
+import logging
+from collections import Counter
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("⚠️ NumPy not installed, summarizing by word frequency only")
+
+# Default prompt budget for source content
+SUMMARY_TOKENS = int(os.environ.get('SUMMARY_TOKENS', 1500))
+
+# UTF-8 bytes per token of GPT tokenizers: about right for English and,
+# with its multi-byte diacritics, for Vietnamese
+BYTES_PER_TOKEN = 4
+
+# Sentences longer than this are split at commas/semicolons so one run-on
+# sentence can't take the whole budget
+MAX_SENTENCE_CHARS = 400
+MIN_SENTENCE_CHARS = 25
+
+# The text is cut into one stretch per this many tokens of budget and the
+# best sentence of each is taken first, so the summary covers the whole source
+COVERAGE_TOKENS = 100
+
+# A sentence this similar to one already picked adds nothing
+REDUNDANCY_THRESHOLD = 0.7
+
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_ITERATIONS = 30
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+CLAUSE_END_RE = re.compile(r'(?<=[,;:])\s+')
+WORD_RE = re.compile(r'\w+')
+
+STOPWORDS = frozenset('''
+a an and are as at be but by for from has have he her his i in is it its of on or she that the their them
+they this to was were which who will with you your we our not no so if than then there these those been
+và là của có cho với các những một được trong khi này đó thì mà như để cũng không đã sẽ đang người ra vào
+lại nên từ theo về rất hay hoặc nhưng vì bị bởi tại trên dưới sau trước nó họ chúng tôi ta bạn anh chị em
+'''.split())
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate GPT token count of ``text``, without a tokenizer"""
+    return math.ceil(len(text.encode('utf-8')) / BYTES_PER_TOKEN)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of normalized text, long ones split at clause boundaries"""
+    sentences = []
+    for sentence in SENTENCE_END_RE.split(text.strip()):
+        if len(sentence) <= MAX_SENTENCE_CHARS:
+            sentences.append(sentence)
+            continue
+        piece = ""
+        for clause in CLAUSE_END_RE.split(sentence):
+            if piece and len(piece) + len(clause) > MAX_SENTENCE_CHARS:
+                sentences.append(piece)
+                piece = ""
+            piece = f"{piece} {clause}" if piece else clause
+        if piece:
+            sentences.append(piece)
+    return [sentence for sentence in sentences if sentence.strip()]
+
+
+def _terms(sentence: str) -> List[str]:
+    return [word for word in WORD_RE.findall(sentence.lower()) if word not in STOPWORDS and not word.isdigit()]
+
+
+class ExtractiveSummarizer:
+    """Picks the most central sentences of a text (TF-IDF + TextRank)
+
+    Sentences are scored by TextRank over their TF-IDF cosine similarity,
+    the best sentence of every stretch of the text is taken first for
+    coverage, near-duplicates are skipped, and the picks are returned in
+    source order. Without NumPy, sentences are scored by the average
+    TF-IDF weight of their words instead.
+    """
+
+    def __init__(self, coverage_tokens: int = COVERAGE_TOKENS, redundancy: float = REDUNDANCY_THRESHOLD):
+        self.coverage_tokens = coverage_tokens
+        self.redundancy = redundancy
+
+    def condense(self, text: str, max_tokens: int = SUMMARY_TOKENS,
+                 count: Optional[Callable[[str], int]] = None) -> str:
+        """``text`` if it fits in ``max_tokens``, else its key sentences within the budget
+
+        ``count`` measures tokens (the target model's tokenizer); the
+        default is the byte-based estimate.
+        """
+        count = count or estimate_tokens
+        if not text or count(text) <= max_tokens:
+            return text or ""
+        sentences = split_sentences(text)
+        candidates = [i for i, sentence in enumerate(sentences) if len(sentence) >= MIN_SENTENCE_CHARS]
+        if len(candidates) < 2:
+            return self._truncate(text, max_tokens, count)
+
+        terms = [_terms(sentences[i]) for i in candidates]
+        if NUMPY_AVAILABLE:
+            scores, vectors = self._textrank(terms)
+        else:
+            scores, vectors = self._frequency_scores(terms), None
+
+        picked = self._select(sentences, candidates, scores, vectors, max_tokens, count)
+        if not picked:
+            return self._truncate(text, max_tokens, count)
+        return " ".join(sentences[i] for i in sorted(picked))
+
+    def _textrank(self, terms: List[List[str]]):
+        vocabulary = {}
+        rows, cols = [], []
+        for row, words in enumerate(terms):
+            for word in words:
+                rows.append(row)
+                cols.append(vocabulary.setdefault(word, len(vocabulary)))
+        count = len(terms)
+        matrix = np.zeros((count, max(1, len(vocabulary))), dtype=np.float32)
+        if rows:
+            np.add.at(matrix, (np.array(rows), np.array(cols)), 1.0)
+        # Sublinear term frequency, smoothed inverse sentence frequency
+        np.log1p(matrix, out=matrix)
+        frequency = np.count_nonzero(matrix, axis=0)
+        matrix *= (np.log((1 + count) / (1 + frequency)) + 1).astype(np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+
+        similarity = matrix @ matrix.T
+        np.fill_diagonal(similarity, 0)
+        weights = similarity.sum(axis=1, keepdims=True)
+        transition = np.divide(similarity, weights, out=np.full_like(similarity, 1.0 / count), where=weights > 0)
+        rank = np.full(count, 1.0 / count, dtype=np.float32)
+        for _ in range(TEXTRANK_ITERATIONS):
+            updated = (1 - TEXTRANK_DAMPING) / count + TEXTRANK_DAMPING * (transition.T @ rank)
+            if np.abs(updated - rank).sum() < 1e-6:
+                rank = updated
+                break
+            rank = updated
+        return rank.tolist(), matrix
+
+    @staticmethod
+    def _frequency_scores(terms: List[List[str]]) -> List[float]:
+        document_frequency = Counter(word for words in terms for word in set(words))
+        count = len(terms)
+        totals = Counter(word for words in terms for word in words)
+        scores = []
+        for words in terms:
+            if not words:
+                scores.append(0.0)
+                continue
+            weight = sum(totals[word] * math.log((1 + count) / (1 + document_frequency[word])) for word in set(words))
+            scores.append(weight / len(words))
+        return scores
+
+    def _select(self, sentences: List[str], candidates: List[int], scores: List[float],
+                vectors, max_tokens: int, count: Callable[[str], int]) -> List[int]:
+        """Best sentence of each stretch first, then the rest by score, within the budget"""
+        segments = max(1, max_tokens // self.coverage_tokens)
+        segment_of = [position * segments // len(candidates) for position in range(len(candidates))]
+        best_in_segment = {}
+        for position, score in enumerate(scores):
+            segment = segment_of[position]
+            if segment not in best_in_segment or score > scores[best_in_segment[segment]]:
+                best_in_segment[segment] = position
+        first = sorted(best_in_segment.values(), key=lambda position: -scores[position])
+        rest = sorted(range(len(candidates)), key=lambda position: -scores[position])
+
+        chosen: List[int] = []
+        seen = set()
+        used = 0
+        for position in first + rest:
+            sentence = sentences[candidates[position]]
+            if sentence in seen:
+                continue
+            cost = count(sentence) + 1
+            if used + cost > max_tokens:
+                continue
+            if vectors is not None and chosen and float((vectors[chosen] @ vectors[position]).max()) > self.redundancy:
+                continue
+            chosen.append(position)
+            seen.add(sentence)
+            used += cost
+        return [candidates[position] for position in chosen]
+
+    @staticmethod
+    def _truncate(text: str, max_tokens: int, count: Callable[[str], int] = estimate_tokens) -> str:
+        """Cut at the budget, shortening until ``count`` agrees"""
+        cut = text[:max_tokens * BYTES_PER_TOKEN].encode('utf-8')[:max_tokens * BYTES_PER_TOKEN].decode('utf-8', 'ignore')
+        while cut and count(cut) > max_tokens:
+            cut = cut[:int(len(cut) * 0.9)]
+        return cut
+
+
+# Initialize shared summarizer
+summarizer = ExtractiveSummarizer()
+
+
+def condense_text(text: str, max_tokens: int = SUMMARY_TOKENS,
+                  count: Optional[Callable[[str], int]] = None) -> str:
+    """Condense text to about ``max_tokens`` prompt tokens with the shared summarizer"""
+    return summarizer.condense(text, max_tokens, count)
+
+
+# Export for easy import
+__all__ = ['summarizer', 'condense_text', 'ExtractiveSummarizer', 'estimate_tokens', 'split_sentences',
+           'SUMMARY_TOKENS']
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Tests for chapter detection from page headings
+Run from backend/: python -m pytest -q test_document_index.py
+"""
+
+import document_index
+from document_index import DocumentIndexer, heading_key
+
+BODY = "nội dung của trang sách này được viết để kiểm tra việc chia chương theo tiêu đề. " * 25
+
+
+def index_of(pages, monkeypatch):
+    # No outline: chapters come from the headings on the pages
+    monkeypatch.setattr(document_index, "read_outline", lambda path: [])
+    return DocumentIndexer()._index_from_pages("book.pdf", pages, {})
+
+
+def test_heading_key_ignores_title_and_case():
+    assert heading_key("Chương 1: Tên chương 1") == heading_key("CHƯƠNG 1") == "chương 1"
+    assert heading_key("Phần I: Khởi đầu") == "phần i"
+    assert heading_key("Chương 1") != heading_key("Chương 2")
+
+
+def test_alternating_and_shortened_running_headers(monkeypatch):
+    # A part title page, then three chapters of four pages each; following
+    # pages alternate the part header with a full or shortened chapter header
+    pages = ["Phần I: Khởi đầu\n" + BODY[:300]]
+    for number in range(1, 4):
+        pages.append(f"Chương {number}: Tên chương {number}\n{BODY}")
+        pages.append(f"Phần I: Khởi đầu\n{BODY}")
+        pages.append(f"Chương {number}\n{BODY}")
+        pages.append(f"Chương {number}: Tên chương {number}\n{BODY}")
+
+    index = index_of(pages, monkeypatch)
+
+    assert index["source"] == "headings"
+    assert [chapter["title"] for chapter in index["chapters"]] == [
+        "Chương 1: Tên chương 1", "Chương 2: Tên chương 2", "Chương 3: Tên chương 3"
+    ]
+    assert [(chapter["start_page"], chapter["end_page"]) for chapter in index["chapters"]] == [
+        (0, 5), (5, 9), (9, 13)
+    ]
+
+
+def test_repeated_heading_does_not_split_a_chapter(monkeypatch):
+    pages = [f"Chương 1: Mở màn\n{BODY}", f"Chương 1\n{BODY}", f"Chương 1: Mở màn\n{BODY}",
+             f"Chương 2: Kết thúc\n{BODY}", f"Chương 2\n{BODY}"]
+
+    index = index_of(pages, monkeypatch)
+
+    assert [(chapter["title"], chapter["start_page"]) for chapter in index["chapters"]] == [
+        ("Chương 1: Mở màn", 0), ("Chương 2: Kết thúc", 3)
+    ]
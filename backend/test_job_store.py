@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for write ordering in the job store
+Run from backend/: python -m pytest -q test_job_store.py
+"""
+
+import threading
+
+from job_store import SQLiteJobStore
+
+
+class PausingStore(SQLiteJobStore):
+    """Stops the next write until released, to force an interleaving"""
+
+    def __init__(self, path: str, **kwargs):
+        self.pause_next = False
+        self.paused = threading.Event()
+        self.resume = threading.Event()
+        super().__init__(path, **kwargs)
+
+    def _apply_updates(self, batch):
+        if self.pause_next:
+            self.pause_next = False
+            self.paused.set()
+            self.resume.wait(5)
+        super()._apply_updates(batch)
+
+
+def test_flushed_progress_does_not_overwrite_a_later_status_update(tmp_path):
+    store = PausingStore(str(tmp_path / "jobs.db"), flush_interval=3600)
+    try:
+        store.create({"id": "job", "status": "processing", "progress": 0})
+        store.update("job", progress=90, current_step="Rendering")
+
+        # The flush has taken the progress batch but not written it yet
+        store.pause_next = True
+        flusher = threading.Thread(target=store.flush)
+        flusher.start()
+        assert store.paused.wait(5)
+        finisher = threading.Thread(
+            target=store.update, args=("job",),
+            kwargs={"status": "completed", "progress": 100, "current_step": "Done"}
+        )
+        finisher.start()
+        finisher.join(0.2)
+        store.resume.set()
+        flusher.join(5)
+        finisher.join(5)
+
+        job = store.get("job")
+        assert (job["status"], job["progress"], job["current_step"]) == ("completed", 100, "Done")
+    finally:
+        store.resume.set()
+        store.close()
+
+
+def test_status_update_carries_pending_progress(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / "jobs.db"), flush_interval=3600)
+    try:
+        store.create({"id": "job", "status": "processing", "progress": 0})
+        store.update("job", progress=40, current_step="Analyzing")
+        store.update("job", status="failed")
+        store.flush()
+
+        job = store.get("job")
+        assert (job["status"], job["progress"], job["current_step"]) == ("failed", 40, "Analyzing")
+    finally:
+        store.close()
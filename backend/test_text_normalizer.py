@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming text normalization
+Run from backend/: python -m pytest -q test_text_normalizer.py
+"""
+
+import random
+import unicodedata
+
+import pytest
+
+from text_normalizer import text_normalizer
+
+WORDS = ["Đây", "là", "một", "câu", "tiếng", "Việt", "sách", "chương", "trang", "hay", "đọc", "the", "book"]
+
+# Page numbers, separators and bullets that normalize() drops as noise lines
+NOISE = ["1", "23", "- 4 -", "***", "…", "·", "12.", "", "  "]
+
+PUNCTUATION = [".", ",", "!", "?", "...", "..", "—", "“", "”", "•", "­", "​"]
+
+
+def random_text(rng: random.Random) -> str:
+    lines = []
+    for _ in range(rng.randint(1, 40)):
+        if rng.random() < 0.3:
+            lines.append(rng.choice(NOISE))
+            continue
+        words = []
+        # Some lines are longer than the smallest blocks, so they get cut at a space
+        for _ in range(rng.randint(1, 30)):
+            word = rng.choice(WORDS)
+            if rng.random() < 0.2:
+                word = unicodedata.normalize("NFD", word)
+            if rng.random() < 0.2:
+                word += rng.choice(PUNCTUATION)
+            if rng.random() < 0.05:
+                word = str(rng.randint(1, 9999))
+            words.append(word)
+        lines.append(rng.choice([" ", "  ", "\t"]).join(words))
+    return "\n".join(lines) + rng.choice(["", "\n", "\n1", "\n\n- 2 -"])
+
+
+def random_chunks(text: str, rng: random.Random):
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 40)
+        yield text[position:position + size]
+        position += size
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_stream_matches_normalize_of_the_whole_text(seed):
+    rng = random.Random(seed)
+    text = random_text(rng)
+    block_size = rng.choice([16, 32, 64, 256])
+
+    pieces = list(text_normalizer.stream(random_chunks(text, rng), block_size=block_size))
+
+    assert all(pieces)
+    assert " ".join(pieces) == text_normalizer.normalize(text)
+
+
+def test_trailing_page_number_is_dropped():
+    text = "Đây là một câu tiếng Việt.\n" * 5 + "\n1"
+
+    pieces = list(text_normalizer.stream([text], block_size=16))
+
+    assert " ".join(pieces) == text_normalizer.normalize(text)
+    assert not " ".join(pieces).endswith("1")
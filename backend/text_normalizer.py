@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Shared text normalization for extracted content
+NFC, precompiled prefix-scannable patterns, and streaming over page/file chunks
+"""
+
+import re
+import unicodedata
+from typing import Iterable, Iterator, Optional
+
+# Punctuation kept as-is; every other non-word character becomes a space
+ALLOWED_PUNCTUATION = '.,!?;:()[]-"\''
+
+# Typographic characters that PDFs and CMSs emit, mapped to what the AI
+# prompt and TTS expect; zero-width characters and soft hyphens vanish
+_SPECIAL = {
+    '‘': "'", '’': "'", '‚': "'", '‛': "'", '′': "'",
+    '“': '"', '”': '"', '„': '"', '«': '"', '»': '"', '″': '"',
+    '‐': '-', '‑': '-', '‒': '-', '–': '-', '—': '-', '―': '-', '−': '-',
+    '…': '...',
+    '­': None, '​': None, '‌': None, '‍': None, '⁠': None, '﻿': None,
+}
+
+# Runs of characters that are neither word characters (any script, so
+# Vietnamese letters included), allowed punctuation, a space nor a line
+# break. Written as [c][c]* rather than [c]+ so the regex engine can use its
+# fast charset-prefix scan between matches
+_OTHER = r'[^\w\n ' + re.escape(ALLOWED_PUNCTUATION) + ']'
+OTHER_CHARS_RE = re.compile(_OTHER + _OTHER + '*')
+
+# A line with no letters, only punctuation and at most a 4-digit number:
+# page numbers, separators, bullets left behind by the PDF layout. Anchored
+# on a literal line break (the text is wrapped in them) instead of ^/$,
+# which the engine would try at every position
+NOISE_LINE_RE = re.compile(r'\n[^\w\n]*(?:\d[^\w\n]*){0,4}(?=\n)')
+SPACES_RE = re.compile('  +')
+REPEATED_PUNCTUATION_RE = re.compile(r'[.,!?;][.,!?;]+')
+
+
+class _TranslateTable(dict):
+    """``str.translate`` table filled in lazily, one entry per distinct character
+
+    Only applied to OTHER_CHARS_RE matches: typographic characters map to
+    their plain form, other whitespace and disallowed symbols to a space.
+    """
+
+    def __missing__(self, codepoint: int):
+        value = _SPECIAL.get(chr(codepoint), ' ')
+        self[codepoint] = value
+        return value
+
+
+class TextNormalizer:
+    """Normalizes extracted text into single-spaced, prompt-ready prose
+
+    Every step is either a C-level string method or a regex whose match
+    starts with a literal or a character class, so the engine skips over
+    ordinary text quickly; the only Python code runs per disallowed run.
+    """
+
+    # Characters handed to the regex engine at a time by stream()
+    STREAM_BLOCK = 256 * 1024
+
+    def __init__(self):
+        self._table = _TranslateTable()
+
+    def normalize(self, text: str) -> str:
+        """Normalize one piece of text (a page, a web article, a file)"""
+        if not text:
+            return ""
+        if not text.isascii():
+            # Vietnamese from PDFs often comes decomposed (a + U+0301); the
+            # combining marks are not word characters and would be dropped
+            text = unicodedata.normalize('NFC', text)
+        text = OTHER_CHARS_RE.sub(self._replace, text)
+        if '\n' in text:
+            text = NOISE_LINE_RE.sub('', '\n' + text + '\n').replace('\n', ' ')
+        text = SPACES_RE.sub(' ', text).strip(' ')
+        return REPEATED_PUNCTUATION_RE.sub('.', text)
+
+    def _replace(self, match) -> str:
+        return match.group().translate(self._table)
+
+    def stream(self, chunks: Iterable[str], block_size: Optional[int] = None) -> Iterator[str]:
+        """Normalize a text that arrives in arbitrary slices
+
+        Slices are buffered up to ``block_size`` (STREAM_BLOCK by default)
+        and cut at the last line break, which stays on both sides, so every
+        line is judged whole; only a line longer than a block is cut,
+        at a space. The pieces yielded are non-empty; joined with single
+        spaces they equal ``normalize("".join(chunks))``. A consumer that
+        stops early has pulled at most one block too many.
+        """
+        block_size = block_size or self.STREAM_BLOCK
+        parts = []
+        size = 0
+        # The buffer starts in the middle of a line cut at a space
+        continued = False
+        for chunk in chunks:
+            if not chunk:
+                continue
+            parts.append(chunk)
+            size += len(chunk)
+            if size < block_size:
+                continue
+            text = "".join(parts)
+            cut = text.rfind('\n')
+            mid_line = cut <= 0
+            if mid_line:
+                cut = text.rfind(' ')
+            if cut <= 0:
+                parts = [text]
+                continue
+            # Both sides keep the line break, so each judges its edge line whole
+            piece = self._normalize_part(text[:cut] if mid_line else text[:cut + 1], continued, mid_line)
+            rest = text[cut:]
+            parts, size, continued = [rest], len(rest), mid_line
+            if piece:
+                yield piece
+        piece = self._normalize_part("".join(parts), continued, False)
+        if piece:
+            yield piece
+
+    def _normalize_part(self, text: str, starts_mid_line: bool, ends_mid_line: bool) -> str:
+        """Normalize part of a text; a word character stands in for the rest of a cut line
+
+        Without it the partial line could pass for a noise line (a lone
+        page number, say) and be dropped.
+        """
+        text = ("x" if starts_mid_line else "") + text + ("x" if ends_mid_line else "")
+        piece = self.normalize(text)
+        if starts_mid_line:
+            piece = piece[1:].lstrip(' ')
+        if ends_mid_line:
+            piece = piece[:-1].rstrip(' ')
+        return piece
+
+
+# Initialize shared normalizer
+text_normalizer = TextNormalizer()
+normalize_text = text_normalizer.normalize
+
+# Export for easy import
+__all__ = ['text_normalizer', 'normalize_text', 'TextNormalizer']
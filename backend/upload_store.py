@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Content-addressed upload storage and extraction cache
+Identical uploads share one file, and its extracted text is computed once
+"""
+
+import os
+import re
+import json
+import glob
+import time
+import hashlib
+import threading
+import logging
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+
+from multipart_upload import SpooledUpload, UPLOAD_DIR, READ_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_CACHE_DIR = os.environ.get('EXTRACTION_CACHE_DIR', os.path.join('data', 'extraction_cache'))
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def file_sha256(path: str) -> str:
+    """Hash a file in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE * 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class UploadStore:
+    """Uploads stored as ``<root>/<sha256>.<ext>``; the digest is the file ID"""
+
+    def __init__(self, root: str = UPLOAD_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def store(self, upload: SpooledUpload) -> Tuple[str, str, bool]:
+        """Keep a spooled upload; returns ``(file_id, path, deduplicated)``"""
+        file_id = upload.sha256
+        existing = self.path_for(file_id)
+        if existing:
+            upload.discard()
+            upload.path = existing
+            return file_id, existing, True
+        path = os.path.join(self.root, f"{file_id}.{upload.extension or 'bin'}")
+        upload.move_to(path)
+        return file_id, path, False
+
+    def path_for(self, file_id: str) -> Optional[str]:
+        """Stored path of ``file_id`` (also finds legacy ``<uuid>.<ext>`` uploads)"""
+        if not file_id or "/" in file_id or "\\" in file_id or file_id.startswith("."):
+            return None
+        matches = glob.glob(os.path.join(glob.escape(self.root), f"{glob.escape(file_id)}.*"))
+        return matches[0] if matches else None
+
+    def digest_of(self, path: str) -> str:
+        """SHA-256 of a file, read from the name when it lives in the store"""
+        directory, name = os.path.split(os.path.abspath(path))
+        stem = name.split(".", 1)[0]
+        if directory == os.path.abspath(self.root) and _SHA256_RE.match(stem):
+            return stem
+        return file_sha256(path)
+
+
+class ExtractionCache:
+    """Extraction results keyed by content hash, one JSON file per entry
+
+    ``variant`` names the extractor and its settings (e.g. the content
+    limit) so two extractors never read each other's results. Entries are
+    written atomically, so several server processes can share the
+    directory.
+    """
+
+    def __init__(self, root: str = EXTRACTION_CACHE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, digest: str, variant: str) -> str:
+        safe_variant = re.sub(r"[^A-Za-z0-9_.-]", "_", variant)
+        return os.path.join(self.root, f"{digest}.{safe_variant}.json")
+
+    def get(self, digest: str, variant: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(digest, variant), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable extraction cache entry {digest}: {e}")
+            return None
+
+    def put(self, digest: str, variant: str, result: Dict[str, Any]):
+        target = self._path(digest, variant)
+        temp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(temp, target)
+
+    async def get_or_extract(self, digest: str, variant: str,
+                             extract: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached result for ``digest``, or run ``extract`` and cache its result"""
+        cached = self.get(digest, variant)
+        with self._lock:
+            if cached is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if cached is not None:
+            logger.info(f"⚡ Extraction cache hit for {digest[:12]}")
+            return cached
+
+        started = time.perf_counter()
+        result = await extract()
+        try:
+            self.put(digest, variant, result)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Could not cache extraction for {digest[:12]}: {e}")
+        logger.info(f"📄 Extracted {digest[:12]} in {time.perf_counter() - started:.2f}s")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None
+            }
+
+
+# Initialize shared instances
+upload_store = UploadStore()
+extraction_cache = ExtractionCache()
+
+# Export for easy import
+__all__ = ['upload_store', 'extraction_cache', 'UploadStore', 'ExtractionCache', 'file_sha256']
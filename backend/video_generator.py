@@ -6,10 +6,13 @@ Creates MP4 videos with voiceover, text overlays, and transitions
 
 import os
 import json
+import uuid
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 import time
 
+from render_pool import render_pool, moviepy_logger
+
 # Try to import MoviePy
 try:
     from moviepy.editor import *
@@ -41,85 +44,102 @@ class VideoGenerator:
     async def generate_video(self, 
                            script_data: Dict[str, Any],
                            voice_file: str,
-                           settings: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate complete video from script and voice"""
+                           settings: Dict[str, Any],
+                           on_progress: Optional[Callable[[float], None]] = None) -> Dict[str, Any]:
+        """Generate complete video from script and voice
+        
+        Rendering runs in the render worker pool; ``on_progress`` receives
+        the encoded fraction (0-1) as frames are written.
+        """
         
         if not MOVIEPY_AVAILABLE:
             return self._simulate_video_generation(script_data, voice_file, settings)
         
+        # Unique name: several renders can finish within the same second
+        output_filename = f"tiktok_video_{int(time.time())}_{uuid.uuid4().hex[:8]}.mp4"
+        spec = {
+            "script_data": script_data,
+            "voice_file": voice_file,
+            "output_path": str(self.output_dir / output_filename)
+        }
+        
         try:
-            # Parse script into segments
-            segments = self._parse_script_segments(script_data)
-            
-            # Load voice audio
-            if os.path.exists(voice_file):
-                audio = AudioFileClip(voice_file)
-                duration = audio.duration
-            else:
-                # Fallback: estimate duration from text
-                word_count = len(script_data.get('script', '').split())
-                duration = max(15, word_count / 2.5)  # ~150 words per minute
-                audio = None
-            
-            # Create video clips
-            clips = []
-            
-            # 1. Background clip
-            bg_clip = self._create_background_clip(duration)
-            clips.append(bg_clip)
-            
-            # 2. Text overlay clips
-            text_clips = self._create_text_overlays(segments, duration)
-            clips.extend(text_clips)
-            
-            # 3. Add visual elements (hook, transitions)
-            visual_clips = self._create_visual_elements(script_data, duration)
-            clips.extend(visual_clips)
-            
-            # Composite all clips
-            final_video = CompositeVideoClip(clips, size=(self.width, self.height))
-            
-            # Add audio if available
-            if audio:
-                final_video = final_video.set_audio(audio)
-            
-            # Generate output filename
-            timestamp = int(time.time())
-            output_filename = f"tiktok_video_{timestamp}.mp4"
-            output_path = self.output_dir / output_filename
-            
-            # Render video
-            final_video.write_videofile(
-                str(output_path),
-                fps=self.fps,
-                codec='libx264',
-                audio_codec='aac',
-                temp_audiofile='temp-audio.m4a',
-                remove_temp=True,
-                verbose=False,
-                logger=None
-            )
-            
-            # Clean up
-            final_video.close()
-            if audio:
-                audio.close()
-            
-            return {
-                "success": True,
-                "video_path": str(output_path),
-                "filename": output_filename,
-                "duration": duration,
-                "resolution": f"{self.width}x{self.height}",
-                "fps": self.fps,
-                "file_size": os.path.getsize(output_path) if output_path.exists() else 0,
-                "segments_count": len(segments)
-            }
-            
+            return await render_pool.render("video_generator:render_video", spec, on_progress)
         except Exception as e:
             print(f"❌ Video generation error: {e}")
             return self._simulate_video_generation(script_data, voice_file, settings)
     
+    def render(self, spec: Dict[str, Any], progress: Optional[Callable[[float], None]] = None) -> Dict[str, Any]:
+        """Composite and encode the video described by ``spec`` (runs in a render worker)"""
+        
+        script_data = spec["script_data"]
+        voice_file = spec["voice_file"]
+        output_path = Path(spec["output_path"])
+        output_filename = output_path.name
+        
+        # Parse script into segments
+        segments = self._parse_script_segments(script_data)
+        
+        # Load voice audio
+        if os.path.exists(voice_file):
+            audio = AudioFileClip(voice_file)
+            duration = audio.duration
+        else:
+            # Fallback: estimate duration from text
+            word_count = len(script_data.get('script', '').split())
+            duration = max(15, word_count / 2.5)  # ~150 words per minute
+            audio = None
+        
+        # Create video clips
+        clips = []
+        
+        # 1. Background clip
+        bg_clip = self._create_background_clip(duration)
+        clips.append(bg_clip)
+        
+        # 2. Text overlay clips
+        text_clips = self._create_text_overlays(segments, duration)
+        clips.extend(text_clips)
+        
+        # 3. Add visual elements (hook, transitions)
+        visual_clips = self._create_visual_elements(script_data, duration)
+        clips.extend(visual_clips)
+        
+        # Composite all clips
+        final_video = CompositeVideoClip(clips, size=(self.width, self.height))
+        
+        # Add audio if available
+        if audio:
+            final_video = final_video.set_audio(audio)
+        
+        # Render video (temp audio is per output so parallel renders don't clash)
+        final_video.write_videofile(
+            str(output_path),
+            fps=self.fps,
+            codec='libx264',
+            audio_codec='aac',
+            temp_audiofile=str(output_path.with_suffix('.temp-audio.m4a')),
+            remove_temp=True,
+            verbose=False,
+            logger=moviepy_logger(progress) if progress else None
+        )
+        
+        # Clean up
+        final_video.close()
+        if audio:
+            audio.close()
+        
+        return {
+            "success": True,
+            "video_path": str(output_path),
+            "filename": output_filename,
+            "duration": duration,
+            "resolution": f"{self.width}x{self.height}",
+            "fps": self.fps,
+            "file_size": os.path.getsize(output_path) if output_path.exists() else 0,
+            "segments_count": len(segments)
+        }
+    
     def _parse_script_segments(self, script_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Parse script into timed segments for text overlays"""
         
@@ -315,5 +335,10 @@ class VideoGenerator:
 # Initialize video generator
 video_generator = VideoGenerator()
 
+
+def render_video(spec: Dict[str, Any], progress: Optional[Callable[[float], None]] = None) -> Dict[str, Any]:
+    """Render pool entry point (see render_pool.RenderPool)"""
+    return video_generator.render(spec, progress)
+
 # Export for easy import
 __all__ = ['video_generator'] 
\ No newline at end of file
@@ -4,21 +4,37 @@
 Optimized prompts for maximum engagement and virality
 """
 
+try:
+    from prompt_budget import prompt_budget
+    PROMPT_BUDGET_AVAILABLE = True
+except ImportError:
+    PROMPT_BUDGET_AVAILABLE = False
+
+
+def _fit(text: str, max_tokens: int, max_chars: int, model: str) -> str:
+    """Text cut to a token budget for the model (a character cut outside the backend)"""
+    if PROMPT_BUDGET_AVAILABLE:
+        return prompt_budget.fit_text(text, max_tokens, model)
+    return text[:max_chars]
+
 class ViralContentPrompts:
     """Advanced prompts for viral TikTok content generation"""
     
     @staticmethod
-    def get_content_analysis_prompt(content: str, duration: int, language: str = "en") -> str:
+    def get_content_analysis_prompt(content: str, duration: int, language: str = "en", model: str = "gpt-4") -> str:
         """Get enhanced content analysis prompt"""
         
         target_words = int((duration / 60) * 175)
         
+        # Key sentences from the whole source, about as long as the old 2500-character cut
+        source = _fit(content, 700, 2500, model)
+        
         if language == "vi":
             return f"""
 🎬 NHIỆM VỤ: Tạo script TikTok VIRAL từ nội dung sau
 
 📝 NỘI DUNG NGUỒN:
-{content[:2500]}
+{source}
 
 🎯 YÊU CẦU CHI TIẾT:
 - Thời lượng: {duration} giây ({target_words} từ)
@@ -62,7 +78,7 @@ class ViralContentPrompts:
 🎬 MISSION: Create VIRAL TikTok script from this content
 
 📝 SOURCE CONTENT:
-{content[:2500]}
+{source}
 
 🎯 DETAILED REQUIREMENTS:
 - Duration: {duration} seconds ({target_words} words)
@@ -103,14 +119,17 @@ class ViralContentPrompts:
 """
 
     @staticmethod
-    def get_marketing_prompt(script: str, category: str, keywords: list, language: str = "en") -> str:
+    def get_marketing_prompt(script: str, category: str, keywords: list, language: str = "en",
+                             model: str = "gpt-3.5-turbo") -> str:
         """Get enhanced marketing content prompt"""
         
+        script_excerpt = _fit(script, 250, 500, model)
+        
         if language == "vi":
             return f"""
 🔥 TẠO MARKETING CONTENT VIRAL CHO TIKTOK
 
-📝 SCRIPT: {script[:500]}...
+📝 SCRIPT: {script_excerpt}
 🎯 CATEGORY: {category}
 🔑 KEYWORDS: {', '.join(keywords)}
 
@@ -162,7 +181,7 @@ class ViralContentPrompts:
             return f"""
 🔥 CREATE VIRAL MARKETING CONTENT FOR TIKTOK
 
-📝 SCRIPT: {script[:500]}...
+📝 SCRIPT: {script_excerpt}
 🎯 CATEGORY: {category}
 🔑 KEYWORDS: {', '.join(keywords)}
 